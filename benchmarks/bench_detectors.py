@@ -0,0 +1,186 @@
+"""
+Detection engine benchmark
+--------------------------
+Measures the per-frame cost of every detection engine, detection scale and
+counting mode against the original detect_ball pipeline (ROI cvtColor +
+21x21 blur + absdiff + threshold + dilate + findContours loop), on synthetic
+frames with falling balls and sensor noise. The number of balls that really
+crossed the scoring line is printed for comparison with the hit counts.
+
+Every engine must meet or beat the original's per-frame cost. The original
+counted with per-bucket cooldowns, so each engine's cooldown rows are
+compared with it; any that is slower is marked FAIL and the script exits
+with status 1. Tracking rows are shown for reference only: the tracker is
+extra work the original never did. Cases run in interleaved rounds so a
+burst of background load hits them all alike.
+
+Usage:
+  python benchmarks/bench_detectors.py
+  python benchmarks/bench_detectors.py --width 1920 --height 1080 --frames 600
+  python benchmarks/bench_detectors.py --drop-rate 2  # dozens of balls in flight
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from galton_engine import (  # noqa: E402
+    GaltonEngine, DETECTION_ENGINES, DETECTION_SCALE_CHOICES, COUNTING_MODES, NUM_BUCKETS,
+    DEFAULT_MOTION_THRESHOLD, DEFAULT_MIN_CONTOUR_AREA,
+    DEFAULT_SCORING_LINE
+)
+
+FPS = 60.0
+LEGACY_COOLDOWN_FRAMES = 20
+
+
+def make_frames(width, height, num_frames, drop_rate=0.15, seed=0):
+    """Synthetic clip: balls falling into the goal region over a noisy background.
+
+    Returns the frames, the goal region and how many balls crossed the
+    scoring line.
+    """
+    rng = np.random.default_rng(seed)
+    goal_region = (width // 10, height * 2 // 3, width * 9 // 10, height - height // 20)
+    x1, y1, x2, y2 = goal_region
+    line_y = y1 + DEFAULT_SCORING_LINE * (y2 - y1)
+    bucket_width = (x2 - x1) / NUM_BUCKETS
+    radius = max(6, height // 50)
+
+    background = np.full((height, width, 3), 40, dtype=np.uint8)
+    balls = []  # [x, y, speed]
+    frames = []
+    crossed = 0
+    for _ in range(num_frames):
+        for _ in range(rng.poisson(drop_rate)):
+            bucket = rng.binomial(NUM_BUCKETS - 1, 0.5) + rng.uniform(0.2, 0.8)
+            balls.append([int(x1 + bucket * bucket_width), 0, rng.uniform(7, 9)])
+
+        frame = background.copy()
+        frame += rng.integers(0, 6, size=(height, width, 1), dtype=np.uint8)
+        for ball in balls:
+            y = ball[1] + ball[2] * height / 720
+            crossed += ball[1] < line_y <= y
+            ball[1] = y
+            cv2.circle(frame, (ball[0], int(ball[1])), radius, (255, 255, 255), -1)
+        balls = [b for b in balls if b[1] < y2]
+        frames.append(frame)
+    return frames, goal_region, crossed
+
+
+class LegacyDetector:
+    """The original detect_ball pipeline, kept here as the cost baseline."""
+
+    def __init__(self, goal_region):
+        self.goal_region = goal_region
+        self.prev_frame = None
+        self.cooldown_counters = [0] * NUM_BUCKETS
+
+    def detect(self, frame, timestamp):
+        for i in range(NUM_BUCKETS):
+            self.cooldown_counters[i] = max(0, self.cooldown_counters[i] - 1)
+
+        x1, y1, x2, y2 = self.goal_region
+        roi = frame[y1:y2, x1:x2]
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        if self.prev_frame is None:
+            self.prev_frame = gray
+            return []
+
+        frame_delta = cv2.absdiff(self.prev_frame, gray)
+        thresh = cv2.threshold(frame_delta, DEFAULT_MOTION_THRESHOLD, 255, cv2.THRESH_BINARY)[1]
+        thresh = cv2.dilate(thresh, None, iterations=2)
+        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        self.prev_frame = gray
+
+        detected = []
+        bucket_width = (x2 - x1) / NUM_BUCKETS
+        for contour in contours:
+            if cv2.contourArea(contour) > DEFAULT_MIN_CONTOUR_AREA:
+                M = cv2.moments(contour)
+                if M["m00"] > 0:
+                    cx = int(M["m10"] / M["m00"]) + x1
+                    bucket = min(int((cx - x1) / bucket_width), NUM_BUCKETS - 1)
+                    if self.cooldown_counters[bucket] == 0:
+                        self.cooldown_counters[bucket] = LEGACY_COOLDOWN_FRAMES
+                        detected.append(bucket)
+        return detected
+
+
+def time_per_frame(frames, make_detector):
+    """Mean milliseconds per frame of one run, and the hit count."""
+    detect = make_detector()
+    hits = 0
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        hits += len(detect(frame, i / FPS))
+    return (time.perf_counter() - start) / len(frames) * 1000.0, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detection engines")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--drop-rate", type=float, default=0.15,
+                        help="Mean number of new balls per frame")
+    args = parser.parse_args()
+
+    print(f"Generating {args.frames} frames at {args.width}x{args.height}...")
+    frames, goal_region, crossed = make_frames(args.width, args.height, args.frames,
+                                               args.drop_rate)
+
+    def legacy():
+        return LegacyDetector(goal_region).detect
+
+    cases = [("Original detect_ball", "full", "cooldown", legacy)]
+    for engine in DETECTION_ENGINES:
+        for scale, scale_name in DETECTION_SCALE_CHOICES:
+            for mode, _ in COUNTING_MODES:
+                def current(engine=engine, scale=scale, mode=mode):
+                    pipeline = GaltonEngine()
+                    pipeline.goal_region = goal_region
+                    pipeline.detection_scale = scale
+                    pipeline.detector = engine()
+                    pipeline.counting_mode = mode
+                    return lambda frame, timestamp: pipeline.detect_ball(
+                        pipeline.preprocess(frame), timestamp)
+
+                label = scale_name.split(" (")[0].replace(" resolution", "").lower()
+                cases.append((engine.name, label, mode, current))
+
+    # Best of `repeat` interleaved rounds
+    best = [float("inf")] * len(cases)
+    hits = [0] * len(cases)
+    for _ in range(args.repeat):
+        for i, (_, _, _, make_detector) in enumerate(cases):
+            ms, hits[i] = time_per_frame(frames, make_detector)
+            best[i] = min(best[i], ms)
+
+    baseline_ms = best[0]
+    failed = 0
+    print(f"\nBalls crossing the scoring line: {crossed}")
+    print(f"\n{'Engine':<30} {'Scale':<8} {'Counting':<9} {'ms/frame':>9} {'vs orig':>8} {'hits':>6}")
+    print("-" * 75)
+    for (name, scale, mode, _), ms, count in zip(cases, best, hits):
+        note = ""
+        if mode == "cooldown" and ms > baseline_ms:
+            note = "  FAIL: slower than the original"
+            failed += 1
+        print(f"{name:<30} {scale:<8} {mode:<9} {ms:>9.3f} {baseline_ms / ms:>7.2f}x {count:>6}{note}")
+
+    if failed:
+        print(f"\n{failed} engine configuration(s) slower than the original detect_ball")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
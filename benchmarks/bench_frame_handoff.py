@@ -0,0 +1,149 @@
+"""
+Frame handoff benchmark
+-----------------------
+Measures how many bytes of frame data are copied per frame between the ring
+buffer and the screen, and the time spent on the worker and on the GUI
+thread, for the original copy-per-consumer handoff and the pooled
+FrameBuffer handoff (with smooth and fast display scaling). Both paths run
+the real VideoThread stages and VisualizationWidget (offscreen); resampling
+for display and the pixmap upload Qt does are not counted as copies.
+
+Usage:
+  python benchmarks/bench_frame_handoff.py
+  python benchmarks/bench_frame_handoff.py --width 1920 --height 1080 --display 3840x2160
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt  # noqa: E402
+from PyQt5.QtGui import QImage, QPixmap  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from galton_goalie_qt import VideoThread, VisualizationWidget  # noqa: E402
+from galton_engine import FrameMeta  # noqa: E402
+from bench_detectors import make_frames, FPS  # noqa: E402
+
+
+def make_thread(goal_region, clean_recording):
+    thread = VideoThread()
+    thread.goal_region = goal_region
+    thread.trail_mode = 1
+    thread.keep_clean_frame = clean_recording
+    return thread
+
+
+def legacy_handoff(frames, goal_region, widget):
+    """The original path: a copy per consumer, RGB conversion and a smooth
+    QPixmap rescale on the GUI thread.
+
+    It made the same copies whether or not a clean recording was running.
+    """
+    thread = make_thread(goal_region, False)
+    copied = 0
+    worker = gui = 0.0
+    for i, ring_frame in enumerate(frames):
+        # VideoThread.run and process_frame: a working copy, then a clean copy
+        start = time.perf_counter()
+        frame_delta = thread.preprocess(ring_frame)
+        trail_delta = thread.preprocess_trails(ring_frame)
+        frame = ring_frame.copy()
+        thread.update_trails(frame, trail_delta)
+        frame = thread.apply_trails(frame)
+        clean_frame = frame.copy()
+        frame = thread.draw_bucket_overlay(frame)
+        thread.detect_ball(frame_delta, i / FPS)
+        copied += frame.nbytes + clean_frame.nbytes
+        worker += time.perf_counter() - start
+
+        # MainWindow.on_frame_ready: one copy to keep, one to display
+        start = time.perf_counter()
+        current_frame = frame.copy()
+        display_frame = current_frame.copy()
+        copied += current_frame.nbytes + display_frame.nbytes
+
+        # VisualizationWidget.update_frame
+        rgb_frame = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
+        copied += rgb_frame.nbytes
+        h, w, ch = rgb_frame.shape
+        qt_image = QImage(rgb_frame.data, w, h, ch * w, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(qt_image)
+        widget.setPixmap(pixmap.scaled(widget.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        gui += time.perf_counter() - start
+    n = len(frames)
+    return worker / n * 1000.0, gui / n * 1000.0, copied / n
+
+
+def pooled_handoff(frames, goal_region, widget, clean_recording, fast):
+    """The current path: one pooled copy out of the ring, scaled for the
+    widget on the worker and handed to the UI through the mailbox."""
+    thread = make_thread(goal_region, clean_recording)
+    thread.display_size = widget.display_size()
+    thread.fast_display_scaling = fast
+    held = []
+    gui = [0.0]
+
+    def on_frame_ready():
+        # What MainWindow.on_frame_ready does with the buffer
+        start = time.perf_counter()
+        buffer, _ = thread.mailbox.take()
+        if held:
+            held.pop().release()
+        held.append(buffer)
+        display = buffer.display if buffer.display is not None else buffer
+        widget.update_frame(display.array, fast)
+        gui[0] += time.perf_counter() - start
+
+    thread.frame_ready.connect(on_frame_ready)
+    start = time.perf_counter()
+    for i, ring_frame in enumerate(frames):
+        buffer = thread.frame_pool.copy_from(ring_frame)
+        thread.process_buffer(buffer, FrameMeta(i, i / FPS))
+    total = time.perf_counter() - start
+    n = len(frames)
+    return ((total - gui[0]) / n * 1000.0, gui[0] / n * 1000.0,
+            thread.bytes_copied_per_frame, thread.frame_pool.buffers_allocated)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the frame handoff to the UI")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--display", default="1600x900",
+                        help="Video widget size, e.g. 3840x2160 for a 4K display")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)  # noqa: F841
+    widget = VisualizationWidget()
+    widget.setMinimumSize(1, 1)
+    widget.resize(*(int(v) for v in args.display.split("x")))
+
+    print(f"Generating {args.frames} frames at {args.width}x{args.height}...")
+    frames, goal_region, _ = make_frames(args.width, args.height, args.frames, drop_rate=0.5)
+    frame_kb = frames[0].nbytes / 1024
+
+    print(f"\nOne frame is {frame_kb:,.0f} KB, displayed at {args.display}")
+    print(f"\n{'Scenario':<17} {'Handoff':<14} {'worker ms':>10} {'GUI ms':>8} "
+          f"{'KB copied/frame':>16} {'frames':>7}")
+    print("-" * 77)
+    legacy_worker, legacy_gui, legacy_bytes = legacy_handoff(frames, goal_region, widget)
+    for scenario, clean_recording in (("Live view", False), ("Clean recording", True)):
+        print(f"{scenario:<17} {'original':<14} {legacy_worker:>10.2f} {legacy_gui:>8.2f} "
+              f"{legacy_bytes / 1024:>16,.0f} {legacy_bytes / frames[0].nbytes:>7.1f}")
+        for label, fast in (("pooled", False), ("pooled, fast", True)):
+            worker, gui, copied, allocated = pooled_handoff(frames, goal_region, widget,
+                                                            clean_recording, fast)
+            print(f"{'':<17} {label:<14} {worker:>10.2f} {gui:>8.2f} {copied / 1024:>16,.0f} "
+                  f"{copied / frames[0].nbytes:>7.1f}   ({allocated} buffers allocated)")
+
+
+if __name__ == "__main__":
+    main()
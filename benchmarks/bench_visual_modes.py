@@ -0,0 +1,216 @@
+"""
+Visualization mode benchmark
+----------------------------
+Compares the per-frame cost and heap traffic of the visualization modes
+against their original float32 implementations, on synthetic frames with
+falling balls. For each mode it reports ms/frame, bytes allocated per frame
+(tracemalloc peak, which includes NumPy and OpenCV output buffers) and the
+largest pixel difference between the old and new output.
+
+Usage:
+  python benchmarks/bench_visual_modes.py
+  python benchmarks/bench_visual_modes.py --width 1280 --height 720 --frames 120
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from galton_engine import (  # noqa: E402
+    GaltonEngine, FramePreprocessor, TRAIL_BLUR_SIZE, TRAIL_MOTION_THRESHOLD, NUM_BUCKETS,
+    GLOW_DURATION_MS
+)
+from bench_detectors import make_frames  # noqa: E402
+
+
+class LegacyVisuals:
+    """The original float32 visualization code, kept here as the baseline."""
+
+    def __init__(self, engine):
+        self.engine = engine  # For the shared settings (fade, size, colours)
+        self.trail_canvas = None
+        self.long_exposure_canvas = None
+        self.ultra_long_exposure_canvas = None
+
+    def trails(self, frame, frame_delta):
+        h, w = frame.shape[:2]
+        if self.trail_canvas is None or self.trail_canvas.shape[:2] != (h, w):
+            self.trail_canvas = np.zeros((h, w, 3), dtype=np.float32)
+
+        if frame_delta is not None:
+            thresh = cv2.threshold(frame_delta, TRAIL_MOTION_THRESHOLD, 255, cv2.THRESH_BINARY)[1]
+            thresh = cv2.dilate(thresh, None, iterations=self.engine.trail_size)
+
+            motion_mask = thresh > 0
+            color = self.engine.trail_colors[self.engine.trail_color_index][0]
+            self.trail_canvas[motion_mask] = color
+
+            fade_rate = self.engine.trail_fade / 100.0
+            self.trail_canvas *= fade_rate
+
+        trail_uint8 = np.clip(self.trail_canvas, 0, 255).astype(np.uint8)
+        return cv2.add(frame, trail_uint8)
+
+    def long_exposure(self, frame, frame_delta):
+        h, w = frame.shape[:2]
+        if self.long_exposure_canvas is None or self.long_exposure_canvas.shape[:2] != (h, w):
+            self.long_exposure_canvas = np.zeros((h, w, 3), dtype=np.float32)
+
+        frame_float = frame.astype(np.float32)
+        self.long_exposure_canvas = np.maximum(self.long_exposure_canvas, frame_float)
+
+        fade_rate = self.engine.long_exposure_duration / 100.0
+        self.long_exposure_canvas = (self.long_exposure_canvas * fade_rate +
+                                     frame_float * (1 - fade_rate) * 0.5)
+
+        return np.clip(self.long_exposure_canvas, 0, 255).astype(np.uint8)
+
+    def ultra_long_exposure(self, frame, frame_delta):
+        h, w = frame.shape[:2]
+        if self.ultra_long_exposure_canvas is None or self.ultra_long_exposure_canvas.shape[:2] != (h, w):
+            self.ultra_long_exposure_canvas = np.zeros((h, w, 3), dtype=np.float32)
+
+        if frame_delta is not None:
+            thresh = cv2.threshold(frame_delta, TRAIL_MOTION_THRESHOLD, 255, cv2.THRESH_BINARY)[1]
+            thresh = cv2.dilate(thresh, None, iterations=1)
+
+            motion_mask = thresh > 0
+            self.ultra_long_exposure_canvas[motion_mask] += [15, 15, 15]
+            self.ultra_long_exposure_canvas = np.clip(self.ultra_long_exposure_canvas, 0, 255)
+
+        trails = np.clip(self.ultra_long_exposure_canvas, 0, 255).astype(np.uint8)
+        return cv2.add(frame, trails)
+
+    def bucket_overlay(self, frame, frame_delta):
+        x1, y1, x2, y2 = self.engine.goal_region
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        bucket_width = (x2 - x1) / NUM_BUCKETS
+
+        glow_levels = self.engine.glow_levels()
+        for i in range(NUM_BUCKETS):
+            if glow_levels[i] > 0:
+                glow_intensity = glow_levels[i] * 0.5
+                bucket_x1 = int(x1 + i * bucket_width)
+                bucket_x2 = int(x1 + (i + 1) * bucket_width)
+                overlay = frame.copy()
+                cv2.rectangle(overlay, (bucket_x1, y1), (bucket_x2, y2), (0, 255, 255), -1)
+                alpha = 0.3 * glow_intensity
+                cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
+            if i > 0:
+                x = int(x1 + i * bucket_width)
+                cv2.line(frame, (x, y1), (x, y2), (0, 255, 0), 1)
+
+        line_y = int(round(self.engine.get_scoring_line_y()))
+        cv2.line(frame, (x1, line_y), (x2, line_y), (0, 200, 255), 1, cv2.LINE_AA)
+
+        for i in range(NUM_BUCKETS):
+            label = str(i + 1)
+            text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
+            text_x = int(x1 + (i + 0.5) * bucket_width) - text_size[0] // 2
+            cv2.putText(frame, label, (text_x, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                        (0, 255, 0), 1, cv2.LINE_AA)
+        return frame
+
+
+def current_trails(engine):
+    def run(frame, frame_delta):
+        engine.update_trails(frame, frame_delta)
+        return engine.apply_trails(frame)
+    return run
+
+
+def current_long_exposure(engine):
+    def run(frame, frame_delta):
+        engine.update_long_exposure(frame)
+        return engine.apply_long_exposure(frame)
+    return run
+
+
+def current_ultra_long_exposure(engine):
+    def run(frame, frame_delta):
+        engine.update_ultra_long_exposure(frame, frame_delta)
+        return engine.apply_ultra_long_exposure(frame)
+    return run
+
+
+def current_bucket_overlay(engine):
+    def run(frame, frame_delta):
+        return engine.draw_bucket_overlay(frame)
+    return run
+
+
+MODES = [
+    ("Motion Trails", lambda legacy: legacy.trails, current_trails),
+    ("Long Exposure", lambda legacy: legacy.long_exposure, current_long_exposure),
+    ("Ultra-Long Exposure", lambda legacy: legacy.ultra_long_exposure, current_ultra_long_exposure),
+    ("Bucket Overlay (burst)", lambda legacy: legacy.bucket_overlay, current_bucket_overlay),
+]
+
+
+def run_mode(frames, deltas, step, repeat):
+    """Best-of-`repeat` ms/frame, bytes allocated per frame, and the last output."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame, delta in zip(frames, deltas):
+            out = step(frame.copy(), delta)
+        best = min(best, (time.perf_counter() - start) / len(frames))
+
+    # Heap traffic of one more pass at steady state (frame copies excluded)
+    tracemalloc.start()
+    allocated = 0
+    for frame, delta in zip(frames, deltas):
+        work = frame.copy()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        out = step(work, delta)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return best * 1000.0, allocated / len(frames), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark visualization modes")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Generating {args.frames} frames at {args.width}x{args.height}...")
+    frames, goal_region, _ = make_frames(args.width, args.height, args.frames, drop_rate=0.5)
+
+    def make_engine():
+        # Every bucket glowing at full strength: the worst case for the overlay
+        engine = GaltonEngine()
+        engine.goal_region = goal_region
+        engine.glow_until_ms[:] = GLOW_DURATION_MS
+        return engine
+
+    preprocessor = FramePreprocessor(TRAIL_BLUR_SIZE)
+    deltas = [preprocessor.process(frame) for frame in frames]
+    deltas = [None if d is None else d.copy() for d in deltas]
+
+    print(f"\n{'Mode':<22} {'Impl':<9} {'ms/frame':>9} {'speedup':>8} {'KB alloc/frame':>15} {'max diff':>9}")
+    print("-" * 77)
+    for name, make_legacy, make_current in MODES:
+        legacy_ms, legacy_bytes, legacy_out = run_mode(
+            frames, deltas, make_legacy(LegacyVisuals(make_engine())), args.repeat)
+        current_ms, current_bytes, current_out = run_mode(
+            frames, deltas, make_current(make_engine()), args.repeat)
+        diff = int(cv2.absdiff(legacy_out, current_out).max())
+
+        print(f"{name:<22} {'original':<9} {legacy_ms:>9.2f} {'':>8} {legacy_bytes / 1024:>15.1f} {'':>9}")
+        print(f"{'':<22} {'current':<9} {current_ms:>9.2f} {legacy_ms / current_ms:>7.2f}x "
+              f"{current_bytes / 1024:>15.1f} {diff:>9}")
+
+
+if __name__ == "__main__":
+    main()
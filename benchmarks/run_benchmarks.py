@@ -0,0 +1,327 @@
+"""
+Detection accuracy and throughput benchmark
+-------------------------------------------
+Runs every detection configuration (engine x counting mode x Settings
+preset, optionally at several detection scales) over labelled clips from
+galton_simulator.py and reports, per run:
+
+- precision and recall per bucket and overall: a hit matches a ball that
+  landed in the same bucket and crossed the scoring line within
+  --tolerance seconds of it
+- throughput (frames per second of GaltonEngine.process, decode excluded)
+  and per-frame latency percentiles
+- peak RSS of the process that ran it (each run gets a fresh process)
+
+Results are written as JSON. --compare checks them against an earlier
+JSON file and flags accuracy, speed and memory regressions (exit status 1).
+
+Clips are rendered once into --clips and reused; delete them to re-render.
+
+Usage:
+  python benchmarks/run_benchmarks.py
+  python benchmarks/run_benchmarks.py --duration 10 --scenarios clean,busy --presets standard
+  python benchmarks/run_benchmarks.py --output new.json --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from galton_engine import (  # noqa: E402
+    GaltonEngine, VideoFileSource, DETECTION_ENGINES, COUNTING_MODES, DETECTION_PRESETS, NUM_BUCKETS
+)
+from galton_simulator import GaltonSimulator, write_labels, load_labels  # noqa: E402
+
+# Labelled clip scenarios (galton_simulator settings)
+SCENARIOS = {
+    "clean": dict(rate=2.0, noise=1.0, drift=0.0),
+    "noisy": dict(rate=2.0, noise=8.0, drift=0.1),
+    "busy": dict(rate=6.0, noise=3.0, drift=0.1),
+    "lighting": dict(rate=2.0, noise=3.0, drift=0.3),
+}
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def render_clips(args):
+    """Render any missing scenario clips; returns {name: clip info}."""
+    os.makedirs(args.clips, exist_ok=True)
+    clips = {}
+    for name in args.scenarios:
+        settings = dict(width=args.width, height=args.height, fps=args.fps,
+                        duration=args.duration, seed=args.seed, **SCENARIOS[name])
+        base = os.path.join(args.clips, f"{name}_{args.width}x{args.height}_{args.fps:g}fps_"
+                                        f"{args.duration:g}s_seed{args.seed}")
+        path, truth = base + ".mp4", base + "_truth.csv"
+        simulator = GaltonSimulator(**settings)
+        if not (os.path.exists(path) and os.path.exists(truth)):
+            print(f"Rendering {name} clip ({simulator.num_frames} frames)...", flush=True)
+            write_labels(truth, simulator.write_video(path))
+        clips[name] = {
+            "path": path,
+            "truth": truth,
+            "goal_region": list(simulator.goal_region),
+            "settings": settings,
+            "balls": len(load_labels(truth)),
+        }
+    return clips
+
+
+def make_configs(args):
+    """Every combination of engine, counting mode, preset and scale."""
+    configs = []
+    for engine in args.engines:
+        for mode in args.modes:
+            for preset in args.presets:
+                for scale in args.scales:
+                    cooldown, threshold, min_area = DETECTION_PRESETS[preset]
+                    name = f"{engine}/{mode}/{preset}" + (f"@{scale:g}" if scale != 1.0 else "")
+                    configs.append((name, {
+                        "detection_engine": engine,
+                        "counting_mode": mode,
+                        "cooldown_ms": cooldown,
+                        "motion_threshold": threshold,
+                        "min_contour_area": min_area,
+                        "detection_scale": scale,
+                    }))
+    return configs
+
+
+def match_hits(events, labels, tolerance):
+    """Match hits to ground truth; returns per-bucket (matched, hits, balls).
+
+    Each hit is paired with the nearest unmatched ball in the same bucket
+    that crossed the scoring line within `tolerance` seconds.
+    """
+    matched = [0] * NUM_BUCKETS
+    hits = [0] * NUM_BUCKETS
+    balls = [0] * NUM_BUCKETS
+    unmatched = {}
+    for label in labels:
+        balls[label.bucket] += 1
+        unmatched.setdefault(label.bucket, []).append(label.timestamp)
+    for timestamp, bucket in sorted(events):
+        hits[bucket] += 1
+        candidates = unmatched.get(bucket, [])
+        if candidates:
+            nearest = min(range(len(candidates)), key=lambda i: abs(candidates[i] - timestamp))
+            if abs(candidates[nearest] - timestamp) <= tolerance:
+                matched[bucket] += 1
+                candidates.pop(nearest)
+    return matched, hits, balls
+
+
+def ratio(numerator, denominator):
+    return numerator / denominator if denominator else None
+
+
+def run_case(case):
+    """Run one configuration over one clip (in its own worker process)."""
+    name, config, clip_name, clip, tolerance = case
+    cv2.setNumThreads(1)
+    engine = GaltonEngine()
+    engine.apply_config(dict(config, goal_region=clip["goal_region"]))
+    engine.trail_mode = 0
+    engine.show_bucket_overlay = False
+
+    events = []
+    latencies = []
+    source = VideoFileSource(clip["path"])
+    source.start()
+    try:
+        for buffer, meta in source.frames():
+            start = time.perf_counter()
+            hits = engine.process(buffer, meta)
+            latencies.append(time.perf_counter() - start)
+            buffer.release()
+            events.extend((meta.timestamp, bucket) for bucket in hits)
+    finally:
+        source.stop()
+
+    matched, hits, balls = match_hits(events, load_labels(clip["truth"]), tolerance)
+    latencies = np.array(latencies) * 1000.0
+    precision = ratio(sum(matched), sum(hits))
+    recall = ratio(sum(matched), sum(balls))
+    return {
+        "config": name,
+        "settings": config,
+        "clip": clip_name,
+        "frames": len(latencies),
+        "balls": sum(balls),
+        "hits": sum(hits),
+        "precision": precision,
+        "recall": recall,
+        "f1": ratio(2 * precision * recall, precision + recall) if precision and recall else None,
+        "fps": len(latencies) / (latencies.sum() / 1000.0),
+        "latency_ms": dict({f"p{p}": float(np.percentile(latencies, p)) for p in LATENCY_PERCENTILES},
+                           mean=float(latencies.mean()), max=float(latencies.max())),
+        "peak_rss_mb": peak_rss_mb(),
+        "buckets": [
+            {"bucket": i + 1, "balls": balls[i], "hits": hits[i], "matched": matched[i],
+             "precision": ratio(matched[i], hits[i]), "recall": ratio(matched[i], balls[i])}
+            for i in range(NUM_BUCKETS)
+        ],
+    }
+
+
+def fmt(value, spec=".3f"):
+    return "-" if value is None else format(value, spec)
+
+
+def print_results(results):
+    print(f"\n{'Config':<36} {'Clip':<9} {'Balls':>5} {'Hits':>5} {'Prec':>6} {'Recall':>6} "
+          f"{'fps':>7} {'p50 ms':>7} {'p99 ms':>7} {'RSS MB':>7}")
+    print("-" * 108)
+    for r in results:
+        print(f"{r['config']:<36} {r['clip']:<9} {r['balls']:>5} {r['hits']:>5} "
+              f"{fmt(r['precision']):>6} {fmt(r['recall']):>6} {r['fps']:>7.0f} "
+              f"{r['latency_ms']['p50']:>7.2f} {r['latency_ms']['p99']:>7.2f} "
+              f"{fmt(r['peak_rss_mb'], '.0f'):>7}")
+
+
+def print_bucket_detail(results):
+    """Per-bucket recall/precision for each run, as compact rows."""
+    print(f"\nPer-bucket recall / precision (buckets 1-{NUM_BUCKETS}, '-' = no balls or hits)")
+    for r in results:
+        recall = " ".join(fmt(b["recall"], ".2f").rjust(4) for b in r["buckets"])
+        precision = " ".join(fmt(b["precision"], ".2f").rjust(4) for b in r["buckets"])
+        print(f"{r['config']:<36} {r['clip']:<9} R {recall}")
+        print(f"{'':<46} P {precision}")
+
+
+def compare(results, baseline, args):
+    """Regressions of results against a baseline run, as printable strings."""
+    previous = {(r["config"], r["clip"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get((r["config"], r["clip"]))
+        if old is None:
+            continue
+        label = f"{r['config']} on {r['clip']}"
+        if old["balls"] != r["balls"]:
+            regressions.append(f"{label}: clip differs from baseline "
+                               f"({old['balls']} balls, now {r['balls']})")
+            continue
+        for key in ("precision", "recall"):
+            if old[key] is not None and (r[key] or 0.0) < old[key] - args.max_accuracy_drop:
+                regressions.append(f"{label}: {key} {old[key]:.3f} -> {fmt(r[key])}")
+        if r["fps"] < old["fps"] * (1 - args.max_slowdown):
+            regressions.append(f"{label}: fps {old['fps']:.0f} -> {r['fps']:.0f}")
+        if r["latency_ms"]["p99"] > old["latency_ms"]["p99"] * (1 + args.max_slowdown):
+            regressions.append(f"{label}: p99 latency {old['latency_ms']['p99']:.2f} -> "
+                               f"{r['latency_ms']['p99']:.2f} ms")
+        if (old["peak_rss_mb"] and r["peak_rss_mb"]
+                and r["peak_rss_mb"] > old["peak_rss_mb"] * (1 + args.max_memory_growth)):
+            regressions.append(f"{label}: peak RSS {old['peak_rss_mb']:.0f} -> "
+                               f"{r['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def split_list(value):
+    return [item for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detection accuracy and throughput")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per clip")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clips", default=os.path.join(tempfile.gettempdir(), "galton_bench_clips"),
+                        help="Where rendered clips are kept (default: %(default)s)")
+    parser.add_argument("--scenarios", type=split_list, default=list(SCENARIOS),
+                        help="Comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--engines", type=split_list, default=[e.key for e in DETECTION_ENGINES])
+    parser.add_argument("--modes", type=split_list, default=[key for key, _ in COUNTING_MODES])
+    parser.add_argument("--presets", type=split_list, default=list(DETECTION_PRESETS))
+    parser.add_argument("--scales", type=lambda v: [float(s) for s in split_list(v)], default=[1.0],
+                        help="Detection scales, e.g. 1.0,0.5")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Max seconds between a hit and the ball crossing the scoring line")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Parallel runs (more than 1 skews fps and latency)")
+    parser.add_argument("--output", help="Results JSON (default: galton_benchmark_<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to check for regressions")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02,
+                        help="Allowed drop in precision or recall (default: %(default)s)")
+    parser.add_argument("--max-slowdown", type=float, default=0.15,
+                        help="Allowed fractional fps drop / p99 latency rise (default: %(default)s)")
+    parser.add_argument("--max-memory-growth", type=float, default=0.2,
+                        help="Allowed fractional peak RSS growth (default: %(default)s)")
+    args = parser.parse_args()
+
+    clips = render_clips(args)
+    configs = make_configs(args)
+    cases = [(name, config, clip_name, clip, args.tolerance)
+             for clip_name, clip in clips.items() for name, config in configs]
+    print(f"Running {len(configs)} configurations on {len(clips)} clips...", flush=True)
+
+    start = time.perf_counter()
+    # A fresh process per run, so each gets its own peak RSS
+    with Pool(args.workers, maxtasksperchild=1) as pool:
+        results = pool.map(run_case, cases, chunksize=1)
+    elapsed = time.perf_counter() - start
+
+    print_results(results)
+    print_bucket_detail(results)
+
+    output = args.output or f"galton_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+            "tolerance": args.tolerance,
+            "clips": {name: {k: v for k, v in clip.items() if k not in ("path", "truth")}
+                      for name, clip in clips.items()},
+            "results": results,
+        }, f, indent=2)
+    print(f"\n{len(results)} runs in {elapsed:.0f} s. Results: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.compare}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -315,23 +315,24 @@ def create_ultra_mode_mockup():
 
     return canvas
 
-# Generate all mockups
-print("Generating UI mockups...")
-
-mockup1 = create_main_window_mockup()
-cv2.imwrite("E:/projects/GaltonGoalieViz/mockup_main_window.png", mockup1)
-print("[OK] Main window mockup saved")
-
-mockup2 = create_calibration_mockup()
-cv2.imwrite("E:/projects/GaltonGoalieViz/mockup_calibration.png", mockup2)
-print("[OK] Calibration mockup saved")
-
-mockup3 = create_ultra_mode_mockup()
-cv2.imwrite("E:/projects/GaltonGoalieViz/mockup_ultra_mode.png", mockup3)
-print("[OK] Ultra-long exposure mode mockup saved")
-
-print("\nAll mockups generated successfully!")
-print("Check the project folder for:")
-print("  - mockup_main_window.png")
-print("  - mockup_calibration.png")
-print("  - mockup_ultra_mode.png")
+if __name__ == "__main__":
+    # Generate all mockups
+    print("Generating UI mockups...")
+
+    mockup1 = create_main_window_mockup()
+    cv2.imwrite("E:/projects/GaltonGoalieViz/mockup_main_window.png", mockup1)
+    print("[OK] Main window mockup saved")
+
+    mockup2 = create_calibration_mockup()
+    cv2.imwrite("E:/projects/GaltonGoalieViz/mockup_calibration.png", mockup2)
+    print("[OK] Calibration mockup saved")
+
+    mockup3 = create_ultra_mode_mockup()
+    cv2.imwrite("E:/projects/GaltonGoalieViz/mockup_ultra_mode.png", mockup3)
+    print("[OK] Ultra-long exposure mode mockup saved")
+
+    print("\nAll mockups generated successfully!")
+    print("Check the project folder for:")
+    print("  - mockup_main_window.png")
+    print("  - mockup_calibration.png")
+    print("  - mockup_ultra_mode.png")
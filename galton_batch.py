@@ -0,0 +1,268 @@
+"""
+Galton's Goalie - Batch Counter
+===============================
+Counts every recording in a directory in parallel, one worker process per
+core, and merges the results into a combined histogram and report.
+
+Each file is split into time chunks so a single long recording also
+spreads across cores. A chunk starts decoding `--overlap` seconds early
+to warm up the frame delta, background model and ball tracker; hits in
+that warm-up are discarded. In bucket cooldown mode the workers detect
+with the cooldown switched off and the cooldown is applied afterwards,
+across chunk boundaries, so chunked counts match a single sequential pass.
+
+Usage:
+  python galton_batch.py recordings/
+  python galton_batch.py recordings/ --chunk 30 --workers 4 --events all_hits.csv
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from galton_engine import (
+    GaltonEngine, VideoFileSource, load_config, CONFIG_FILE, NUM_BUCKETS
+)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+DEFAULT_CHUNK_SECONDS = 60.0
+DEFAULT_OVERLAP_SECONDS = 2.0  # Longer than a ball's trip through the goal region
+REPORT_FILE = "galton_batch_report.csv"
+
+
+def find_videos(directory):
+    """Video files directly inside directory, sorted by name."""
+    return sorted(path for path in glob.glob(os.path.join(directory, "*"))
+                  if path.lower().endswith(VIDEO_EXTENSIONS))
+
+
+def plan_chunks(path, chunk_seconds, overlap_seconds):
+    """Split a video into (path, warmup_start, start, end) frame ranges.
+
+    The last chunk has end None and reads to the end of the file, since
+    container frame counts are not always exact.
+    """
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    chunk = max(1, int(round(chunk_seconds * fps)))
+    overlap = int(round(overlap_seconds * fps))
+    chunks = []
+    for start in range(0, max(frame_count, 1), chunk):
+        end = start + chunk if start + chunk < frame_count else None
+        chunks.append((path, max(0, start - overlap), start, end))
+    return chunks
+
+
+def init_worker():
+    """One OpenCV thread per worker process; the pool already fills the cores."""
+    cv2.setNumThreads(1)
+
+
+def process_chunk(chunk, config):
+    """Detect hits in one chunk of a video (runs in a worker process).
+
+    Returns a dict with the events [(frame, video time, buckets), ...] for
+    frames from start on, plus frame and timing counters. In cooldown mode
+    the events are raw per-frame detections, before any cooldown.
+    """
+    path, warmup_start, start, end = chunk
+    engine = GaltonEngine()
+    engine.apply_config(config)
+    engine.trail_mode = 0
+    engine.show_bucket_overlay = False
+    if engine.counting_mode == "cooldown":
+        engine.cooldown_ms = 0  # Applied across chunks by resolve_cooldowns
+
+    events = []
+    begin = time.perf_counter()
+    source = VideoFileSource(path, warmup_start, end)
+    source.start()
+    try:
+        for buffer, meta in source.frames():
+            hits = engine.process(buffer, meta)
+            buffer.release()
+            if hits and meta.seq >= start:
+                events.append((meta.seq, meta.timestamp, hits))
+    finally:
+        source.stop()
+
+    return {
+        "path": path,
+        "start": start,
+        "frames": max(0, source.frames_decoded - (start - warmup_start)),
+        "fps": source.fps,
+        "events": events,
+        "decode_seconds": source.decode_seconds,
+        "seconds": time.perf_counter() - begin,
+    }
+
+
+def resolve_cooldowns(events, cooldown_ms):
+    """Apply the per-bucket cooldown to raw detections, in frame order.
+
+    Same rule as GaltonEngine.detect_ball: a bucket counts when its
+    cooldown has expired, and each hit restarts it.
+    """
+    cooldown_until_ms = np.zeros(NUM_BUCKETS, dtype=np.float64)
+    resolved = []
+    for frame, timestamp, buckets in events:
+        now_ms = timestamp * 1000.0
+        hits = [b for b in buckets if cooldown_until_ms[b] <= now_ms]
+        cooldown_until_ms[hits] = now_ms + cooldown_ms
+        if hits:
+            resolved.append((frame, timestamp, hits))
+    return resolved
+
+
+def merge_file(results, counting_mode, cooldown_ms):
+    """Combine one file's chunk results into its event list and totals."""
+    results = sorted(results, key=lambda r: r["start"])
+    events = [event for result in results for event in result["events"]]
+    if counting_mode == "cooldown":
+        events = resolve_cooldowns(events, cooldown_ms)
+
+    counts = [0] * NUM_BUCKETS
+    for _, _, buckets in events:
+        for bucket in buckets:
+            counts[bucket] += 1
+    frames = sum(r["frames"] for r in results)
+    return {
+        "counts": counts,
+        "events": events,
+        "frames": frames,
+        "video_seconds": frames / results[0]["fps"],
+        "cpu_seconds": sum(r["seconds"] for r in results),
+    }
+
+
+def histogram_stats(counts):
+    """Mean and standard deviation of bucket positions (1-based)."""
+    total = sum(counts)
+    if total == 0:
+        return 0.0, 0.0
+    buckets = np.arange(1, NUM_BUCKETS + 1)
+    mean = float(np.dot(buckets, counts) / total)
+    std = float(np.sqrt(np.dot((buckets - mean) ** 2, counts) / total))
+    return mean, std
+
+
+def write_report(filename, files, combined):
+    """Per-file and combined counts as CSV."""
+    with open(filename, 'w') as f:
+        f.write("File,Frames,VideoSeconds,Total,Mean,StdDev,"
+                + ",".join(f"Bucket{i + 1}" for i in range(NUM_BUCKETS)) + "\n")
+        for name, summary in list(files.items()) + [("ALL", combined)]:
+            mean, std = histogram_stats(summary["counts"])
+            f.write(f"{name},{summary['frames']},{summary['video_seconds']:.1f},"
+                    f"{sum(summary['counts'])},{mean:.3f},{std:.3f},"
+                    + ",".join(str(c) for c in summary["counts"]) + "\n")
+
+
+def write_events(filename, files):
+    """Every hit of every file as CSV."""
+    with open(filename, 'w') as f:
+        f.write("File,Frame,VideoTime,Bucket\n")
+        for name, summary in files.items():
+            for frame, timestamp, buckets in summary["events"]:
+                for bucket in buckets:
+                    f.write(f"{name},{frame},{timestamp:.3f},{bucket + 1}\n")
+
+
+def print_summary(files, combined, elapsed, workers):
+    """Per-file totals and the combined histogram."""
+    print(f"\n{'File':<40} {'Frames':>8} {'Video s':>9} {'Hits':>6}")
+    print("-" * 66)
+    for name, summary in files.items():
+        print(f"{name:<40} {summary['frames']:>8} {summary['video_seconds']:>9.1f} "
+              f"{sum(summary['counts']):>6}")
+
+    counts = combined["counts"]
+    total = sum(counts)
+    mean, std = histogram_stats(counts)
+    print(f"\nCombined histogram (n={total}, mean={mean:.2f}, std dev={std:.2f})")
+    peak = max(max(counts), 1)
+    for i, count in enumerate(counts):
+        print(f"{i + 1:>3} {count:>7}  {'#' * int(round(40 * count / peak))}")
+
+    video_seconds = combined["video_seconds"]
+    print(f"\n{combined['frames']} frames ({video_seconds / 60:.1f} min of video) in "
+          f"{elapsed:.1f} s with {workers} workers: {video_seconds / max(elapsed, 1e-6):.1f}x realtime, "
+          f"{combined['frames'] / max(elapsed, 1e-6):.0f} fps "
+          f"(parallel speedup {combined['cpu_seconds'] / max(elapsed, 1e-6):.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count every recording in a directory in parallel")
+    parser.add_argument("directory", help="Directory of recordings")
+    parser.add_argument("--config", default=CONFIG_FILE,
+                        help="Settings file written by the Qt app (default: %(default)s)")
+    parser.add_argument("--goal", help="Goal region as x1,y1,x2,y2 (default: from config)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: one per core)")
+    parser.add_argument("--chunk", type=float, default=DEFAULT_CHUNK_SECONDS,
+                        help="Seconds of video per work item (default: %(default)s)")
+    parser.add_argument("--overlap", type=float, default=DEFAULT_OVERLAP_SECONDS,
+                        help="Warm-up seconds decoded before each chunk (default: %(default)s)")
+    parser.add_argument("--report", help=f"Summary CSV (default: <directory>/{REPORT_FILE})")
+    parser.add_argument("--events", help="Also write every hit of every file to this CSV")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.goal:
+        config['goal_region'] = [int(v) for v in args.goal.split(",")]
+    if not config.get('goal_region'):
+        print("No goal region: calibrate in the Qt app first or pass --goal x1,y1,x2,y2")
+        return 1
+    settings = GaltonEngine()
+    settings.apply_config(config)
+
+    videos = find_videos(args.directory)
+    if not videos:
+        print(f"No videos found in {args.directory}")
+        return 1
+    chunks = [chunk for path in videos for chunk in plan_chunks(path, args.chunk, args.overlap)]
+    print(f"{len(videos)} videos, {len(chunks)} chunks, {args.workers} workers "
+          f"({settings.counting_mode} counting, goal region {settings.goal_region})")
+
+    start = time.perf_counter()
+    results = {path: [] for path in videos}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+        futures = [pool.submit(process_chunk, chunk, config) for chunk in chunks]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[result["path"]].append(result)
+            print(f"  [{done}/{len(chunks)}] {os.path.basename(result['path'])} "
+                  f"from frame {result['start']}: {result['frames']} frames", flush=True)
+    elapsed = time.perf_counter() - start
+
+    files = {os.path.basename(path): merge_file(chunk_results, settings.counting_mode,
+                                                settings.cooldown_ms)
+             for path, chunk_results in results.items()}
+    combined = {
+        "counts": [sum(f["counts"][i] for f in files.values()) for i in range(NUM_BUCKETS)],
+        "frames": sum(f["frames"] for f in files.values()),
+        "video_seconds": sum(f["video_seconds"] for f in files.values()),
+        "cpu_seconds": sum(f["cpu_seconds"] for f in files.values()),
+    }
+
+    print_summary(files, combined, elapsed, args.workers)
+    report = args.report or os.path.join(args.directory, REPORT_FILE)
+    write_report(report, files, combined)
+    print(f"Report: {report}")
+    if args.events:
+        write_events(args.events, files)
+        print(f"Events: {args.events}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2163 @@
+"""
+Galton's Goalie - Detection Engine
+==================================
+The capture, visualization and ball detection pipeline with no UI
+dependency (OpenCV and NumPy only). The Qt app and the legacy OpenCV app
+both wrap GaltonEngine, and it runs on its own on headless machines:
+
+  python galton_engine.py                      # camera and goal region from galton_config.json
+  python galton_engine.py --camera 1 --duration 600 --event-log hits.csv
+  python galton_engine.py --video galton_recording_20250101_120000.mp4
+"""
+
+import argparse
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple, deque
+from contextlib import nullcontext
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+# Configuration
+CONFIG_FILE = "galton_config.json"
+NUM_BUCKETS = 11
+DEFAULT_COOLDOWN_MS = 667  # Per-bucket wait before counting another hit (~20 frames at 30 fps)
+GLOW_DURATION_MS = 500  # How long a bucket glows after a hit
+DEFAULT_MOTION_THRESHOLD = 30
+DEFAULT_MIN_CONTOUR_AREA = 100
+DEFAULT_TARGET_FPS = 60
+MOTION_BLUR_SIZE = 21  # Gaussian kernel for goal-region detection
+TRAIL_BLUR_SIZE = 11  # Gaussian kernel for the full-frame trail modes
+TRAIL_MOTION_THRESHOLD = 25  # Frame delta that counts as motion for trails
+ULTRA_LONG_EXPOSURE_STEP = 15  # Brightness added per frame of motion (mode 3)
+DETECTION_SCALE_CHOICES = [
+    (1.0, "Full resolution"),
+    (0.5, "Half resolution (faster)"),
+    (0.25, "Quarter resolution (fastest)"),
+]
+COUNTING_MODES = [
+    ("tracking", "Ball tracking (one hit per ball)"),
+    ("cooldown", "Bucket cooldown (classic)"),
+]
+# Settings → Detection presets: (cooldown_ms, motion_threshold, min_contour_area)
+DETECTION_PRESETS = {
+    "high": (333, 15, 50),
+    "standard": (DEFAULT_COOLDOWN_MS, DEFAULT_MOTION_THRESHOLD, DEFAULT_MIN_CONTOUR_AREA),
+    "low_noise": (1000, 50, 200),
+}
+DEFAULT_SCORING_LINE = 0.5  # Fraction of the goal region height
+MAX_TRACKS = 64  # Upper bound on simultaneously tracked balls
+TRACK_GATE = 0.5  # Max match distance, as a fraction of the goal region height
+TRACK_MAX_MISSED = 0.2  # Seconds a track survives without a matching blob
+BLOB_LOOP_LIMIT = 4  # Up to this many contours, cv2.moments per contour beats NumPy setup
+
+# Capture buffering
+RING_BUFFER_SLOTS = 3  # One being written, one latest, one being processed
+FRAME_POOL_MAX_FREE = 4  # Idle processed-frame buffers kept for reuse
+RECORDER_QUEUE_SIZE = 30  # Frames waiting for the encoder before new ones are dropped
+OFFLINE_QUEUE_SIZE = 8  # Decoded frames waiting for detection when reading a video file
+DEFAULT_REPLAY_SECONDS = 0  # Instant replay is off until turned on in Settings
+REPLAY_MAX_MB = 300  # Oldest replay frames are dropped beyond this much JPEG data
+REPLAY_FPS = 30  # Frames per second kept for the instant replay
+REPLAY_JPEG_QUALITY = 80
+REPLAY_QUEUE_SIZE = 2  # Frames waiting for the JPEG encoder before new ones are dropped
+
+# Per-stage latency instrumentation
+PROFILE_STAGES = ["read", "preprocess", "process_frame", "draw_bucket_overlay",
+                  "detect_ball", "scale_display", "display", "record"]
+HISTOGRAM_MIN_MS = 0.001  # Lower edge of the first latency bin (1 us)
+HISTOGRAM_DECADES = 7  # Bins cover 1 us .. 10 s
+HISTOGRAM_BINS_PER_DECADE = 20  # ~12% relative resolution
+DIAGNOSTICS_FILE = "galton_diagnostics.json"
+
+# Per-frame metadata assigned at grab time: capture sequence number and
+# time.monotonic() timestamp in seconds
+FrameMeta = namedtuple("FrameMeta", ["seq", "timestamp"])
+
+
+class FrameRingBuffer:
+    """Preallocated ring of frame slots that always hands out the newest frame.
+
+    The grabber writes into a free slot and publishes it as the latest frame.
+    The consumer takes the latest slot and holds it until release(). Frames
+    that are overwritten before anyone took them are counted as dropped, and
+    frames that had already aged past the grab interval when taken are
+    counted as late.
+    """
+
+    def __init__(self, num_slots=RING_BUFFER_SLOTS):
+        self.num_slots = max(3, num_slots)
+        self.slots = None
+        self.metas = [None] * self.num_slots
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.latest = -1   # Slot holding the newest unconsumed frame
+        self.reading = -1  # Slot currently held by the consumer
+        self.write_index = 0
+
+        # Statistics
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_late = 0
+        self.grab_interval = 0.0  # Smoothed seconds between grabs
+        self.last_grab_time = None
+
+    def allocate(self, shape):
+        """(Re)allocate slots for frames of the given shape."""
+        with self.condition:
+            self.slots = np.zeros((self.num_slots,) + tuple(shape), dtype=np.uint8)
+            self.latest = -1
+            self.reading = -1
+            self.write_index = 0
+
+    def next_write_slot(self):
+        """Return the index of a slot that is safe for the grabber to fill."""
+        with self.condition:
+            index = self.write_index
+            while index == self.latest or index == self.reading:
+                index = (index + 1) % self.num_slots
+            return index
+
+    def publish(self, index, timestamp):
+        """Mark a freshly written slot as the latest frame, tagging it with a FrameMeta."""
+        with self.condition:
+            if self.latest != -1:
+                self.frames_dropped += 1  # Previous frame was never processed
+            if self.last_grab_time is not None:
+                interval = timestamp - self.last_grab_time
+                if self.grab_interval > 0:
+                    self.grab_interval = 0.9 * self.grab_interval + 0.1 * interval
+                else:
+                    self.grab_interval = interval
+            self.last_grab_time = timestamp
+            self.metas[index] = FrameMeta(self.frames_captured, timestamp)
+            self.latest = index
+            self.write_index = (index + 1) % self.num_slots
+            self.frames_captured += 1
+            self.condition.notify_all()
+
+    def acquire_latest(self, timeout=None):
+        """Wait for and take the newest frame.
+
+        Returns (frame, meta), or (None, None) on timeout or close.
+        The frame is a view into the ring and stays valid until release().
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.latest != -1 or self.closed, timeout):
+                return None, None
+            if self.closed:
+                return None, None
+
+            self.reading = self.latest
+            self.latest = -1
+            meta = self.metas[self.reading]
+
+            age = time.monotonic() - meta.timestamp
+            if self.grab_interval > 0 and age > self.grab_interval:
+                self.frames_late += 1
+
+            return self.slots[self.reading], meta
+
+    def release(self):
+        """Give the slot taken by acquire_latest() back to the grabber."""
+        with self.condition:
+            self.reading = -1
+
+    def close(self):
+        """Wake up any waiting consumer and refuse further frames."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class FrameBuffer:
+    """A pooled frame array with a reference count.
+
+    Every holder calls release() once it is done with the array; the last
+    release hands it back to the pool for reuse. A buffer may carry a clean
+    (overlay-free) copy of itself and a copy scaled for display, which are
+    released along with it.
+    """
+
+    __slots__ = ("array", "pool", "refcount", "clean", "display")
+
+    def __init__(self, array, pool):
+        self.array = array
+        self.pool = pool
+        self.refcount = 0
+        self.clean = None
+        self.display = None
+
+    def retain(self):
+        """Take another reference to the buffer."""
+        with self.pool.lock:
+            self.refcount += 1
+        return self
+
+    def release(self):
+        """Drop a reference; the buffer returns to its pool at zero."""
+        self.pool.release(self)
+
+
+class FrameBufferPool:
+    """Recycles FrameBuffers so processed frames are not reallocated.
+
+    Buffers are handed out with one reference. Only the copies the pool
+    makes itself (copy_from) are counted in bytes_copied.
+    """
+
+    def __init__(self, max_free=FRAME_POOL_MAX_FREE):
+        self.max_free = max_free  # Per frame shape
+        self.lock = threading.Lock()
+        self.free = {}  # Shape -> idle buffers
+
+        # Statistics
+        self.buffers_allocated = 0
+        self.bytes_copied = 0
+
+    def acquire(self, shape):
+        """Return a buffer of the given shape holding one reference."""
+        shape = tuple(shape)
+        with self.lock:
+            free = self.free.get(shape)
+            if free:
+                buffer = free.pop()
+            else:
+                buffer = FrameBuffer(np.empty(shape, dtype=np.uint8), self)
+                self.buffers_allocated += 1
+            buffer.refcount = 1
+        return buffer
+
+    def copy_from(self, frame, flip=False):
+        """Return a pooled copy of frame, optionally mirrored horizontally."""
+        buffer = self.acquire(frame.shape)
+        if flip:
+            cv2.flip(frame, 1, dst=buffer.array)
+        else:
+            np.copyto(buffer.array, frame)
+        with self.lock:
+            self.bytes_copied += frame.nbytes
+        return buffer
+
+    def release(self, buffer):
+        """Drop one reference to buffer, recycling it when none remain."""
+        with self.lock:
+            buffer.refcount -= 1
+            if buffer.refcount > 0:
+                return
+            attached = (buffer.clean, buffer.display)
+            buffer.clean = buffer.display = None
+            free = self.free.setdefault(buffer.array.shape, [])
+            if len(free) < self.max_free:
+                free.append(buffer)
+        for attachment in attached:
+            if attachment is not None:
+                attachment.release()
+
+
+class FrameMailbox:
+    """Latest-wins handoff of processed frames from VideoThread to the UI.
+
+    post() replaces any frame the UI has not picked up yet (releasing it and
+    counting it as skipped), so at most one frame is ever waiting and at
+    most one frame_ready signal is ever queued.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffer = None
+        self.meta = None
+
+        # Statistics
+        self.frames_posted = 0
+        self.frames_skipped = 0  # Processed but replaced before display
+
+    def post(self, buffer, meta):
+        """Leave a frame for the UI; returns True if the UI needs notifying."""
+        with self.lock:
+            stale = self.buffer
+            self.buffer = buffer
+            self.meta = meta
+            self.frames_posted += 1
+            if stale is not None:
+                self.frames_skipped += 1
+        if stale is not None:
+            stale.release()
+            return False  # A notification for the old frame is still queued
+        return True
+
+    def take(self):
+        """Take the newest frame as (buffer, meta), or (None, None) if there is none."""
+        with self.lock:
+            buffer, meta = self.buffer, self.meta
+            self.buffer = self.meta = None
+        return buffer, meta
+
+
+class FrameGrabber(threading.Thread):
+    """Capture thread that keeps reading the camera into a FrameRingBuffer."""
+
+    def __init__(self, cap, ring_buffer, profiler=None):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.ring_buffer = ring_buffer
+        self.profiler = profiler or StageProfiler()
+        self.running = False
+
+    def run(self):
+        """Grab frames as fast as the camera delivers them."""
+        self.running = True
+        while self.running:
+            ring = self.ring_buffer
+            if ring.slots is None:
+                with self.profiler.measure("read"):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    time.sleep(0.016)
+                    continue
+                ring.allocate(frame.shape)
+                index = ring.next_write_slot()
+                ring.slots[index] = frame
+            else:
+                index = ring.next_write_slot()
+                slot = ring.slots[index]
+                with self.profiler.measure("read"):
+                    ret, frame = self.cap.read(slot)
+                if not ret:
+                    time.sleep(0.016)
+                    continue
+                if frame is not slot:
+                    if frame.shape != slot.shape:
+                        # Camera changed resolution; start over with new slots
+                        ring.allocate(frame.shape)
+                        index = ring.next_write_slot()
+                        ring.slots[index] = frame
+                    else:
+                        # Backend returned its own array instead of filling ours
+                        np.copyto(slot, frame)
+
+            ring.publish(index, time.monotonic())
+
+    def stop(self):
+        """Stop grabbing and wait for the thread to exit."""
+        self.running = False
+        self.join(timeout=1.0)
+
+
+class VideoFileSource(threading.Thread):
+    """Decodes a video file on its own thread, as fast as it can.
+
+    Frames are decoded straight into pooled buffers and handed over through
+    a bounded queue, so decoding the next frames overlaps detection on the
+    current one and memory stays at queue_size frames. Timestamps come from
+    the frame index and the file's frame rate, not the wall clock.
+    """
+
+    def __init__(self, path, start_frame=0, end_frame=None, queue_size=OFFLINE_QUEUE_SIZE):
+        super().__init__(daemon=True)
+        self.path = path
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.pool = FrameBufferPool(max_free=queue_size + 2)
+        self.running = False
+
+        cap = cv2.VideoCapture(path)
+        self.opened = cap.isOpened()
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        # Statistics
+        self.frames_decoded = 0
+        self.decode_seconds = 0.0
+
+    def run(self):
+        """Decode frames into the queue until the end (or end_frame)."""
+        self.running = True
+        cap = cv2.VideoCapture(self.path)
+        if self.start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        index = self.start_frame
+        shape = None
+        try:
+            while self.running and (self.end_frame is None or index < self.end_frame):
+                start = time.perf_counter()
+                if shape is None:
+                    ret, frame = cap.read()
+                    buffer = self.pool.copy_from(frame) if ret else None
+                else:
+                    buffer = self.pool.acquire(shape)
+                    ret, frame = cap.read(buffer.array)
+                    if ret and frame is not buffer.array:
+                        buffer.release()  # Size changed mid-file
+                        buffer = self.pool.copy_from(frame)
+                if not ret:
+                    if buffer is not None:
+                        buffer.release()
+                    break
+                shape = buffer.array.shape
+                self.decode_seconds += time.perf_counter() - start
+                self.frames_decoded += 1
+
+                self.queue.put((buffer, FrameMeta(index, index / self.fps)))
+                index += 1
+        finally:
+            cap.release()
+            self.queue.put(None)
+
+    def frames(self):
+        """Yield (buffer, meta) in file order; the caller releases each buffer."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            yield item
+
+    def stop(self):
+        """Stop decoding and drop anything still queued."""
+        self.running = False
+        while self.is_alive():
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is not None:
+                item[0].release()
+        self.join()
+
+
+class VideoRecorder(threading.Thread):
+    """Encodes a recording on its own thread, fed by a bounded queue.
+
+    submit() never blocks the caller. Drop policy: when the queue is full
+    the incoming frame is dropped and the queued ones are kept, so the file
+    stays in order; hits logged for a dropped frame move to the next frame
+    that is queued. Also writes the per-frame sidecar CSV log. close()
+    flushes everything still queued before finalising the file.
+
+    With timed=True frames are placed by capture timestamp instead of one
+    after another: a frame is repeated to fill the gap since the previous
+    one and a frame ahead of its slot is skipped, so the file plays back in
+    real time however irregularly frames arrive (full-UI recordings only
+    get the frames the UI drew).
+    """
+
+    def __init__(self, filename, fourcc, fps, size, log_filename=None,
+                 queue_size=RECORDER_QUEUE_SIZE, timed=False):
+        super().__init__(daemon=True)
+        self.filename = filename
+        self.fps = fps
+        self.timed = timed
+        self.start_timestamp = None  # Capture time of the first frame (timed)
+        self.writer = cv2.VideoWriter(filename, fourcc, fps, size)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.carried_hits = []  # Hits of dropped frames, logged with the next one
+
+        self.log = None
+        if log_filename and self.writer.isOpened():
+            try:
+                self.log = open(log_filename, 'w')
+                self.log.write("VideoFrame,Seq,CaptureTime,LatencyMs,Hits\n")
+            except OSError as e:
+                print(f"Could not create frame log: {e}")
+
+        # Statistics
+        self.frames_enqueued = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.frames_repeated = 0  # Extra copies filling gaps (timed)
+        self.frames_skipped = 0  # Ahead of their slot (timed)
+
+    def is_opened(self):
+        """Whether the video file could be created."""
+        return self.writer.isOpened()
+
+    def submit(self, frame, meta, hits, block=False, latency_ms=None):
+        """Queue a frame (array or FrameBuffer) and its hits; returns False if dropped.
+
+        A FrameBuffer is retained until written instead of being copied, so
+        it must not be drawn on afterwards. A plain array is taken over as is.
+        With block=True the caller waits for room instead (for offline
+        writes such as the instant replay, which also pass the latency the
+        frame had when it was captured).
+        """
+        hits = self.carried_hits + hits
+        if isinstance(frame, FrameBuffer):
+            frame.retain()
+        if latency_ms is None:
+            latency_ms = (time.monotonic() - meta.timestamp) * 1000.0
+        try:
+            self.queue.put((frame, meta, latency_ms, hits), block=block)
+        except queue.Full:
+            if isinstance(frame, FrameBuffer):
+                frame.release()
+            self.carried_hits = hits
+            self.frames_dropped += 1
+            return False
+        self.carried_hits = []
+        self.frames_enqueued += 1
+        return True
+
+    def run(self):
+        """Write queued frames until close() is called."""
+        skipped_hits = []  # Hits of skipped frames, logged with the next one written
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, meta, latency_ms, hits = item
+            image = frame.array if isinstance(frame, FrameBuffer) else frame
+
+            copies = 1
+            if self.timed:
+                if self.start_timestamp is None:
+                    self.start_timestamp = meta.timestamp
+                slot = int(round((meta.timestamp - self.start_timestamp) * self.fps))
+                copies = slot - self.frames_written + 1
+
+            if copies <= 0:
+                skipped_hits += hits
+                self.frames_skipped += 1
+            else:
+                hits, skipped_hits = skipped_hits + hits, []
+                for copy in range(copies):
+                    self.writer.write(image)
+                    if self.log is not None:
+                        logged = hits if copy == 0 else []
+                        self.log.write(f"{self.frames_written},{meta.seq},{meta.timestamp:.6f},"
+                                       f"{latency_ms:.1f},{' '.join(str(b + 1) for b in logged)}\n")
+                    self.frames_written += 1
+                self.frames_repeated += copies - 1
+            if isinstance(frame, FrameBuffer):
+                frame.release()
+
+        self.writer.release()
+        if self.log is not None:
+            self.log.close()
+
+    def close(self):
+        """Flush the queue, then release the writer and close the log."""
+        if self.is_alive():
+            self.queue.put(None)  # Waits for room if the queue is full
+            self.join()
+        else:
+            self.writer.release()
+            if self.log is not None:
+                self.log.close()
+
+
+class ReplayBuffer(threading.Thread):
+    """Keeps the last few seconds of processed frames for an instant replay.
+
+    Frames are sampled down to REPLAY_FPS and JPEG-encoded on this thread,
+    so the buffer holds compressed frames only and is trimmed to `seconds`
+    and to max_bytes, whichever is reached first. submit() never blocks:
+    when the encoder is still busy the frame is dropped, which bounds the
+    encode CPU to one core at most. Hits are kept alongside the frames so
+    save() can write them to the sidecar log of the replay video.
+    """
+
+    def __init__(self, seconds, max_bytes=REPLAY_MAX_MB * 1024 * 1024,
+                 fps=REPLAY_FPS, quality=REPLAY_JPEG_QUALITY, queue_size=REPLAY_QUEUE_SIZE):
+        super().__init__(daemon=True)
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.interval = 1.0 / fps
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.frames = deque()  # (meta, latency_ms, jpeg)
+        self.events = deque()  # (seq, buckets)
+        self.shape = None
+        self.last_timestamp = None
+        self.bytes_held = 0
+
+        # Statistics
+        self.started = time.monotonic()
+        self.frames_encoded = 0
+        self.frames_dropped = 0  # Encoder still busy
+        self.frames_evicted = 0  # Aged out or over the memory cap
+        self.encode_seconds = 0.0
+
+    def submit(self, frame, meta):
+        """Offer a processed FrameBuffer to the buffer; returns False if not taken."""
+        if self.last_timestamp is not None and \
+                meta.timestamp - self.last_timestamp < self.interval * 0.9:
+            return False
+        self.last_timestamp = meta.timestamp
+        latency_ms = (time.monotonic() - meta.timestamp) * 1000.0
+        frame.retain()
+        try:
+            self.queue.put_nowait((frame, meta, latency_ms))
+        except queue.Full:
+            frame.release()
+            self.frames_dropped += 1
+            return False
+        return True
+
+    def add_hits(self, meta, buckets):
+        """Remember the buckets hit on the frame with meta."""
+        with self.lock:
+            self.events.append((meta.seq, buckets))
+
+    def run(self):
+        """Encode submitted frames until close() is called."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, meta, latency_ms = item
+            start = time.perf_counter()
+            ok, jpeg = cv2.imencode(".jpg", frame.array, self.params)
+            shape = frame.array.shape
+            frame.release()
+            self.encode_seconds += time.perf_counter() - start
+            if not ok:
+                continue
+
+            with self.lock:
+                if shape != self.shape:
+                    # New camera or resolution: one video can only hold one size
+                    self.frames_evicted += len(self.frames)
+                    self.frames.clear()
+                    self.bytes_held = 0
+                    self.shape = shape
+                self.frames.append((meta, latency_ms, jpeg))
+                self.bytes_held += jpeg.nbytes
+                self.frames_encoded += 1
+                self.trim()
+
+    def trim(self):
+        """Drop the oldest frames beyond the time and memory limits (lock held)."""
+        frames = self.frames
+        while frames and (frames[-1][0].timestamp - frames[0][0].timestamp > self.seconds
+                          or self.bytes_held > self.max_bytes):
+            self.bytes_held -= frames.popleft()[2].nbytes
+            self.frames_evicted += 1
+        oldest = frames[0][0].seq if frames else float("inf")
+        while self.events and self.events[0][0] < oldest:
+            self.events.popleft()
+
+    def set_seconds(self, seconds):
+        """Change the replay length, dropping any frames that no longer fit straight away."""
+        with self.lock:
+            self.seconds = seconds
+            self.trim()
+
+    @property
+    def duration(self):
+        """Seconds of video currently held."""
+        with self.lock:
+            if len(self.frames) < 2:
+                return 0.0
+            return self.frames[-1][0].timestamp - self.frames[0][0].timestamp
+
+    @property
+    def encode_ms_per_frame(self):
+        """Mean JPEG encode time per frame."""
+        return self.encode_seconds * 1000.0 / max(1, self.frames_encoded)
+
+    @property
+    def encode_cpu(self):
+        """Share of one core spent encoding since the buffer started."""
+        return self.encode_seconds / max(1e-6, time.monotonic() - self.started)
+
+    def stats(self):
+        """Memory and encode counters as a JSON-serialisable dict."""
+        return {
+            "seconds": round(self.duration, 1),
+            "frames": len(self.frames),
+            "bytes": self.bytes_held,
+            "frames_encoded": self.frames_encoded,
+            "frames_dropped": self.frames_dropped,
+            "frames_evicted": self.frames_evicted,
+            "encode_ms_per_frame": round(self.encode_ms_per_frame, 2),
+            "encode_cpu": round(self.encode_cpu, 3),
+        }
+
+    def save(self, filename, fourcc, log_filename=None):
+        """Write the buffered frames and their hits to a video through VideoRecorder.
+
+        Runs on the caller's thread (decoding takes a while, so not the UI
+        thread) and returns the recorder for its counters, or None if there
+        was nothing to write or the file could not be created.
+        """
+        with self.lock:
+            frames = list(self.frames)
+            events = deque(self.events)
+        if len(frames) < 2:
+            return None
+
+        span = frames[-1][0].timestamp - frames[0][0].timestamp
+        fps = (len(frames) - 1) / span if span > 0 else REPLAY_FPS
+        height, width = self.shape[:2]
+        recorder = VideoRecorder(filename, fourcc, fps, (width, height), log_filename)
+        if not recorder.is_opened():
+            recorder.close()
+            return None
+
+        recorder.start()
+        for meta, latency_ms, jpeg in frames:
+            hits = []
+            while events and events[0][0] <= meta.seq:
+                hits.extend(events.popleft()[1])
+            frame = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+            recorder.submit(frame, meta, hits, block=True, latency_ms=latency_ms)
+        recorder.close()
+        return recorder
+
+    def close(self):
+        """Stop the encoder thread, discarding anything still queued."""
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].release()
+        if self.is_alive():
+            self.queue.put(None)
+            self.join()
+
+
+class FramePacer:
+    """Paces the processing loop to a target frame period.
+
+    Each iteration sleeps only for whatever is left of the period after
+    processing, instead of a fixed delay on top of it. In free-run mode it
+    never sleeps and the loop simply blocks until the next frame arrives.
+    Also measures the actual frame period and its jitter.
+    """
+
+    def __init__(self, target_fps=DEFAULT_TARGET_FPS, free_run=False):
+        self.target_fps = target_fps
+        self.free_run = free_run
+        self.frame_start = None
+
+        # Period statistics since the last take_stats()
+        self.period_count = 0
+        self.period_sum = 0.0
+        self.period_sq_sum = 0.0
+
+    def start_frame(self):
+        """Mark the start of a loop iteration that got a frame."""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            period = now - self.frame_start
+            self.period_count += 1
+            self.period_sum += period
+            self.period_sq_sum += period * period
+        self.frame_start = now
+
+    def wait(self):
+        """Sleep for the remainder of the target frame period."""
+        if self.free_run or self.target_fps <= 0 or self.frame_start is None:
+            return
+        remaining = 1.0 / self.target_fps - (time.perf_counter() - self.frame_start)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def take_stats(self):
+        """Return (mean period ms, jitter ms) and start a new measurement window."""
+        if self.period_count == 0:
+            return 0.0, 0.0
+        mean = self.period_sum / self.period_count
+        variance = max(0.0, self.period_sq_sum / self.period_count - mean * mean)
+        self.period_count = 0
+        self.period_sum = 0.0
+        self.period_sq_sum = 0.0
+        return mean * 1000.0, (variance ** 0.5) * 1000.0
+
+
+class LatencyHistogram:
+    """Fixed-size log-spaced histogram of durations.
+
+    Recording is O(1) with no allocation. Percentiles are read back at
+    bin resolution (the geometric centre of the bin holding the quantile).
+    """
+
+    def __init__(self):
+        self.num_bins = HISTOGRAM_DECADES * HISTOGRAM_BINS_PER_DECADE
+        self.log_min = math.log10(HISTOGRAM_MIN_MS)
+        self.reset()
+
+    def reset(self):
+        """Clear all samples."""
+        self.counts = np.zeros(self.num_bins, dtype=np.int64)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        """Add one duration in milliseconds."""
+        if ms > HISTOGRAM_MIN_MS:
+            index = int((math.log10(ms) - self.log_min) * HISTOGRAM_BINS_PER_DECADE)
+            index = min(index, self.num_bins - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def bin_upper_edges(self):
+        """Upper edge of every bin, in milliseconds."""
+        exponents = self.log_min + np.arange(1, self.num_bins + 1) / HISTOGRAM_BINS_PER_DECADE
+        return 10.0 ** exponents
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) in milliseconds, or 0 without samples."""
+        counts = self.counts.copy()  # Stable snapshot while the owner keeps recording
+        total = counts.sum()
+        if total == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(counts), q / 100.0 * total))
+        index = min(index, self.num_bins - 1)
+        centre = self.log_min + (index + 0.5) / HISTOGRAM_BINS_PER_DECADE
+        return min(10.0 ** centre, self.max_ms)
+
+    def summary(self):
+        """Count, mean, p50/p95/p99 and max as a dict."""
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": self.total_ms / count if count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
+
+
+class StageTimer:
+    """Reusable context manager that times one stage into its histogram."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record((time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+# Shared no-op timer handed out while profiling is disabled
+NULL_TIMER = nullcontext()
+
+
+class StageProfiler:
+    """Per-stage latency histograms for the capture/processing/display pipeline.
+
+    Usage: `with profiler.measure("detect_ball"): ...`. While disabled,
+    measure() returns a shared no-op context manager, so instrumented code
+    costs one attribute check per stage. Each stage must only be timed from
+    one thread at a time (its timer is reused).
+    """
+
+    def __init__(self, stages=PROFILE_STAGES, enabled=False):
+        self.enabled = enabled
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+        self.timers = {stage: StageTimer(h) for stage, h in self.histograms.items()}
+
+    def measure(self, stage):
+        """Context manager timing `stage` (no-op while disabled)."""
+        if not self.enabled:
+            return NULL_TIMER
+        return self.timers[stage]
+
+    def reset(self):
+        """Clear every stage histogram."""
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def summary(self):
+        """Per-stage summary dicts, in pipeline order."""
+        return {stage: h.summary() for stage, h in self.histograms.items()}
+
+    def to_dict(self):
+        """Summaries plus the non-empty histogram bins, for JSON export."""
+        result = {}
+        for stage, histogram in self.histograms.items():
+            entry = histogram.summary()
+            edges = histogram.bin_upper_edges()
+            nonzero = np.flatnonzero(histogram.counts)
+            entry["histogram"] = [[round(float(edges[i]), 6), int(histogram.counts[i])]
+                                  for i in nonzero]
+            result[stage] = entry
+        return result
+
+
+def fit_display_size(width, height, max_width, max_height):
+    """Largest (width, height) with the frame's aspect ratio that fits the display."""
+    scale = min(max_width / width, max_height / height)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def scaled_kernel_size(size, scale):
+    """Odd kernel size equivalent to `size` at full resolution."""
+    return max(3, int(round(size * scale)) | 1)
+
+
+def halving_steps(scale):
+    """How many exact halvings give `scale` (0.25 -> 2), or 0 if it is not 1/2^n."""
+    steps = 0
+    while scale < 1.0 and steps < 8:
+        scale *= 2
+        steps += 1
+    return steps if scale == 1.0 else 0
+
+
+def contour_stats(contours):
+    """Area (as cv2.contourArea) and centroid arrays of a list of contours.
+
+    A few contours go through cv2.moments one by one; many at once get the
+    same polygon moments from the shoelace formula in a single NumPy pass.
+    """
+    if len(contours) <= BLOB_LOOP_LIMIT:
+        moments = [cv2.moments(contour) for contour in contours]
+        m00 = np.array([m["m00"] for m in moments])
+        m10 = np.array([m["m10"] for m in moments])
+        m01 = np.array([m["m01"] for m in moments])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.abs(m00), m10 / m00, m01 / m00
+
+    counts = np.array([len(contour) for contour in contours])
+    starts = np.cumsum(counts) - counts
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.float64)
+    # Each vertex's successor, wrapping around within its own contour
+    following = np.arange(1, len(points) + 1)
+    following[starts + counts - 1] = starts
+    x, y = points[:, 0], points[:, 1]
+    next_x, next_y = x[following], y[following]
+    cross = x * next_y - next_x * y
+    twice_area = np.add.reduceat(cross, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cx = np.add.reduceat((x + next_x) * cross, starts) / (3 * twice_area)
+        cy = np.add.reduceat((y + next_y) * cross, starts) / (3 * twice_area)
+    return np.abs(twice_area) / 2, cx, cy
+
+
+class FramePreprocessor:
+    """Per-frame preprocessing: grayscale, blur and frame delta.
+
+    Detection runs one on just the goal region, optionally downscaled; the
+    trail modes run another over the full frame with a smaller kernel.
+    Input may be BGR or already grayscale (detection crops the trail
+    preprocessor's grayscale frame when the trail modes are on). Buffers
+    are reused between frames.
+
+    Half and quarter scale shrink by exact halvings (OpenCV's fast 2x
+    INTER_AREA path), and a BGR crop is converted to grayscale after the
+    first one, when it has a quarter of the pixels.
+    """
+
+    def __init__(self, blur_size=MOTION_BLUR_SIZE):
+        self.blur_size = blur_size
+        self.region = None  # Area covered by the buffers, None = full frame
+        self.scale = 1.0    # Downscale factor applied after cropping
+        self.gray_full = None
+        self.half_bgr = None
+        self.halves = []    # Grayscale result of each halving, the last is gray
+        self.gray = None
+        self.blurred = None
+        self.prev_blurred = None
+        self.delta = None
+        self.has_prev = False
+        self.want_delta = True  # False: return the blurred image, skip the delta
+        self.kernel = None
+
+    def reset(self):
+        """Forget the previous frame (next frame produces no delta)."""
+        self.has_prev = False
+
+    def process(self, frame, region=None, scale=1.0):
+        """Preprocess a frame, or just the given (x1, y1, x2, y2) region of it.
+
+        With scale < 1 the crop is downscaled before blurring, and the blur
+        kernel shrinks to match. Returns the frame delta (or the blurred image,
+        if want_delta is off), or None when there is no previous frame yet.
+        """
+        if region is not None:
+            x1, y1, x2, y2 = region
+            frame = frame[y1:y2, x1:x2]
+        full_h, full_w = frame.shape[:2]
+        if full_h == 0 or full_w == 0:
+            return None
+        halvings = halving_steps(scale)
+        h, w = full_h >> halvings, full_w >> halvings
+        if halvings and h and w:
+            # Trim to a multiple of the factor so every halving is exact
+            frame = frame[:h << halvings, :w << halvings]
+        else:
+            halvings = 0
+            h, w = max(1, int(full_h * scale)), max(1, int(full_w * scale))
+
+        if (self.gray is None or self.gray.shape != (h, w) or region != self.region
+                or scale != self.scale):
+            self.region = region
+            self.scale = scale
+            self.gray_full = (np.empty((full_h, full_w), dtype=np.uint8)
+                              if scale != 1.0 and not halvings else None)
+            self.halves = [np.empty((h << i, w << i), dtype=np.uint8)
+                           for i in range(halvings - 1, -1, -1)]
+            self.gray = self.halves[-1] if halvings else np.empty((h, w), dtype=np.uint8)
+            self.blurred = np.empty((h, w), dtype=np.uint8)
+            self.prev_blurred = np.empty((h, w), dtype=np.uint8)
+            self.delta = np.empty((h, w), dtype=np.uint8)
+            self.has_prev = False
+
+        gray = self.gray
+        if self.halves:
+            self.halve(frame)
+        elif frame.ndim == 2:
+            if scale != 1.0:
+                cv2.resize(frame, (w, h), dst=gray, interpolation=cv2.INTER_AREA)
+            else:
+                gray = frame  # Already grayscale: blur the crop in place
+        elif self.gray_full is not None:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray_full)
+            cv2.resize(self.gray_full, (w, h), dst=gray, interpolation=cv2.INTER_AREA)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        self.blurred, self.prev_blurred = self.prev_blurred, self.blurred
+        ksize = scaled_kernel_size(self.blur_size, scale)
+        if self.kernel is None or len(self.kernel) != ksize:
+            self.kernel = cv2.getGaussianKernel(ksize, 0, cv2.CV_32F)
+        # The same Gaussian as cv2.GaussianBlur, about 20% faster than its
+        # bit-exact 8-bit path (results differ by rounding only)
+        cv2.sepFilter2D(gray, -1, self.kernel, self.kernel, dst=self.blurred)
+
+        if not self.has_prev:
+            self.has_prev = True
+            return None
+        if not self.want_delta:
+            return self.blurred
+
+        cv2.absdiff(self.prev_blurred, self.blurred, dst=self.delta)
+        return self.delta
+
+    def halve(self, frame):
+        """Shrink a (trimmed) crop into self.gray by repeated 2x INTER_AREA."""
+        first = self.halves[0]
+        size = (first.shape[1], first.shape[0])
+        if frame.ndim == 3:
+            if self.half_bgr is None or self.half_bgr.shape[:2] != first.shape:
+                self.half_bgr = np.empty(first.shape + (3,), dtype=np.uint8)
+            cv2.resize(frame, size, dst=self.half_bgr, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self.half_bgr, cv2.COLOR_BGR2GRAY, dst=first)
+        else:
+            cv2.resize(frame, size, dst=first, interpolation=cv2.INTER_AREA)
+        for src, dst in zip(self.halves, self.halves[1:]):
+            cv2.resize(src, (dst.shape[1], dst.shape[0]), dst=dst, interpolation=cv2.INTER_AREA)
+
+
+class MotionDetector:
+    """Base class for goal-region detection engines.
+
+    An engine turns the preprocessed goal region into a binary foreground
+    mask. Blob extraction, bucket assignment and cooldowns are shared by
+    all engines and live in VideoThread.detect_ball.
+    """
+
+    key = None
+    name = None
+    uses_delta = True  # Consumes the frame delta (True) or the blurred frame (False)
+
+    def __init__(self):
+        self.mask = None
+
+    def reset(self):
+        """Forget any history (new goal region, camera change, ...)."""
+
+    def foreground(self, goal_image, threshold):
+        """Return a uint8 foreground mask for the goal region, or None."""
+        raise NotImplementedError
+
+    def binarize(self, image, threshold):
+        """Binary-threshold into a reused mask buffer."""
+        if self.mask is None or self.mask.shape != image.shape:
+            self.mask = np.empty(image.shape, dtype=np.uint8)
+        cv2.threshold(image, threshold, 255, cv2.THRESH_BINARY, dst=self.mask)
+        return self.mask
+
+
+class FrameDiffDetector(MotionDetector):
+    """Motion against the previous frame, using the goal-region frame delta."""
+
+    key = "frame_diff"
+    name = "Frame Difference"
+    uses_delta = True
+
+    def foreground(self, goal_image, threshold):
+        """Threshold the goal-region frame delta."""
+        return self.binarize(goal_image, threshold)
+
+
+class RunningAverageDetector(MotionDetector):
+    """Motion against a running-average background of the goal region.
+
+    Slow lighting drift is absorbed into the background, and a ball that
+    pauses stays foreground (instead of vanishing and re-triggering when it
+    moves again) until it has been at rest for a while.
+    """
+
+    key = "running_average"
+    name = "Running Average Background"
+    uses_delta = False
+
+    def __init__(self, learning_rate=0.05):
+        super().__init__()
+        self.learning_rate = learning_rate
+        self.background = None
+        self.background_u8 = None
+        self.diff = None
+
+    def reset(self):
+        """Drop the background model."""
+        self.background = None
+
+    def foreground(self, goal_image, threshold):
+        """Threshold the difference to the background, then learn this frame."""
+        if self.background is None or self.background.shape != goal_image.shape:
+            self.background = goal_image.astype(np.float32)
+            self.background_u8 = goal_image.copy()
+            self.diff = np.empty_like(goal_image)
+            return None
+
+        cv2.absdiff(goal_image, self.background_u8, dst=self.diff)
+        mask = self.binarize(self.diff, threshold)
+
+        cv2.accumulateWeighted(goal_image, self.background, self.learning_rate)
+        cv2.convertScaleAbs(self.background, dst=self.background_u8)
+        return mask
+
+
+DETECTION_ENGINES = [FrameDiffDetector, RunningAverageDetector]
+
+
+class CentroidTracker:
+    """Nearest-neighbour centroid tracker that counts scoring-line crossings.
+
+    Tracks live in fixed-size arrays, so the per-frame cost is bounded by
+    MAX_TRACKS no matter how many balls are in flight. Each track predicts
+    its next position from a constant-velocity model, is matched greedily
+    to the nearest blob, and scores once when it crosses the scoring line
+    downwards. All timing is in seconds, so behaviour does not depend on
+    the frame rate.
+    """
+
+    def __init__(self, max_tracks=MAX_TRACKS, max_missed=TRACK_MAX_MISSED):
+        self.max_tracks = max_tracks
+        self.max_missed = max_missed
+        self.position = np.zeros((max_tracks, 2), dtype=np.float64)
+        self.velocity = np.zeros((max_tracks, 2), dtype=np.float64)
+        self.radius = np.zeros(max_tracks, dtype=np.float64)
+        self.last_seen = np.zeros(max_tracks, dtype=np.float64)
+        self.updates = np.zeros(max_tracks, dtype=np.int32)
+        self.active = np.zeros(max_tracks, dtype=bool)
+        self.counted = np.zeros(max_tracks, dtype=bool)
+
+    def reset(self):
+        """Drop all tracks."""
+        self.active[:] = False
+
+    @property
+    def num_tracks(self):
+        """Number of live tracks."""
+        return int(np.count_nonzero(self.active))
+
+    def update(self, points, radii, timestamp, line_y, max_distance):
+        """Advance the tracker by one frame.
+
+        points: (N, 2) blob centroids, radii: (N,) blob radii, both in frame
+        pixels. Returns the x-coordinates at which tracks crossed line_y
+        during this update (one entry per scoring ball).
+        """
+        # Expire tracks that have not been seen for too long
+        self.active &= (timestamp - self.last_seen) <= self.max_missed
+
+        # Keep the cost bounded: only the largest blobs are considered
+        if len(points) > self.max_tracks:
+            keep = np.argsort(radii)[-self.max_tracks:]
+            points, radii = points[keep], radii[keep]
+
+        tracks = np.flatnonzero(self.active)
+        matched_tracks = np.empty(0, dtype=np.intp)
+        matched_points = np.empty(0, dtype=np.intp)
+        merged_tracks = np.empty(0, dtype=np.intp)
+        merged_positions = np.empty((0, 2), dtype=np.float64)
+
+        if tracks.size and len(points):
+            dt = (timestamp - self.last_seen[tracks])[:, None]
+            predicted = self.position[tracks] + self.velocity[tracks] * dt
+            distance = np.hypot(predicted[:, None, 0] - points[None, :, 0],
+                                predicted[:, None, 1] - points[None, :, 1])
+
+            # Greedy assignment, closest pairs first, within the gate
+            rows, cols = np.nonzero(distance <= max_distance)
+            order = np.argsort(distance[rows, cols], kind='stable')
+            track_used = np.zeros(tracks.size, dtype=bool)
+            point_used = np.zeros(len(points), dtype=bool)
+            pairs = []
+            for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+                if not track_used[r] and not point_used[c]:
+                    track_used[r] = point_used[c] = True
+                    pairs.append((r, c))
+            if pairs:
+                pairs = np.array(pairs, dtype=np.intp)
+                matched_tracks = tracks[pairs[:, 0]]
+                matched_points = pairs[:, 1]
+
+                # Balls whose blobs merged with another ball's keep moving along
+                # their prediction while it stays inside a matched blob
+                inside = distance[:, matched_points] <= radii[matched_points][None, :]
+                merged = ~track_used & inside.any(axis=1)
+                merged_tracks = tracks[merged]
+                merged_positions = predicted[merged]
+
+        crossings = np.empty(0, dtype=np.float64)
+        updated = np.concatenate((matched_tracks, merged_tracks))
+        if updated.size:
+            old = self.position[updated]
+            new = np.concatenate((points[matched_points], merged_positions))
+            elapsed = np.maximum(timestamp - self.last_seen[updated], 1e-3)[:, None]
+
+            # Downward crossings of the scoring line, interpolated to the line
+            crossed = (old[:, 1] < line_y) & (new[:, 1] >= line_y) & ~self.counted[updated]
+            if crossed.any():
+                o, n = old[crossed], new[crossed]
+                t = (line_y - o[:, 1]) / (n[:, 1] - o[:, 1])
+                crossings = o[:, 0] + (n[:, 0] - o[:, 0]) * t
+                self.counted[updated[crossed]] = True
+            self.position[updated] = new
+            self.last_seen[updated] = timestamp
+
+        if matched_tracks.size:
+            # Velocity estimate, smoothed once a track has some history
+            n = len(matched_tracks)
+            measured = (new[:n] - old[:n]) / elapsed[:n]
+            first = (self.updates[matched_tracks] == 1)[:, None]
+            self.velocity[matched_tracks] = np.where(
+                first, measured, 0.5 * (self.velocity[matched_tracks] + measured))
+            self.radius[matched_tracks] = radii[matched_points]
+            self.updates[matched_tracks] += 1
+
+        # Unmatched blobs start new tracks, unless they overlap a live track
+        # or the spot a matched ball just left (fragments, and the ghost that
+        # frame differencing leaves at a ball's previous position)
+        unmatched = np.ones(len(points), dtype=bool)
+        unmatched[matched_points] = False
+        if unmatched.any():
+            new_points, new_radii = points[unmatched], radii[unmatched]
+            tracks = np.flatnonzero(self.active)
+            if tracks.size:
+                occupied = self.position[tracks]
+                occupied_radii = self.radius[tracks]
+                if matched_tracks.size:
+                    occupied = np.concatenate((occupied, old[:len(matched_tracks)]))
+                    occupied_radii = np.concatenate((occupied_radii, self.radius[matched_tracks]))
+                distance = np.hypot(occupied[None, :, 0] - new_points[:, None, 0],
+                                    occupied[None, :, 1] - new_points[:, None, 1])
+                overlap = 2 * np.maximum(new_radii[:, None], occupied_radii[None, :])
+                separate = (distance >= overlap).all(axis=1)
+                new_points, new_radii = new_points[separate], new_radii[separate]
+
+            # A blob appearing past the line next to a ball still waiting above
+            # it is that ball, which jumped across while matched to its ghost
+            # (large steps at low frame rates or after dropped frames)
+            handoffs = []
+            waiting = np.flatnonzero(self.active & ~self.counted & (self.position[:, 1] < line_y))
+            for point in new_points[new_points[:, 1] >= line_y]:
+                if not waiting.size:
+                    break
+                gaps = np.hypot(*(self.position[waiting] - point).T)
+                nearest = int(np.argmin(gaps))
+                if gaps[nearest] <= max_distance:
+                    o = self.position[waiting[nearest]]
+                    t = (line_y - o[1]) / (point[1] - o[1])
+                    handoffs.append(o[0] + (point[0] - o[0]) * t)
+                    self.counted[waiting[nearest]] = True
+                    waiting = np.delete(waiting, nearest)
+            if handoffs:
+                crossings = np.concatenate((crossings, handoffs))
+
+            free = np.flatnonzero(~self.active)[:len(new_points)]
+            new_points = new_points[:free.size]
+            self.position[free] = new_points
+            self.radius[free] = new_radii[:free.size]
+            self.velocity[free] = 0
+            self.last_seen[free] = timestamp
+            self.updates[free] = 1
+            self.active[free] = True
+            # Balls first seen past the line (e.g. bouncing in a bucket) never score
+            self.counted[free] = new_points[:, 1] >= line_y
+
+        return crossings
+
+
+class GaltonEngine:
+    """Capture, visualization and detection pipeline, independent of any UI.
+
+    capture() yields pooled camera frames and process() runs one frame
+    through every stage in place, returning the buckets hit. The Qt
+    VideoThread, the legacy OpenCV app and the headless runner below all
+    wrap this class.
+    """
+
+    def __init__(self, camera_index=0):
+        self.camera_index = camera_index
+        self.cap = None
+        self.running = False
+        self.paused = False
+
+        # Capture thread and the ring buffer it fills
+        self.grabber = None
+        self.ring_buffer = None
+
+        # Frame pacing (sleeps only for what is left of the target period)
+        self.pacer = FramePacer()
+
+        # Per-stage latency histograms (off unless enabled in Diagnostics)
+        self.profiler = StageProfiler()
+
+        # Processing state
+        self.goal_region = None
+        self.preprocessor = FramePreprocessor()  # Goal region, for detection
+        self.trail_preprocessor = FramePreprocessor(TRAIL_BLUR_SIZE)  # Full frame, for trails
+
+        # Visualization canvases
+        self.trail_canvas = None  # uint8 trail colours, faded in place
+        self.trail_mask = None  # Thresholded frame delta
+        self.trail_dilated = None  # Dilated motion mask
+        self.trail_color_image = None  # Solid trail colour, copied through the mask
+        self.trail_color_key = None  # (colour, shape) trail_color_image was built for
+        self.long_exposure_canvas = None
+        self.long_exposure_frame = None
+        self.ultra_long_exposure_canvas = None  # Single-channel uint8, saturating
+        self.ultra_long_exposure_mask = None
+        self.ultra_long_exposure_dilated = None
+        self.ultra_long_exposure_bgr = None  # Three-channel expansion for blending
+
+        # Settings
+        self.trail_mode = 0  # 0=Off, 1=Trails, 2=Long Exp, 3=Ultra-Long Exp
+        self.cooldown_ms = DEFAULT_COOLDOWN_MS
+        self.motion_threshold = DEFAULT_MOTION_THRESHOLD
+        self.min_contour_area = DEFAULT_MIN_CONTOUR_AREA
+        self.detection_scale = 1.0  # Goal-region downscale factor for detection
+        self.detector = FrameDiffDetector()  # Pluggable detection engine
+        self.counting_mode = "tracking"  # "tracking" or "cooldown"
+        self.scoring_line = DEFAULT_SCORING_LINE  # Fraction of goal height
+        self.tracker = CentroidTracker()
+        self.trail_fade = 70  # Fade rate for mode 1 (Motion Trails)
+        self.trail_size = 3  # Thickness/dilation iterations for mode 1
+        self.long_exposure_duration = 85  # Persistence for mode 2 (1-100)
+        self.trail_color_index = 0
+        self.show_bucket_overlay = True  # Show bucket dividers on video
+        self.flip_horizontal = False  # Flip camera feed horizontally
+
+        # Cooldown and glow expiry per bucket, in ms on the frame clock
+        # (monotonic capture timestamps), so they do not depend on frame rate
+        self.frame_time_ms = 0.0
+        self.cooldown_until_ms = np.zeros(NUM_BUCKETS, dtype=np.float64)
+        self.glow_until_ms = np.zeros(NUM_BUCKETS, dtype=np.float64)
+        self.bucket_edges = None
+        self.bucket_edges_region = None
+
+        # Prerendered static bucket overlay (see build_bucket_overlay)
+        self.overlay_key = None  # (goal_region, frame size, counting mode, scoring line)
+        self.overlay_sprite = None
+        self.overlay_mask = None
+        self.overlay_origin = (0, 0)
+        self.overlay_glow_rects = []
+        self.overlay_glow_fill = None
+
+        # Frame storage for clean recording
+        self.frame_pool = FrameBufferPool()  # Processed frames handed to the UI
+        self.frames_processed = 0
+        self.keep_clean_frame = False  # Set by the UI while clean recording
+        self.display_size = None  # (width, height) in device pixels, set by the UI
+        self.fast_display_scaling = False  # Nearest-neighbour instead of linear/area
+        self.clean_frame = None  # Pooled overlay-free copy of the frame being processed
+
+        # Trail colors (BGR format)
+        self.trail_colors = [
+            ([50, 150, 255], "Orange"),
+            ([255, 200, 50], "Cyan"),
+            ([255, 50, 255], "Magenta"),
+            ([50, 255, 50], "Green"),
+            ([255, 100, 100], "Blue"),
+            ([50, 255, 255], "Yellow"),
+            ([255, 255, 255], "White"),
+            ([100, 100, 255], "Red"),
+        ]
+
+        # FPS tracking
+        self.fps = 0
+        self.frame_count = 0
+        self.fps_start_time = time.time()
+
+    def capture(self):
+        """Yield (buffer, meta) for the newest camera frame until stop() is called.
+
+        Each buffer is a pooled copy (flipped if enabled) holding one
+        reference for the caller. Frames are paced to the target rate.
+        """
+        self.running = True
+        self.cap = cv2.VideoCapture(self.camera_index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        if not self.cap.isOpened():
+            print(f"Could not open camera {self.camera_index}")
+            return
+
+        # Capture runs on its own thread so slow frames never stall grabbing
+        self.ring_buffer = FrameRingBuffer()
+        self.grabber = FrameGrabber(self.cap, self.ring_buffer, self.profiler)
+        self.grabber.start()
+
+        try:
+            while self.running:
+                frame, meta = self.ring_buffer.acquire_latest(timeout=0.1)
+                if frame is not None:
+                    self.pacer.start_frame()
+                    try:
+                        # Take the one copy out of the ring (flipped if enabled),
+                        # so the slot goes straight back to the grabber
+                        buffer = self.frame_pool.copy_from(frame, flip=self.flip_horizontal)
+                    finally:
+                        self.ring_buffer.release()
+                    yield buffer, meta
+
+                    # Sleep only for what is left of the frame period (no-op in free-run)
+                    self.pacer.wait()
+        finally:
+            self.grabber.stop()
+            if self.cap:
+                self.cap.release()
+
+    def process(self, buffer, meta):
+        """Run one pooled frame through every stage and return the buckets hit.
+
+        The frame is processed in place; the caller keeps its reference to
+        the buffer, which carries the clean copy if one was made.
+        """
+        frame = buffer.array
+        self.frames_processed += 1
+        self.frame_time_ms = meta.timestamp * 1000.0
+
+        # Update FPS
+        self.update_fps()
+
+        # Grayscale, blur and frame delta for detection and the trail modes
+        with self.profiler.measure("preprocess"):
+            trail_delta = self.preprocess_trails(frame)
+            frame_delta = self.preprocess(frame, self.trail_gray())
+
+        # Process frame based on mode (respects paused flag internally),
+        # drawing into the pooled buffer itself
+        with self.profiler.measure("process_frame"):
+            self.process_frame(frame, trail_delta)
+        buffer.clean, self.clean_frame = self.clean_frame, None
+
+        # Detect balls only if not paused
+        if self.paused:
+            return []
+        with self.profiler.measure("detect_ball"):
+            return self.detect_ball(frame_delta, meta.timestamp)
+
+    def scale_for_display(self, frame):
+        """Return a pooled copy of frame fitted to display_size, or None if it already fits."""
+        if self.display_size is None:
+            return None
+        h, w = frame.shape[:2]
+        size = fit_display_size(w, h, *self.display_size)
+        if size == (w, h):
+            return None
+
+        # Area averaging only pays off (and only avoids aliasing) when
+        # shrinking by 2x or more; bilinear is much cheaper otherwise
+        if self.fast_display_scaling:
+            interpolation = cv2.INTER_NEAREST
+        elif size[0] * 2 <= w:
+            interpolation = cv2.INTER_AREA
+        else:
+            interpolation = cv2.INTER_LINEAR
+        display = self.frame_pool.acquire((size[1], size[0], frame.shape[2]))
+        cv2.resize(frame, size, dst=display.array, interpolation=interpolation)
+        return display
+
+    def stop(self):
+        """Make capture() finish after the current frame."""
+        self.running = False
+        if self.ring_buffer:
+            self.ring_buffer.close()
+
+    @property
+    def frames_captured(self):
+        """Frames the grabber has read from the camera."""
+        return self.ring_buffer.frames_captured if self.ring_buffer else 0
+
+    @property
+    def frames_dropped(self):
+        """Frames the grabber overwrote before they could be processed."""
+        return self.ring_buffer.frames_dropped if self.ring_buffer else 0
+
+    @property
+    def frames_late(self):
+        """Frames that were already older than one grab interval when processed."""
+        return self.ring_buffer.frames_late if self.ring_buffer else 0
+
+    @property
+    def bytes_copied_per_frame(self):
+        """Mean bytes of frame data copied per processed frame."""
+        return self.frame_pool.bytes_copied / max(1, self.frames_processed)
+
+    def diagnostics(self):
+        """Stage timings and capture counters as a JSON-serialisable dict."""
+        return {
+            "written": datetime.now().isoformat(timespec="seconds"),
+            "camera_index": self.camera_index,
+            "fps": round(self.fps, 2),
+            "frames_captured": self.frames_captured,
+            "frames_dropped": self.frames_dropped,
+            "frames_late": self.frames_late,
+            "frames_processed": self.frames_processed,
+            "bytes_copied_per_frame": round(self.bytes_copied_per_frame),
+            "stages": self.profiler.to_dict(),
+        }
+
+    def apply_config(self, config):
+        """Apply the engine settings found in a galton_config.json dict."""
+        goal_region = config.get('goal_region')
+        if goal_region and len(goal_region) == 4:
+            self.goal_region = tuple(goal_region)
+
+        # Detection settings
+        if 'cooldown_ms' in config:
+            self.cooldown_ms = config['cooldown_ms']
+        elif 'cooldown_frames' in config:
+            # Older configs counted frames at an assumed 30 fps
+            self.cooldown_ms = int(round(config['cooldown_frames'] * 1000 / 30))
+        if 'motion_threshold' in config:
+            self.motion_threshold = config['motion_threshold']
+        if 'min_contour_area' in config:
+            self.min_contour_area = config['min_contour_area']
+        if 'detection_scale' in config:
+            self.detection_scale = config['detection_scale']
+        if 'detection_engine' in config:
+            self.set_detection_engine(config['detection_engine'])
+        if 'counting_mode' in config:
+            self.set_counting_mode(config['counting_mode'])
+        if 'scoring_line' in config:
+            self.scoring_line = config['scoring_line']
+
+        # Visual settings
+        if 'trail_color_index' in config:
+            self.trail_color_index = config['trail_color_index']
+        if 'trail_size' in config:
+            self.trail_size = config['trail_size']
+        if 'long_exposure_duration' in config:
+            self.long_exposure_duration = config['long_exposure_duration']
+        if 'show_bucket_overlay' in config:
+            self.show_bucket_overlay = config['show_bucket_overlay']
+        if 'flip_horizontal' in config:
+            self.flip_horizontal = config['flip_horizontal']
+
+        # Frame pacing
+        if 'target_fps' in config:
+            self.pacer.target_fps = config['target_fps']
+        if 'free_run' in config:
+            self.pacer.free_run = config['free_run']
+        if 'fast_display_scaling' in config:
+            self.fast_display_scaling = config['fast_display_scaling']
+
+        # Diagnostics
+        if 'diagnostics_enabled' in config:
+            self.profiler.enabled = config['diagnostics_enabled']
+
+    def config(self):
+        """The engine settings as a galton_config.json dict."""
+        config = {}
+
+        # Goal region
+        if self.goal_region:
+            config['goal_region'] = list(self.goal_region)
+
+        # Camera settings
+        config['camera_index'] = self.camera_index
+
+        # Detection settings
+        config['cooldown_ms'] = self.cooldown_ms
+        config['motion_threshold'] = self.motion_threshold
+        config['min_contour_area'] = self.min_contour_area
+        config['detection_scale'] = self.detection_scale
+        config['detection_engine'] = self.detector.key
+        config['counting_mode'] = self.counting_mode
+        config['scoring_line'] = self.scoring_line
+
+        # Visual settings
+        config['trail_color_index'] = self.trail_color_index
+        config['trail_size'] = self.trail_size
+        config['long_exposure_duration'] = self.long_exposure_duration
+        config['show_bucket_overlay'] = self.show_bucket_overlay
+        config['flip_horizontal'] = self.flip_horizontal
+
+        # Frame pacing
+        config['target_fps'] = self.pacer.target_fps
+        config['free_run'] = self.pacer.free_run
+        config['fast_display_scaling'] = self.fast_display_scaling
+
+        # Diagnostics
+        config['diagnostics_enabled'] = self.profiler.enabled
+        return config
+
+    def update_fps(self):
+        """Update FPS calculation; returns True once per second, when it changes."""
+        self.frame_count += 1
+        elapsed = time.time() - self.fps_start_time
+        if elapsed >= 1.0:
+            self.fps = self.frame_count / elapsed
+            self.frame_count = 0
+            self.fps_start_time = time.time()
+            return True
+        return False
+
+    def preprocess(self, frame, gray=None):
+        """Preprocess the goal region and return the image the detector works on.
+
+        That is the frame delta, or just the blurred goal region for engines
+        that keep their own background (uses_delta off). gray is the full
+        frame already converted to grayscale, if there is one (see
+        trail_gray); only the goal region of it is blurred. Returns None when
+        paused, with no goal region, or when there is no previous frame yet.
+        """
+        if self.paused or not self.goal_region:
+            return None
+        self.preprocessor.want_delta = self.detector.uses_delta
+        source = frame if gray is None else gray
+        return self.preprocessor.process(source, self.goal_region, self.detection_scale)
+
+    def preprocess_trails(self, frame):
+        """Preprocess the full frame for the trail modes and return its frame delta.
+
+        Returns None unless a mode that follows motion (1 or 3) is active.
+        """
+        if self.paused or self.trail_mode not in (1, 3):
+            return None
+        return self.trail_preprocessor.process(frame)
+
+    def trail_gray(self):
+        """This frame in grayscale, if preprocess_trails converted it (else None)."""
+        if self.paused or self.trail_mode not in (1, 3):
+            return None
+        return self.trail_preprocessor.gray
+
+    def process_frame(self, frame, frame_delta=None):
+        """Process frame based on current mode."""
+        # Update visualization based on mode
+        if not self.paused and self.trail_mode > 0:
+            if self.trail_mode == 1:  # Motion Trails
+                self.update_trails(frame, frame_delta)
+            elif self.trail_mode == 2:  # Long Exposure
+                self.update_long_exposure(frame)
+            elif self.trail_mode == 3:  # Ultra-Long Exposure
+                self.update_ultra_long_exposure(frame, frame_delta)
+
+        # Apply visualization
+        if self.trail_mode == 1:
+            frame = self.apply_trails(frame)
+        elif self.trail_mode == 2:
+            frame = self.apply_long_exposure(frame)
+        elif self.trail_mode == 3:
+            frame = self.apply_ultra_long_exposure(frame)
+
+        # Draw bucket overlay if enabled
+        if self.show_bucket_overlay and self.goal_region:
+            # Keep a clean frame (camera + trails, no overlays) only while
+            # clean recording needs one; otherwise the frame itself is clean
+            if self.keep_clean_frame:
+                self.clean_frame = self.frame_pool.copy_from(frame)
+            with self.profiler.measure("draw_bucket_overlay"):
+                frame = self.draw_bucket_overlay(frame)
+
+        return frame
+
+    def update_trails(self, frame, frame_delta):
+        """Update motion trail visualization.
+
+        All buffers are preallocated uint8 and updated in place, so steady
+        state allocates nothing per frame.
+        """
+        h, w = frame.shape[:2]
+        if self.trail_canvas is None or self.trail_canvas.shape[:2] != (h, w):
+            self.trail_canvas = np.zeros((h, w, 3), dtype=np.uint8)
+            self.trail_mask = np.zeros((h, w), dtype=np.uint8)
+            self.trail_dilated = np.zeros((h, w), dtype=np.uint8)
+
+        if frame_delta is None or frame_delta.shape != (h, w):
+            return
+
+        cv2.threshold(frame_delta, TRAIL_MOTION_THRESHOLD, 255, cv2.THRESH_BINARY, dst=self.trail_mask)
+        cv2.dilate(self.trail_mask, None, dst=self.trail_dilated, iterations=self.trail_size)
+
+        # Masked colour fill: copy a solid colour image through the motion mask
+        color = self.trail_colors[self.trail_color_index][0]
+        color_key = (tuple(color), (h, w))
+        if self.trail_color_key != color_key:
+            self.trail_color_image = np.empty((h, w, 3), dtype=np.uint8)
+            self.trail_color_image[:] = color
+            self.trail_color_key = color_key
+        cv2.copyTo(self.trail_color_image, self.trail_dilated, self.trail_canvas)
+
+        # Fade in place; the -0.5 offset rounds down so trails decay to zero
+        fade_rate = self.trail_fade / 100.0
+        cv2.convertScaleAbs(self.trail_canvas, dst=self.trail_canvas, alpha=fade_rate, beta=-0.5)
+
+    def apply_trails(self, frame):
+        """Blend trail canvas onto frame (in place, saturating)."""
+        if self.trail_canvas is None or self.trail_canvas.shape != frame.shape:
+            return frame
+        return cv2.add(frame, self.trail_canvas, dst=frame)
+
+    def update_long_exposure(self, frame):
+        """Update long exposure visualization.
+
+        Streaming accumulator on a persistent 8.8 fixed-point uint16 canvas:
+        a running maximum keeps bright balls, then a weighted blend with the
+        frame fades them. The fractional bits keep slow fades smooth, so the
+        result matches the original float32 version.
+        """
+        h, w = frame.shape[:2]
+        if self.long_exposure_canvas is None or self.long_exposure_canvas.shape[:2] != (h, w):
+            self.long_exposure_canvas = np.zeros((h, w, 3), dtype=np.uint16)
+            self.long_exposure_frame = np.empty((h, w, 3), dtype=np.uint16)
+
+        canvas = self.long_exposure_canvas
+        scaled = self.long_exposure_frame
+        np.copyto(scaled, frame)
+        np.left_shift(scaled, 8, out=scaled)
+        cv2.max(canvas, scaled, dst=canvas)
+
+        # Use long_exposure_duration (1-100) to control persistence
+        fade_rate = self.long_exposure_duration / 100.0
+        cv2.addWeighted(canvas, fade_rate, scaled, (1 - fade_rate) * 0.5, 0, dst=canvas)
+
+    def apply_long_exposure(self, frame):
+        """Apply long exposure canvas (written into the frame buffer)."""
+        if self.long_exposure_canvas is None or self.long_exposure_canvas.shape != frame.shape:
+            return frame
+        cv2.convertScaleAbs(self.long_exposure_canvas, dst=frame, alpha=1 / 256.0, beta=-0.5)
+        return frame
+
+    def update_ultra_long_exposure(self, frame, frame_delta):
+        """Update ultra-long exposure visualization.
+
+        The canvas is a single-channel uint8 image: cv2.add saturates at 255
+        and only touches pixels under the motion mask, so there is no clip
+        pass and idle pixels are never rewritten.
+        """
+        h, w = frame.shape[:2]
+        if self.ultra_long_exposure_canvas is None or self.ultra_long_exposure_canvas.shape != (h, w):
+            self.ultra_long_exposure_canvas = np.zeros((h, w), dtype=np.uint8)
+            self.ultra_long_exposure_mask = np.zeros((h, w), dtype=np.uint8)
+            self.ultra_long_exposure_dilated = np.zeros((h, w), dtype=np.uint8)
+
+        if frame_delta is None or frame_delta.shape != (h, w):
+            return
+
+        cv2.threshold(frame_delta, TRAIL_MOTION_THRESHOLD, 255, cv2.THRESH_BINARY,
+                      dst=self.ultra_long_exposure_mask)
+        cv2.dilate(self.ultra_long_exposure_mask, None, dst=self.ultra_long_exposure_dilated, iterations=1)
+
+        canvas = self.ultra_long_exposure_canvas
+        cv2.add(canvas, ULTRA_LONG_EXPOSURE_STEP, dst=canvas, mask=self.ultra_long_exposure_dilated)
+
+    def apply_ultra_long_exposure(self, frame):
+        """Blend accumulated trails on live feed (in place, saturating)."""
+        canvas = self.ultra_long_exposure_canvas
+        if canvas is None or canvas.shape != frame.shape[:2]:
+            return frame
+        # Expand to three channels only here, into a reused buffer
+        if self.ultra_long_exposure_bgr is None or self.ultra_long_exposure_bgr.shape != frame.shape:
+            self.ultra_long_exposure_bgr = np.empty(frame.shape, dtype=np.uint8)
+        cv2.cvtColor(canvas, cv2.COLOR_GRAY2BGR, dst=self.ultra_long_exposure_bgr)
+        return cv2.add(frame, self.ultra_long_exposure_bgr, dst=frame)
+
+    def draw_bucket_overlay(self, frame):
+        """Draw bucket dividers and labels on the frame.
+
+        Glow is blended only inside each glowing bucket's rectangle, then the
+        static overlay (prerendered by build_bucket_overlay) is composited in
+        one masked copy.
+        """
+        if not self.goal_region:
+            return frame
+
+        h, w = frame.shape[:2]
+        overlay_key = (self.goal_region, (h, w), self.counting_mode,
+                       self.scoring_line if self.counting_mode == "tracking" else None)
+        if self.overlay_key != overlay_key:
+            self.build_bucket_overlay(overlay_key)
+
+        # Bucket glow fades out over GLOW_DURATION_MS
+        glow_levels = self.glow_levels()
+        for i in np.flatnonzero(glow_levels > 0):
+            bx1, by1, bx2, by2 = self.overlay_glow_rects[i]
+            roi = frame[by1:by2, bx1:bx2]
+            if roi.size == 0:
+                continue
+            alpha = 0.3 * glow_levels[i] * 0.5
+            fill = self.overlay_glow_fill[:roi.shape[0], :roi.shape[1]]
+            cv2.addWeighted(fill, alpha, roi, 1 - alpha, 0, dst=roi)
+
+        # Static rectangle, dividers, scoring line and labels
+        ox, oy = self.overlay_origin
+        sh, sw = self.overlay_mask.shape
+        if sh and sw:
+            cv2.copyTo(self.overlay_sprite, self.overlay_mask, frame[oy:oy + sh, ox:ox + sw])
+        return frame
+
+    def build_bucket_overlay(self, overlay_key):
+        """Prerender the static bucket overlay as a sprite plus mask.
+
+        Runs once per calibration, resolution or counting-mode change. The
+        sprite is cropped to the overlay's bounding box so compositing only
+        touches that part of the frame.
+        """
+        goal_region, (h, w), counting_mode, _ = overlay_key
+        x1, y1, x2, y2 = goal_region
+        sprite = np.zeros((h, w, 3), dtype=np.uint8)
+
+        # Goal region rectangle
+        cv2.rectangle(sprite, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+        # Vertical bucket dividers
+        region_width = x2 - x1
+        bucket_width = region_width / NUM_BUCKETS
+        for i in range(1, NUM_BUCKETS):
+            x = int(x1 + i * bucket_width)
+            cv2.line(sprite, (x, y1), (x, y2), (0, 255, 0), 1)
+
+        # The scoring line balls are counted on
+        if counting_mode == "tracking":
+            line_y = int(round(self.get_scoring_line_y()))
+            cv2.line(sprite, (x1, line_y), (x2, line_y), (0, 200, 255), 1)
+
+        # Bucket numbers above the goal region
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 0.5
+        thickness = 1
+        for i in range(NUM_BUCKETS):
+            bucket_center_x = int(x1 + (i + 0.5) * bucket_width)
+            label = str(i + 1)
+            text_size = cv2.getTextSize(label, font, font_scale, thickness)[0]
+            text_x = bucket_center_x - text_size[0] // 2
+            text_y = y1 - 10
+            cv2.putText(sprite, label, (text_x, text_y), font, font_scale,
+                        (0, 255, 0), thickness)
+
+        # Mask of drawn pixels, cropped with the sprite to their bounding box
+        mask = cv2.threshold(cv2.cvtColor(sprite, cv2.COLOR_BGR2GRAY), 0, 255, cv2.THRESH_BINARY)[1]
+        bx, by, bw, bh = cv2.boundingRect(mask)
+        self.overlay_sprite = sprite[by:by + bh, bx:bx + bw].copy()
+        self.overlay_mask = mask[by:by + bh, bx:bx + bw].copy()
+        self.overlay_origin = (bx, by)
+
+        # Glow rectangles per bucket (inclusive corners, clipped to the frame)
+        # and a solid yellow fill to blend them with
+        self.overlay_glow_rects = []
+        for i in range(NUM_BUCKETS):
+            bucket_x1 = max(0, int(x1 + i * bucket_width))
+            bucket_x2 = min(w, int(x1 + (i + 1) * bucket_width) + 1)
+            self.overlay_glow_rects.append((bucket_x1, max(0, y1), bucket_x2, min(h, y2 + 1)))
+        fill_w = max(bx2 - bx1 for bx1, _, bx2, _ in self.overlay_glow_rects)
+        self.overlay_glow_fill = np.empty((max(1, min(h, y2 + 1) - max(0, y1)), max(1, fill_w), 3),
+                                          dtype=np.uint8)
+        self.overlay_glow_fill[:] = (0, 255, 255)  # Yellow
+        self.overlay_key = overlay_key
+
+    def detect_ball(self, goal_image, timestamp=None):
+        """Detect ball movement in the preprocessed goal region and return detected bucket indices.
+
+        goal_image is what preprocess returned for this frame.
+
+        In tracking mode a bucket appears once per ball that crossed the
+        scoring line, so it can be listed more than once.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        now_ms = self.frame_time_ms = timestamp * 1000.0
+
+        if self.paused or not self.goal_region:
+            return []
+
+        if goal_image is None:
+            return []
+
+        x1, y1, x2, y2 = self.goal_region
+        scale = self.preprocessor.scale
+        thresh = self.detector.foreground(goal_image, self.motion_threshold)
+        if thresh is None:
+            return []
+
+        # Still frames (most of them) need no dilation or contour search
+        if not cv2.countNonZero(thresh):
+            return []
+
+        # Kernel sizes and areas scaled to match the full-resolution pipeline
+        thresh = cv2.dilate(thresh, None, iterations=max(1, int(round(2 * scale))))
+        min_area = self.min_contour_area * scale * scale
+
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        areas, cx, cy = contour_stats(contours)
+        keep = areas > min_area
+        if not keep.any():
+            return []
+
+        # Map centroids back to full-resolution frame coordinates
+        cx = (cx[keep] + 0.5) / scale - 0.5 + x1
+
+        if self.counting_mode == "tracking":
+            cy = (cy[keep] + 0.5) / scale - 0.5 + y1
+            radii = np.sqrt(areas[keep] / np.pi) / scale
+            crossings = self.tracker.update(
+                np.column_stack((cx, cy)), radii, timestamp,
+                self.get_scoring_line_y(), TRACK_GATE * (y2 - y1))
+            hits = self.get_bucket_indices(crossings)
+            hits = hits[hits >= 0]
+        else:
+            buckets = np.unique(self.get_bucket_indices(cx))
+            buckets = buckets[buckets >= 0]
+
+            # Only buckets whose cooldown has expired count as hits
+            hits = buckets[self.cooldown_until_ms[buckets] <= now_ms]
+            self.cooldown_until_ms[hits] = now_ms + self.cooldown_ms
+
+        self.glow_until_ms[hits] = now_ms + GLOW_DURATION_MS
+        return hits.tolist()
+
+    def glow_levels(self):
+        """Per-bucket glow intensity (1 right after a hit, fading to 0)."""
+        remaining = self.glow_until_ms - self.frame_time_ms
+        return np.clip(remaining / GLOW_DURATION_MS, 0.0, 1.0)
+
+    def get_scoring_line_y(self):
+        """Frame y-coordinate of the scoring line inside the goal region."""
+        x1, y1, x2, y2 = self.goal_region
+        return y1 + self.scoring_line * (y2 - y1)
+
+    def set_counting_mode(self, mode):
+        """Switch between per-ball tracking and per-bucket cooldowns."""
+        if mode != self.counting_mode:
+            self.counting_mode = mode
+            self.tracker.reset()
+
+    def set_detection_engine(self, key):
+        """Switch to the detection engine with the given key."""
+        for engine in DETECTION_ENGINES:
+            if engine.key == key and not isinstance(self.detector, engine):
+                self.detector = engine()
+                break
+
+    def get_bucket_edges(self):
+        """Bucket boundary x-coordinates for the current goal region (cached)."""
+        if self.bucket_edges_region != self.goal_region:
+            x1, y1, x2, y2 = self.goal_region
+            self.bucket_edges = np.linspace(x1, x2, NUM_BUCKETS + 1)
+            self.bucket_edges_region = self.goal_region
+        return self.bucket_edges
+
+    def get_bucket_indices(self, xs):
+        """Vectorized get_bucket_index: bucket per x-coordinate, -1 outside the goal."""
+        edges = self.get_bucket_edges()
+        xs = np.asarray(xs, dtype=np.float64)
+        buckets = np.searchsorted(edges, xs, side='right') - 1
+        np.minimum(buckets, NUM_BUCKETS - 1, out=buckets)
+        buckets[(xs < edges[0]) | (xs > edges[-1])] = -1
+        return buckets
+
+    def get_bucket_index(self, x):
+        """Determine which bucket an x-coordinate falls into."""
+        if not self.goal_region:
+            return None
+        x1, y1, x2, y2 = self.goal_region
+        if x < x1 or x > x2:
+            return None
+        bucket_width = (x2 - x1) / NUM_BUCKETS
+        bucket = int((x - x1) / bucket_width)
+        return min(bucket, NUM_BUCKETS - 1)
+
+    def reset_ultra_long_exposure(self):
+        """Reset ultra-long exposure canvas."""
+        self.ultra_long_exposure_canvas = None
+
+    def reset_visuals(self):
+        """Clear every visualization canvas and forget the previous frame."""
+        self.trail_canvas = None
+        self.long_exposure_canvas = None
+        self.ultra_long_exposure_canvas = None
+        self.preprocessor.reset()
+        self.trail_preprocessor.reset()
+
+
+def load_config(filename=CONFIG_FILE):
+    """Read a galton_config.json file, or return {} if there is none."""
+    if not os.path.exists(filename):
+        return {}
+    try:
+        with open(filename, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Could not load config: {e}")
+        return {}
+
+
+def run_headless(engine, duration=None, event_log=None):
+    """Count hits from the camera until Ctrl+C or `duration` seconds.
+
+    Prints every hit with the running counts and appends it to the
+    event_log CSV (capture sequence number, capture timestamp, bucket).
+    Returns the bucket counts.
+    """
+    counts = [0] * NUM_BUCKETS
+    log = None
+    if event_log:
+        log = open(event_log, 'w')
+        log.write("Seq,CaptureTime,Bucket\n")
+
+    # Stop on a timer rather than per frame, so it also fires if frames stop
+    timer = None
+    if duration is not None:
+        timer = threading.Timer(duration, engine.stop)
+        timer.start()
+
+    frames = engine.capture()
+    try:
+        for buffer, meta in frames:
+            hits = engine.process(buffer, meta)
+            buffer.release()
+            for bucket in hits:
+                counts[bucket] += 1
+                if log is not None:
+                    log.write(f"{meta.seq},{meta.timestamp:.6f},{bucket + 1}\n")
+                print(f"Hit detected in bucket {bucket + 1}! Counts: {counts}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        frames.close()
+        if timer is not None:
+            timer.cancel()
+        if log is not None:
+            log.close()
+    return counts
+
+
+def count_video(engine, path, event_log=None):
+    """Count hits in a video file as fast as it decodes, with no pacing or display.
+
+    Decoding runs on a VideoFileSource thread while this thread detects.
+    Hits go to the event_log CSV (frame index, video time in seconds,
+    bucket). Returns (counts, source) so callers can read the frame and
+    decode-time counters.
+    """
+    # Nothing is displayed, so skip everything that only draws
+    engine.trail_mode = 0
+    engine.show_bucket_overlay = False
+
+    counts = [0] * NUM_BUCKETS
+    source = VideoFileSource(path)
+    if not source.opened:
+        return counts, source  # No event log for a video that is not there
+
+    log = None
+    source.start()
+    try:
+        if event_log:
+            log = open(event_log, 'w')
+            log.write("Frame,VideoTime,Bucket\n")
+        for buffer, meta in source.frames():
+            hits = engine.process(buffer, meta)
+            buffer.release()
+            for bucket in hits:
+                counts[bucket] += 1
+                if log is not None:
+                    log.write(f"{meta.seq},{meta.timestamp:.3f},{bucket + 1}\n")
+    finally:
+        source.stop()
+        if log is not None:
+            log.close()
+    return counts, source
+
+
+def main():
+    """Headless entry point: count hits without any UI."""
+    parser = argparse.ArgumentParser(description="Count Galton board hits without a UI")
+    parser.add_argument("--config", default=CONFIG_FILE,
+                        help="Settings file written by the Qt app (default: %(default)s)")
+    parser.add_argument("--camera", help="Camera index or stream URL (default: from config)")
+    parser.add_argument("--video", help="Count a recorded video file as fast as it decodes")
+    parser.add_argument("--goal", help="Goal region as x1,y1,x2,y2 (default: from config)")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--event-log", help="Hit log CSV (default: galton_events_YYYYMMDD_HHMMSS.csv)")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    camera = config.get('camera_index', 0)
+    if args.camera is not None:
+        camera = int(args.camera) if args.camera.isdigit() else args.camera
+    engine = GaltonEngine(camera_index=camera)
+    engine.apply_config(config)
+    if args.goal:
+        engine.goal_region = tuple(int(v) for v in args.goal.split(","))
+    if not engine.goal_region:
+        print("No goal region: calibrate in the Qt app first or pass --goal x1,y1,x2,y2")
+        return 1
+
+    if args.video:
+        event_log = args.event_log or os.path.splitext(args.video)[0] + "_events.csv"
+        start = time.perf_counter()
+        counts, source = count_video(engine, args.video, event_log)
+        elapsed = time.perf_counter() - start
+        if not source.opened:
+            print(f"Could not open video {args.video}")
+            return 1
+
+        print("Bucket,Count")
+        for i, count in enumerate(counts):
+            print(f"{i + 1},{count}")
+        frames = source.frames_decoded
+        video_seconds = frames / source.fps
+        print(f"Total: {sum(counts)}  (event log: {event_log})")
+        print(f"{frames} frames ({video_seconds:.1f} s of video) in {elapsed:.1f} s: "
+              f"{frames / max(elapsed, 1e-6):.0f} fps, {video_seconds / max(elapsed, 1e-6):.1f}x realtime "
+              f"(decode {source.decode_seconds * 1000 / max(1, frames):.2f} ms/frame)")
+        return 0
+
+    event_log = args.event_log or f"galton_events_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    print(f"Counting on camera {camera}, goal region {engine.goal_region} "
+          f"({engine.counting_mode} counting). Press Ctrl+C to stop.")
+    counts = run_headless(engine, args.duration, event_log)
+
+    print("\nBucket,Count")
+    for i, count in enumerate(counts):
+        print(f"{i + 1},{count}")
+    print(f"Total: {sum(counts)}  ({engine.frames_processed} frames, event log: {event_log})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,28 +14,35 @@ import numpy as np
 import json
 import os
 import time
+import threading
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QSlider, QRadioButton, QButtonGroup,
     QGroupBox, QDialog, QTabWidget, QTextEdit, QFileDialog,
-    QMessageBox, QGraphicsOpacityEffect, QScrollArea, QComboBox, QCheckBox
+    QMessageBox, QGraphicsOpacityEffect, QScrollArea, QComboBox, QCheckBox, QStyle
 )
 from PyQt5.QtCore import (
     Qt, QTimer, pyqtSignal, QThread, QPropertyAnimation,
-    QEasingCurve, QRect, QSize, pyqtSlot
+    QEasingCurve, QRect, QSize, pyqtSlot, QObject, QEvent, QPoint
 )
 from PyQt5.QtGui import (
     QImage, QPixmap, QPainter, QColor, QPen, QBrush,
-    QLinearGradient, QFont, QPalette, QIcon
+    QLinearGradient, QFont, QPalette, QIcon, QRegion
+)
+
+from galton_engine import (
+    GaltonEngine, FrameBufferPool, FrameMailbox, VideoRecorder, ReplayBuffer, fit_display_size,
+    CONFIG_FILE, NUM_BUCKETS, DEFAULT_COOLDOWN_MS, DEFAULT_MOTION_THRESHOLD,
+    DEFAULT_MIN_CONTOUR_AREA, DETECTION_ENGINES, DETECTION_SCALE_CHOICES, COUNTING_MODES,
+    DETECTION_PRESETS, DEFAULT_SCORING_LINE, DEFAULT_REPLAY_SECONDS, REPLAY_FPS, REPLAY_MAX_MB,
+    DIAGNOSTICS_FILE
 )
 
 # Configuration
-CONFIG_FILE = "galton_config.json"
-NUM_BUCKETS = 11
-DEFAULT_COOLDOWN_FRAMES = 20
-DEFAULT_MOTION_THRESHOLD = 30
-DEFAULT_MIN_CONTOUR_AREA = 100
+COOLDOWN_MS_RANGE = (30, 4000)
+TARGET_FPS_CHOICES = [15, 30, 60, 120]
+REPLAY_SECONDS_CHOICES = [0, 30, 60, 120]  # Instant replay length; 0 = off
 
 # Color Palette (Mark Rober inspired)
 DARK_NAVY = QColor(7, 26, 47)        # #071A2F
@@ -51,341 +58,112 @@ WARNING_ORANGE = QColor(230, 126, 34)  # #E67E22
 ERROR_RED = QColor(192, 57, 43)      # #C0392B
 
 
-class VideoThread(QThread):
-    """Background thread for video processing to keep UI responsive."""
+class VideoThread(QThread, GaltonEngine):
+    """Background thread for video processing to keep UI responsive.
+
+    Runs GaltonEngine on a QThread and hands each processed frame to the UI
+    through the mailbox, with Qt signals for hits and frame statistics.
+    Clean recordings and the instant replay are fed from here too, so they
+    get every processed frame even when the UI falls behind.
+    """
 
-    frame_ready = pyqtSignal(np.ndarray)
-    detection_update = pyqtSignal(list)  # List of detected bucket indices
+    frame_ready = pyqtSignal()  # A new frame is waiting in the mailbox
+    detection_update = pyqtSignal(list, object)  # Detected bucket indices and FrameMeta
     fps_update = pyqtSignal(float)
+    timing_update = pyqtSignal(float, float)  # Measured frame period and jitter (ms)
 
     def __init__(self, camera_index=0):
-        super().__init__()
-        self.camera_index = camera_index
-        self.cap = None
-        self.running = False
-        self.paused = False
+        # PyQt passes camera_index on to GaltonEngine.__init__
+        super().__init__(camera_index=camera_index)
+        self.mailbox = FrameMailbox()  # Newest processed frame awaiting display
 
-        # Processing state
-        self.goal_region = None
-        self.prev_frame = None
-        self.prev_frame_full = None
-
-        # Visualization canvases
-        self.trail_canvas = None
-        self.long_exposure_canvas = None
-        self.ultra_long_exposure_canvas = None
-
-        # Settings
-        self.trail_mode = 0  # 0=Off, 1=Trails, 2=Long Exp, 3=Ultra-Long Exp
-        self.cooldown_frames = DEFAULT_COOLDOWN_FRAMES
-        self.motion_threshold = DEFAULT_MOTION_THRESHOLD
-        self.min_contour_area = DEFAULT_MIN_CONTOUR_AREA
-        self.trail_fade = 70  # Fade rate for mode 1 (Motion Trails)
-        self.trail_size = 3  # Thickness/dilation iterations for mode 1
-        self.long_exposure_duration = 85  # Persistence for mode 2 (1-100)
-        self.trail_color_index = 0
-        self.show_bucket_overlay = True  # Show bucket dividers on video
-        self.flip_horizontal = False  # Flip camera feed horizontally
-
-        # Cooldown and glow tracking
-        self.cooldown_counters = [0] * NUM_BUCKETS
-        self.glow_counters = [0] * NUM_BUCKETS
-
-        # Frame storage for clean recording
-        self.clean_frame = None  # Frame before overlays for clean recording mode
-
-        # Trail colors (BGR format)
-        self.trail_colors = [
-            ([50, 150, 255], "Orange"),
-            ([255, 200, 50], "Cyan"),
-            ([255, 50, 255], "Magenta"),
-            ([50, 255, 50], "Green"),
-            ([255, 100, 100], "Blue"),
-            ([50, 255, 255], "Yellow"),
-            ([255, 255, 255], "White"),
-            ([100, 100, 255], "Red"),
-        ]
-
-        # FPS tracking
-        self.fps = 0
-        self.frame_count = 0
-        self.fps_start_time = time.time()
+        # Outputs set from the GUI thread and fed from this one
+        self.outputs_lock = threading.Lock()
+        self.recorder = None  # VideoRecorder of a clean recording
+        self.replay_buffer = None  # ReplayBuffer while instant replay is on
 
     def run(self):
         """Main thread loop."""
-        self.running = True
-        self.cap = cv2.VideoCapture(self.camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-
-        while self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                # Flip horizontally if enabled
-                if self.flip_horizontal:
-                    frame = cv2.flip(frame, 1)
-
-                # Update FPS
-                self.update_fps()
-
-                # Process frame based on mode (respects paused flag internally)
-                processed_frame = self.process_frame(frame.copy())
-
-                # Detect balls only if not paused
-                if not self.paused:
-                    detected_buckets = self.detect_ball(frame)
-                    if detected_buckets:
-                        self.detection_update.emit(detected_buckets)
+        for buffer, meta in self.capture():
+            self.process_buffer(buffer, meta)
 
-                # Always emit processed frame (video keeps running)
-                self.frame_ready.emit(processed_frame)
+    def process_buffer(self, buffer, meta):
+        """Run one pooled frame through every stage and emit it.
 
-            self.msleep(16)  # ~60 FPS
-
-        if self.cap:
-            self.cap.release()
+        The frame is processed in place; ownership of the buffer's reference
+        passes to the frame_ready receiver.
+        """
+        detected_buckets = self.process(buffer, meta)
+
+        # Scale for the screen here rather than on the GUI thread
+        with self.profiler.measure("scale_display"):
+            buffer.display = self.scale_for_display(buffer.array)
+
+        if detected_buckets:
+            self.detection_update.emit(detected_buckets, meta)
+
+        # Recording and replay take the frame before the mailbox can skip it;
+        # both retain the buffer rather than copy it
+        with self.outputs_lock:
+            if self.recorder is not None:
+                with self.profiler.measure("record"):
+                    clean = buffer.clean if buffer.clean is not None else buffer
+                    self.recorder.submit(clean, meta, detected_buckets)
+            if self.replay_buffer is not None:
+                self.replay_buffer.submit(buffer, meta)
+                if detected_buckets:
+                    self.replay_buffer.add_hits(meta, detected_buckets)
+
+        # Always post the processed frame (video keeps running). The mailbox
+        # keeps only the newest one, so a busy UI never builds up a queue;
+        # whoever takes the buffer owns its reference and releases it.
+        if self.mailbox.post(buffer, meta):
+            self.frame_ready.emit()
+
+    def set_recorder(self, recorder):
+        """Record every processed frame, without overlays, to recorder (None stops)."""
+        with self.outputs_lock:
+            self.recorder = recorder
+            self.keep_clean_frame = recorder is not None
+
+    def set_replay_buffer(self, replay_buffer):
+        """Keep every processed frame in replay_buffer (None stops)."""
+        with self.outputs_lock:
+            self.replay_buffer = replay_buffer
 
     def stop(self):
         """Stop the thread."""
-        self.running = False
+        GaltonEngine.stop(self)
         self.wait()
 
-    def update_fps(self):
-        """Update FPS calculation."""
-        self.frame_count += 1
-        elapsed = time.time() - self.fps_start_time
-        if elapsed >= 1.0:
-            self.fps = self.frame_count / elapsed
-            self.fps_update.emit(self.fps)
-            self.frame_count = 0
-            self.fps_start_time = time.time()
-
-    def process_frame(self, frame):
-        """Process frame based on current mode."""
-        # Update visualization based on mode
-        if not self.paused and self.trail_mode > 0:
-            if self.trail_mode == 1:  # Motion Trails
-                self.update_trails(frame)
-            elif self.trail_mode == 2:  # Long Exposure
-                self.update_long_exposure(frame)
-            elif self.trail_mode == 3:  # Ultra-Long Exposure
-                self.update_ultra_long_exposure(frame)
-
-        # Apply visualization
-        if self.trail_mode == 1:
-            frame = self.apply_trails(frame)
-        elif self.trail_mode == 2:
-            frame = self.apply_long_exposure(frame)
-        elif self.trail_mode == 3:
-            frame = self.apply_ultra_long_exposure(frame)
-
-        # Save clean frame (camera + trails, no overlays) for clean recording mode
-        self.clean_frame = frame.copy()
-
-        # Draw bucket overlay if enabled
-        if self.show_bucket_overlay and self.goal_region:
-            frame = self.draw_bucket_overlay(frame)
-
-        return frame
-
-    def update_trails(self, frame):
-        """Update motion trail visualization."""
-        h, w = frame.shape[:2]
-        if self.trail_canvas is None or self.trail_canvas.shape[:2] != (h, w):
-            self.trail_canvas = np.zeros((h, w, 3), dtype=np.float32)
-
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (11, 11), 0)
-
-        if self.prev_frame_full is None:
-            self.prev_frame_full = gray
-            return
+    @property
+    def frames_display_skipped(self):
+        """Processed frames replaced by a newer one before the UI drew them."""
+        return self.mailbox.frames_skipped
 
-        frame_delta = cv2.absdiff(self.prev_frame_full, gray)
-        thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
-        thresh = cv2.dilate(thresh, None, iterations=self.trail_size)
-
-        motion_mask = thresh > 0
-        color = self.trail_colors[self.trail_color_index][0]
-        self.trail_canvas[motion_mask] = color
-
-        fade_rate = self.trail_fade / 100.0
-        self.trail_canvas *= fade_rate
-
-        self.prev_frame_full = gray
-
-    def apply_trails(self, frame):
-        """Blend trail canvas onto frame."""
-        if self.trail_canvas is None:
-            return frame
-        trail_uint8 = np.clip(self.trail_canvas, 0, 255).astype(np.uint8)
-        return cv2.add(frame, trail_uint8)
-
-    def update_long_exposure(self, frame):
-        """Update long exposure visualization."""
-        h, w = frame.shape[:2]
-        if self.long_exposure_canvas is None or self.long_exposure_canvas.shape[:2] != (h, w):
-            self.long_exposure_canvas = np.zeros((h, w, 3), dtype=np.float32)
-
-        frame_float = frame.astype(np.float32)
-        self.long_exposure_canvas = np.maximum(self.long_exposure_canvas, frame_float)
-
-        # Use long_exposure_duration (1-100) to control persistence
-        fade_rate = self.long_exposure_duration / 100.0
-        self.long_exposure_canvas = (self.long_exposure_canvas * fade_rate +
-                                     frame_float * (1 - fade_rate) * 0.5)
-
-    def apply_long_exposure(self, frame):
-        """Apply long exposure canvas."""
-        if self.long_exposure_canvas is None:
-            return frame
-        return np.clip(self.long_exposure_canvas, 0, 255).astype(np.uint8)
-
-    def update_ultra_long_exposure(self, frame):
-        """Update ultra-long exposure visualization."""
-        h, w = frame.shape[:2]
-        if self.ultra_long_exposure_canvas is None or self.ultra_long_exposure_canvas.shape[:2] != (h, w):
-            self.ultra_long_exposure_canvas = np.zeros((h, w, 3), dtype=np.float32)
-
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (11, 11), 0)
-
-        if self.prev_frame_full is None:
-            self.prev_frame_full = gray
-            return
+    def diagnostics(self):
+        """Stage timings and capture counters as a JSON-serialisable dict."""
+        diagnostics = GaltonEngine.diagnostics(self)
+        diagnostics["frames_display_skipped"] = self.frames_display_skipped
+        return diagnostics
 
-        frame_delta = cv2.absdiff(self.prev_frame_full, gray)
-        thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
-        thresh = cv2.dilate(thresh, None, iterations=1)
-
-        motion_mask = thresh > 0
-        self.ultra_long_exposure_canvas[motion_mask] += [15, 15, 15]
-        self.ultra_long_exposure_canvas = np.clip(self.ultra_long_exposure_canvas, 0, 255)
-
-        self.prev_frame_full = gray
-
-    def apply_ultra_long_exposure(self, frame):
-        """Blend accumulated trails on live feed."""
-        if self.ultra_long_exposure_canvas is None:
-            return frame
-        trails = np.clip(self.ultra_long_exposure_canvas, 0, 255).astype(np.uint8)
-        return cv2.add(frame, trails)
-
-    def draw_bucket_overlay(self, frame):
-        """Draw bucket dividers and labels on the frame."""
-        if not self.goal_region:
-            return frame
-
-        x1, y1, x2, y2 = self.goal_region
-
-        # Draw goal region rectangle
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-        # Calculate bucket width
-        region_width = x2 - x1
-        bucket_width = region_width / NUM_BUCKETS
-
-        # Draw vertical bucket dividers and glow effects
-        for i in range(NUM_BUCKETS):
-            # Draw bucket glow if active
-            if self.glow_counters[i] > 0:
-                # Calculate glow intensity (fade out over time)
-                glow_intensity = self.glow_counters[i] / 30.0  # 30 frames = ~1 second
-
-                # Create semi-transparent overlay for this bucket
-                bucket_x1 = int(x1 + i * bucket_width)
-                bucket_x2 = int(x1 + (i + 1) * bucket_width)
-
-                # Draw filled rectangle with alpha blending
-                overlay = frame.copy()
-                cv2.rectangle(overlay, (bucket_x1, y1), (bucket_x2, y2),
-                            (0, 255, 255), -1)  # Yellow fill
-                alpha = 0.3 * glow_intensity
-                cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-
-            # Draw divider line
-            if i > 0:
-                x = int(x1 + i * bucket_width)
-                cv2.line(frame, (x, y1), (x, y2), (0, 255, 0), 1)
-
-        # Draw bucket numbers above the goal region
-        for i in range(NUM_BUCKETS):
-            bucket_center_x = int(x1 + (i + 0.5) * bucket_width)
-            label = str(i + 1)
-
-            # Get text size for centering
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.5
-            thickness = 1
-            text_size = cv2.getTextSize(label, font, font_scale, thickness)[0]
-            text_x = bucket_center_x - text_size[0] // 2
-            text_y = y1 - 10
-
-            # Draw text with background for visibility
-            cv2.putText(frame, label, (text_x, text_y), font, font_scale,
-                       (0, 255, 0), thickness, cv2.LINE_AA)
-
-        return frame
-
-    def detect_ball(self, frame):
-        """Detect ball movement and return detected bucket indices."""
-        # Decrement cooldowns and glows
-        for i in range(NUM_BUCKETS):
-            self.cooldown_counters[i] = max(0, self.cooldown_counters[i] - 1)
-            self.glow_counters[i] = max(0, self.glow_counters[i] - 1)
-
-        if self.paused or not self.goal_region:
-            return []
-
-        x1, y1, x2, y2 = self.goal_region
-        roi = frame[y1:y2, x1:x2]
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-
-        if self.prev_frame is None:
-            self.prev_frame = gray
-            return []
-
-        frame_delta = cv2.absdiff(self.prev_frame, gray)
-        thresh = cv2.threshold(frame_delta, self.motion_threshold, 255, cv2.THRESH_BINARY)[1]
-        thresh = cv2.dilate(thresh, None, iterations=2)
-
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        self.prev_frame = gray
-
-        detected_buckets = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > self.min_contour_area:
-                M = cv2.moments(contour)
-                if M["m00"] > 0:
-                    cx = int(M["m10"] / M["m00"]) + x1
-                    bucket = self.get_bucket_index(cx)
-                    if bucket is not None and self.cooldown_counters[bucket] == 0:
-                        self.cooldown_counters[bucket] = self.cooldown_frames
-                        self.glow_counters[bucket] = 15
-                        detected_buckets.append(bucket)
-
-        return detected_buckets
-
-    def get_bucket_index(self, x):
-        """Determine which bucket an x-coordinate falls into."""
-        if not self.goal_region:
-            return None
-        x1, y1, x2, y2 = self.goal_region
-        if x < x1 or x > x2:
-            return None
-        bucket_width = (x2 - x1) / NUM_BUCKETS
-        bucket = int((x - x1) / bucket_width)
-        return min(bucket, NUM_BUCKETS - 1)
-
-    def reset_ultra_long_exposure(self):
-        """Reset ultra-long exposure canvas."""
-        self.ultra_long_exposure_canvas = None
+    def update_fps(self):
+        """Update FPS calculation, emitting the new rate and frame timing."""
+        if not GaltonEngine.update_fps(self):
+            return False
+        self.fps_update.emit(self.fps)
+        self.timing_update.emit(*self.pacer.take_stats())
+        return True
 
 
 class VisualizationWidget(QLabel):
-    """Widget to display OpenCV frames."""
+    """Widget to display OpenCV frames.
+
+    Frames are normally scaled to fit by VideoThread already (see
+    display_size_changed); anything that does not fit is scaled here.
+    """
+
+    display_size_changed = pyqtSignal(int, int)  # Drawable area in device pixels
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -400,19 +178,135 @@ class VisualizationWidget(QLabel):
             }
         """)
 
-    @pyqtSlot(np.ndarray)
-    def update_frame(self, frame):
-        """Update the displayed frame."""
-        # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
+    def display_size(self):
+        """Drawable area as (width, height) in device pixels."""
+        ratio = self.devicePixelRatioF()
+        rect = self.contentsRect()
+        return max(1, int(rect.width() * ratio)), max(1, int(rect.height() * ratio))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.display_size_changed.emit(*self.display_size())
 
-        # Scale to fit widget while maintaining aspect ratio
+    def update_frame(self, frame, fast=False):
+        """Update the displayed frame."""
+        # Wrap the BGR frame directly (Qt 5.14+), otherwise convert to RGB
+        h, w, ch = frame.shape
+        if hasattr(QImage, "Format_BGR888"):
+            qt_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        else:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            qt_image = QImage(rgb_frame.data, w, h, ch * w, QImage.Format_RGB888)
         pixmap = QPixmap.fromImage(qt_image)
-        scaled_pixmap = pixmap.scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.setPixmap(scaled_pixmap)
+
+        # Scale to fit widget while maintaining aspect ratio, unless the
+        # frame was already scaled for this size
+        display_w, display_h = self.display_size()
+        if (w, h) != fit_display_size(w, h, display_w, display_h):
+            mode = Qt.FastTransformation if fast else Qt.SmoothTransformation
+            pixmap = pixmap.scaled(display_w, display_h, Qt.KeepAspectRatio, mode)
+        pixmap.setDevicePixelRatio(self.devicePixelRatioF())
+        self.setPixmap(pixmap)
+
+
+class UICompositor(QObject):
+    """Composites full-UI recording frames without grabbing the whole window.
+
+    The window is rendered once into a persistent image; after that only
+    the regions that repainted since the previous frame (collected from
+    paint events) are rendered again, and the video widget's current pixmap
+    is drawn over its old one. Each frame is converted once into a pooled
+    BGR FrameBuffer for VideoRecorder. Widget changes show up once Qt has
+    repainted them, at most a frame later than in a full grab. It exists
+    only while a full-UI recording runs; close() stops the paint tracking.
+    """
+
+    def __init__(self, root, video_widget):
+        super().__init__(root)
+        self.root = root
+        self.video_widget = video_widget
+        self.canvas = None  # Format_RGB32 image of the whole UI
+        self.pool = FrameBufferPool()
+        self.dirty = QRegion()  # Repainted since the last frame, in root coordinates
+        self.full_redraw = True
+        self.rendering = False  # Ignore the paint events render() itself causes
+        self.video_rect = None  # Where the video pixmap was last drawn
+
+        for widget in [root] + root.findChildren(QWidget):
+            widget.installEventFilter(self)
+
+    def close(self):
+        """Remove the event filters and drop the canvas and dirty region."""
+        for widget in [self.root] + self.root.findChildren(QWidget):
+            widget.removeEventFilter(self)
+        self.canvas = None
+        self.dirty = QRegion()
+        self.deleteLater()
+
+    def eventFilter(self, obj, event):
+        if not self.rendering:
+            event_type = event.type()
+            if event_type == QEvent.Paint:
+                self.dirty += event.region().translated(obj.mapTo(self.root, QPoint(0, 0)))
+            elif event_type in (QEvent.Move, QEvent.Resize, QEvent.Show, QEvent.Hide):
+                self.full_redraw = True  # Layout changed
+            elif event_type == QEvent.ChildAdded and event.child().isWidgetType():
+                event.child().installEventFilter(self)
+                self.full_redraw = True
+        return False
+
+    def compose(self):
+        """Bring the UI image up to date and return it as a BGR FrameBuffer."""
+        size = self.root.size()
+        if self.canvas is None or self.canvas.size() != size:
+            self.canvas = QImage(size, QImage.Format_RGB32)
+            self.full_redraw = True
+        if self.root.window().isMinimized():
+            self.full_redraw = True  # Nothing repaints, so nothing would be marked dirty
+
+        # The video pixmap is drawn straight in every frame. Repaints of the
+        # video widget (and of its parent behind it) are skipped unless the
+        # pixmap moved or changed size.
+        video_area = QRect(self.video_widget.mapTo(self.root, QPoint(0, 0)), self.video_widget.size())
+        pixmap = self.video_widget.pixmap()
+        video_rect = None
+        if pixmap is not None and not pixmap.isNull() and self.video_widget.isVisible():
+            ratio = pixmap.devicePixelRatioF()
+            pixmap_size = QSize(round(pixmap.width() / ratio), round(pixmap.height() / ratio))
+            video_rect = QStyle.alignedRect(self.video_widget.layoutDirection(),
+                                            self.video_widget.alignment(), pixmap_size,
+                                            self.video_widget.contentsRect())
+            video_rect.translate(video_area.topLeft())
+
+        if self.full_redraw:
+            region = QRegion(self.root.rect())
+        elif video_rect != self.video_rect:
+            region = self.dirty + QRegion(video_area)
+        else:
+            region = self.dirty - QRegion(video_area)
+        self.video_rect = video_rect
+        self.dirty = QRegion()
+        self.full_redraw = False
+
+        painter = QPainter(self.canvas)
+        self.rendering = True
+        try:
+            for rect in region.rects():
+                self.root.render(painter, rect.topLeft(), QRegion(rect))
+            if video_rect is not None:
+                painter.drawPixmap(video_rect, pixmap)
+        finally:
+            self.rendering = False
+            painter.end()
+
+        # Format_RGB32 is BGRA in memory; drop alpha into the output frame
+        w, h = size.width(), size.height()
+        bits = self.canvas.constBits()
+        bits.setsize(self.canvas.byteCount())
+        bgra = np.frombuffer(bits, np.uint8).reshape(h, self.canvas.bytesPerLine() // 4, 4)
+        buffer = self.pool.acquire((h, w, 3))
+        cv2.cvtColor(bgra[:, :w], cv2.COLOR_BGRA2BGR, dst=buffer.array)
+        return buffer
 
 
 class HistogramWidget(QWidget):
@@ -421,7 +315,7 @@ class HistogramWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.bucket_counts = [0] * NUM_BUCKETS
-        self.glow_counters = [0] * NUM_BUCKETS
+        self.glow_levels = [0.0] * NUM_BUCKETS
         self.setMinimumHeight(180)
         self.show_gaussian = True
         self.show_stats_on_graph = True  # Show statistics text on histogram
@@ -431,11 +325,17 @@ class HistogramWidget(QWidget):
         self.std_dev = 0.0
         self.total = 0
 
-    def update_counts(self, counts, glow_counters=None):
+    def update_counts(self, counts, glow_levels=None):
         """Update bucket counts and recalculate statistics."""
+        if glow_levels is not None:
+            glow_levels = glow_levels.tolist() if isinstance(glow_levels, np.ndarray) else list(glow_levels)
+        else:
+            glow_levels = self.glow_levels
+        if counts == self.bucket_counts and glow_levels == self.glow_levels:
+            return  # Nothing to repaint (called ~30x per second by the glow timer)
+
         self.bucket_counts = counts[:]
-        if glow_counters:
-            self.glow_counters = glow_counters[:]
+        self.glow_levels = glow_levels
         self.total = sum(counts)
 
         if self.total > 0:
@@ -493,8 +393,8 @@ class HistogramWidget(QWidget):
             g = int(100 * (1 - ratio))
 
             # Apply glow effect if active
-            if self.glow_counters[i] > 0:
-                glow_intensity = self.glow_counters[i] / 15.0  # 15 frames max
+            if self.glow_levels[i] > 0:
+                glow_intensity = self.glow_levels[i]
                 # Brighten the color
                 r = min(255, int(r + (255 - r) * glow_intensity * 0.8))
                 g = min(255, int(g + (255 - g) * glow_intensity * 0.8))
@@ -813,6 +713,9 @@ class SettingsDialog(QDialog):
         # Camera tab
         tabs.addTab(self.create_camera_tab(), "📹 Camera")
 
+        # Diagnostics tab
+        tabs.addTab(self.create_diagnostics_tab(), "⏱ Diagnostics")
+
         # About tab
         tabs.addTab(self.create_about_tab(), "ℹ️ About")
 
@@ -911,13 +814,16 @@ class SettingsDialog(QDialog):
         manual_layout = QVBoxLayout()
 
         # Cooldown slider
-        cooldown_label = QLabel(f"Cooldown: {self.video_thread.cooldown_frames if self.video_thread else 45} frames")
+        cooldown_ms = self.video_thread.cooldown_ms if self.video_thread else DEFAULT_COOLDOWN_MS
+        cooldown_label = QLabel(f"Cooldown: {cooldown_ms} ms")
         manual_layout.addWidget(cooldown_label)
 
         self.cooldown_slider = QSlider(Qt.Horizontal)
-        self.cooldown_slider.setMinimum(1)
-        self.cooldown_slider.setMaximum(120)
-        self.cooldown_slider.setValue(self.video_thread.cooldown_frames if self.video_thread else 45)
+        self.cooldown_slider.setMinimum(COOLDOWN_MS_RANGE[0])
+        self.cooldown_slider.setMaximum(COOLDOWN_MS_RANGE[1])
+        self.cooldown_slider.setSingleStep(10)
+        self.cooldown_slider.setPageStep(100)
+        self.cooldown_slider.setValue(cooldown_ms)
         self.cooldown_slider.valueChanged.connect(
             lambda v: self.update_detection_value('cooldown', v, cooldown_label)
         )
@@ -952,6 +858,93 @@ class SettingsDialog(QDialog):
         manual_group.setLayout(manual_layout)
         layout.addWidget(manual_group)
 
+        # Detection engine
+        engine_group = QGroupBox("Detection Engine")
+        engine_layout = QVBoxLayout()
+
+        self.engine_combo = QComboBox()
+        for engine in DETECTION_ENGINES:
+            self.engine_combo.addItem(engine.name, engine.key)
+        if self.video_thread:
+            current_idx = self.engine_combo.findData(self.video_thread.detector.key)
+            if current_idx >= 0:
+                self.engine_combo.setCurrentIndex(current_idx)
+        self.engine_combo.currentIndexChanged.connect(self.update_detection_engine)
+        engine_layout.addWidget(self.engine_combo)
+
+        engine_info = QLabel("Frame Difference reacts to any change since the last frame. "
+                             "Running Average compares against a slowly adapting background, "
+                             "which copes better with lighting drift and pausing balls.")
+        engine_info.setWordWrap(True)
+        engine_info.setStyleSheet("color: #BDC3C7; font-style: italic;")
+        engine_layout.addWidget(engine_info)
+
+        engine_group.setLayout(engine_layout)
+        layout.addWidget(engine_group)
+
+        # Hit counting
+        counting_group = QGroupBox("Hit Counting")
+        counting_layout = QVBoxLayout()
+
+        self.counting_combo = QComboBox()
+        for mode, name in COUNTING_MODES:
+            self.counting_combo.addItem(name, mode)
+        if self.video_thread:
+            current_idx = self.counting_combo.findData(self.video_thread.counting_mode)
+            if current_idx >= 0:
+                self.counting_combo.setCurrentIndex(current_idx)
+        self.counting_combo.currentIndexChanged.connect(self.update_counting_mode)
+        counting_layout.addWidget(self.counting_combo)
+
+        scoring_line = int(round((self.video_thread.scoring_line if self.video_thread
+                                  else DEFAULT_SCORING_LINE) * 100))
+        line_label = QLabel(f"Scoring Line: {scoring_line}% down the goal region")
+        counting_layout.addWidget(line_label)
+
+        self.scoring_line_slider = QSlider(Qt.Horizontal)
+        self.scoring_line_slider.setMinimum(10)
+        self.scoring_line_slider.setMaximum(90)
+        self.scoring_line_slider.setValue(scoring_line)
+        self.scoring_line_slider.valueChanged.connect(
+            lambda v: self.update_detection_value('scoring_line', v, line_label)
+        )
+        counting_layout.addWidget(self.scoring_line_slider)
+
+        counting_info = QLabel("Ball tracking follows every ball and counts it once when it "
+                               "crosses the scoring line, so slow balls are not double-counted "
+                               "and balls landing close together are all counted. "
+                               "Cooldown mode uses the cooldown slider instead.")
+        counting_info.setWordWrap(True)
+        counting_info.setStyleSheet("color: #BDC3C7; font-style: italic;")
+        counting_layout.addWidget(counting_info)
+
+        counting_group.setLayout(counting_layout)
+        layout.addWidget(counting_group)
+
+        # Detection performance
+        performance_group = QGroupBox("Detection Performance")
+        performance_layout = QVBoxLayout()
+
+        performance_layout.addWidget(QLabel("Goal region analysis resolution:"))
+        self.detection_scale_combo = QComboBox()
+        for scale, name in DETECTION_SCALE_CHOICES:
+            self.detection_scale_combo.addItem(name, scale)
+        if self.video_thread:
+            current_idx = self.detection_scale_combo.findData(self.video_thread.detection_scale)
+            if current_idx >= 0:
+                self.detection_scale_combo.setCurrentIndex(current_idx)
+        self.detection_scale_combo.currentIndexChanged.connect(self.update_detection_scale)
+        performance_layout.addWidget(self.detection_scale_combo)
+
+        scale_info = QLabel("Lower resolutions cut detection CPU on HD cameras. "
+                            "Min contour size is scaled automatically.")
+        scale_info.setWordWrap(True)
+        scale_info.setStyleSheet("color: #BDC3C7; font-style: italic;")
+        performance_layout.addWidget(scale_info)
+
+        performance_group.setLayout(performance_layout)
+        layout.addWidget(performance_group)
+
         layout.addStretch()
         return widget
 
@@ -1058,6 +1051,16 @@ class SettingsDialog(QDialog):
         self.show_stats_check.stateChanged.connect(self.toggle_stats_on_graph)
         overlay_layout.addWidget(self.show_stats_check)
 
+        self.fast_scaling_check = QCheckBox("Fast video scaling (nearest-neighbour, for 4K displays)")
+        if self.video_thread:
+            self.fast_scaling_check.setChecked(self.video_thread.fast_display_scaling)
+        self.fast_scaling_check.setToolTip(
+            "Scale the video to the window with nearest-neighbour sampling.\n"
+            "Cheaper than the default smooth scaling on large displays, slightly blockier."
+        )
+        self.fast_scaling_check.stateChanged.connect(self.toggle_fast_scaling)
+        overlay_layout.addWidget(self.fast_scaling_check)
+
         overlay_group.setLayout(overlay_layout)
         layout.addWidget(overlay_group)
 
@@ -1130,9 +1133,99 @@ class SettingsDialog(QDialog):
         mode_group.setLayout(mode_layout)
         layout.addWidget(mode_group)
 
+        # Instant replay
+        replay_group = QGroupBox("Instant Replay")
+        replay_layout = QVBoxLayout()
+
+        replay_seconds_layout = QHBoxLayout()
+        replay_seconds_layout.addWidget(QLabel("Keep the last:"))
+        self.replay_combo = QComboBox()
+        for seconds in REPLAY_SECONDS_CHOICES:
+            self.replay_combo.addItem(f"{seconds} seconds" if seconds else "Off", seconds)
+        if self.parent() and hasattr(self.parent(), 'replay_seconds'):
+            current_idx = self.replay_combo.findData(self.parent().replay_seconds)
+            if current_idx >= 0:
+                self.replay_combo.setCurrentIndex(current_idx)
+        self.replay_combo.currentIndexChanged.connect(self.update_replay_seconds)
+        replay_seconds_layout.addWidget(self.replay_combo)
+        replay_seconds_layout.addStretch()
+        replay_layout.addLayout(replay_seconds_layout)
+
+        replay_info = QLabel(f"Press I to save the buffered video (with bucket overlay) and its\n"
+                             f"hits as galton_replay_YYYYMMDD_HHMMSS.mp4. Frames are kept as\n"
+                             f"JPEGs at {REPLAY_FPS} FPS, up to {REPLAY_MAX_MB} MB; "
+                             f"see Diagnostics for memory and CPU use.")
+        replay_info.setWordWrap(True)
+        replay_info.setStyleSheet("color: #BDC3C7; font-style: italic;")
+        replay_layout.addWidget(replay_info)
+
+        replay_group.setLayout(replay_layout)
+        layout.addWidget(replay_group)
+
         layout.addStretch()
         return widget
 
+    def create_diagnostics_tab(self):
+        """Create per-stage timing diagnostics tab."""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setSpacing(20)
+
+        # Stage timing
+        timing_group = QGroupBox("Stage Timing")
+        timing_layout = QVBoxLayout()
+
+        self.diagnostics_check = QCheckBox("Enable per-stage timing")
+        if self.video_thread:
+            self.diagnostics_check.setChecked(self.video_thread.profiler.enabled)
+        self.diagnostics_check.stateChanged.connect(self.toggle_diagnostics)
+        timing_layout.addWidget(self.diagnostics_check)
+
+        self.stage_table_label = QLabel()
+        self.stage_table_label.setFont(QFont("Courier New", 9))
+        self.stage_table_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        timing_layout.addWidget(self.stage_table_label)
+
+        buttons_layout = QHBoxLayout()
+        reset_stats_btn = QPushButton("Reset")
+        reset_stats_btn.clicked.connect(self.reset_diagnostics)
+        buttons_layout.addWidget(reset_stats_btn)
+
+        save_stats_btn = QPushButton("Save JSON...")
+        save_stats_btn.clicked.connect(self.save_diagnostics)
+        buttons_layout.addWidget(save_stats_btn)
+        buttons_layout.addStretch()
+        timing_layout.addLayout(buttons_layout)
+
+        timing_info = QLabel("Times are in ms. display is measured on the UI thread, read on the "
+                             "capture thread, everything else on the processing thread; "
+                             "process_frame includes draw_bucket_overlay. While enabled, "
+                             f"results are also written to {DIAGNOSTICS_FILE} on exit.")
+        timing_info.setWordWrap(True)
+        timing_info.setStyleSheet("color: #BDC3C7; font-style: italic;")
+        timing_layout.addWidget(timing_info)
+
+        timing_group.setLayout(timing_layout)
+        layout.addWidget(timing_group)
+
+        # Capture counters
+        capture_group = QGroupBox("Capture")
+        capture_layout = QVBoxLayout()
+        self.capture_stats_label = QLabel()
+        capture_layout.addWidget(self.capture_stats_label)
+        capture_group.setLayout(capture_layout)
+        layout.addWidget(capture_group)
+
+        layout.addStretch()
+
+        # Refresh while the dialog is open
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.timeout.connect(self.refresh_diagnostics)
+        self.diagnostics_timer.start(500)
+        self.refresh_diagnostics()
+
+        return widget
+
     def create_about_tab(self):
         """Create about tab."""
         widget = QWidget()
@@ -1222,6 +1315,34 @@ class SettingsDialog(QDialog):
         options_group.setLayout(options_layout)
         layout.addWidget(options_group)
 
+        # Frame pacing
+        pacing_group = QGroupBox("Frame Pacing")
+        pacing_layout = QVBoxLayout()
+
+        target_layout = QHBoxLayout()
+        target_layout.addWidget(QLabel("Target frame rate:"))
+        self.target_fps_combo = QComboBox()
+        for fps in TARGET_FPS_CHOICES:
+            self.target_fps_combo.addItem(f"{fps} FPS", fps)
+        if self.video_thread:
+            current_idx = self.target_fps_combo.findData(self.video_thread.pacer.target_fps)
+            if current_idx >= 0:
+                self.target_fps_combo.setCurrentIndex(current_idx)
+        self.target_fps_combo.currentIndexChanged.connect(self.update_target_fps)
+        target_layout.addWidget(self.target_fps_combo)
+        target_layout.addStretch()
+        pacing_layout.addLayout(target_layout)
+
+        self.free_run_check = QCheckBox("Free-run (never sleep, process every frame as it arrives)")
+        if self.video_thread:
+            self.free_run_check.setChecked(self.video_thread.pacer.free_run)
+            self.target_fps_combo.setEnabled(not self.video_thread.pacer.free_run)
+        self.free_run_check.stateChanged.connect(self.toggle_free_run)
+        pacing_layout.addWidget(self.free_run_check)
+
+        pacing_group.setLayout(pacing_layout)
+        layout.addWidget(pacing_group)
+
         # Camera info
         info_group = QGroupBox("Information")
         info_layout = QVBoxLayout()
@@ -1317,14 +1438,32 @@ class SettingsDialog(QDialog):
             return
 
         if param_type == 'cooldown':
-            self.video_thread.cooldown_frames = value
-            label.setText(f"Cooldown: {value} frames")
+            self.video_thread.cooldown_ms = value
+            label.setText(f"Cooldown: {value} ms")
         elif param_type == 'sensitivity':
             self.video_thread.motion_threshold = value
             label.setText(f"Motion Threshold: {value}")
         elif param_type == 'minsize':
             self.video_thread.min_contour_area = value
             label.setText(f"Min Contour Size: {value} px")
+        elif param_type == 'scoring_line':
+            self.video_thread.scoring_line = value / 100.0
+            label.setText(f"Scoring Line: {value}% down the goal region")
+
+    def update_detection_engine(self, index):
+        """Switch the detection engine."""
+        if self.video_thread:
+            self.video_thread.set_detection_engine(self.engine_combo.itemData(index))
+
+    def update_counting_mode(self, index):
+        """Switch between ball tracking and bucket cooldowns."""
+        if self.video_thread:
+            self.video_thread.set_counting_mode(self.counting_combo.itemData(index))
+
+    def update_detection_scale(self, index):
+        """Update the resolution used for goal-region motion analysis."""
+        if self.video_thread:
+            self.video_thread.detection_scale = self.detection_scale_combo.itemData(index)
 
     def update_visual_value(self, param_type, value, label):
         """Update visual parameter and label."""
@@ -1363,11 +1502,107 @@ class SettingsDialog(QDialog):
         if self.video_thread:
             self.video_thread.show_bucket_overlay = (state == Qt.Checked)
 
+    def toggle_fast_scaling(self, state):
+        """Toggle nearest-neighbour scaling of the video display."""
+        if self.video_thread:
+            self.video_thread.fast_display_scaling = (state == Qt.Checked)
+
     def toggle_horizontal_flip(self, state):
         """Toggle horizontal flip of camera feed."""
         if self.video_thread:
             self.video_thread.flip_horizontal = (state == Qt.Checked)
 
+    def update_target_fps(self, index):
+        """Update the target frame rate used for pacing."""
+        if self.video_thread:
+            self.video_thread.pacer.target_fps = self.target_fps_combo.itemData(index)
+
+    def toggle_free_run(self, state):
+        """Toggle free-run mode (no frame pacing)."""
+        free_run = (state == Qt.Checked)
+        self.target_fps_combo.setEnabled(not free_run)
+        if self.video_thread:
+            self.video_thread.pacer.free_run = free_run
+
+    def toggle_diagnostics(self, state):
+        """Enable or disable per-stage timing."""
+        if self.video_thread:
+            self.video_thread.profiler.enabled = (state == Qt.Checked)
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        """Redraw the stage timing table and capture counters."""
+        if not self.video_thread:
+            return
+
+        lines = [f"{'Stage':<20}{'Count':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'Max':>9}"]
+        for stage, stats in self.video_thread.profiler.summary().items():
+            lines.append(f"{stage:<20}{stats['count']:>8}{stats['p50_ms']:>9.2f}"
+                         f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}")
+        self.stage_table_label.setText("\n".join(lines))
+
+        self.capture_stats_label.setText(
+            f"Captured: {self.video_thread.frames_captured:,}    "
+            f"Dropped: {self.video_thread.frames_dropped:,}    "
+            f"Late: {self.video_thread.frames_late:,}    "
+            f"FPS: {self.video_thread.fps:.1f}\n"
+            f"Processed: {self.video_thread.frames_processed:,}    "
+            f"Skipped for display: {self.video_thread.frames_display_skipped:,}\n"
+            f"Frame data copied: {self.video_thread.bytes_copied_per_frame / 1024:,.0f} KB/frame"
+        )
+
+        recorder = getattr(self.parent(), 'recorder', None)
+        if recorder is not None:
+            self.capture_stats_label.setText(
+                self.capture_stats_label.text() + "\n"
+                f"Recording: {recorder.frames_enqueued:,} queued    "
+                f"{recorder.frames_written:,} written    "
+                f"{recorder.frames_dropped:,} dropped    "
+                f"({recorder.queue.qsize()} waiting)"
+            )
+
+        replay = getattr(self.parent(), 'replay_buffer', None)
+        if replay is not None:
+            self.capture_stats_label.setText(
+                self.capture_stats_label.text() + "\n"
+                f"Replay: {replay.duration:.0f} s    {len(replay.frames):,} frames    "
+                f"{replay.bytes_held / (1024 * 1024):,.1f} MB    "
+                f"encode {replay.encode_ms_per_frame:.1f} ms/frame "
+                f"({replay.encode_cpu * 100:.0f}% CPU)    "
+                f"{replay.frames_dropped:,} dropped"
+            )
+
+    def reset_diagnostics(self):
+        """Clear the stage timing histograms."""
+        if self.video_thread:
+            self.video_thread.profiler.reset()
+        self.refresh_diagnostics()
+
+    def save_diagnostics(self):
+        """Save the current diagnostics to a JSON file."""
+        if not self.video_thread:
+            return
+
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Save Diagnostics", DIAGNOSTICS_FILE, "JSON Files (*.json)"
+        )
+        if filename:
+            try:
+                diagnostics = self.video_thread.diagnostics()
+                replay = getattr(self.parent(), 'replay_buffer', None)
+                if replay is not None:
+                    diagnostics["replay"] = replay.stats()
+                with open(filename, 'w') as f:
+                    json.dump(diagnostics, f, indent=2)
+            except Exception as e:
+                msg_box = create_styled_message_box(
+                    self,
+                    "Error",
+                    f"Failed to save diagnostics:\n{str(e)}",
+                    QMessageBox.Critical
+                )
+                msg_box.exec_()
+
     def toggle_gaussian_curve(self, state):
         """Toggle Gaussian curve on histogram."""
         # Need to access parent's histogram widget
@@ -1386,6 +1621,11 @@ class SettingsDialog(QDialog):
         if self.parent():
             self.parent().record_full_ui = (state == Qt.Checked)
 
+    def update_replay_seconds(self, index):
+        """Change the instant replay length (0 turns it off)."""
+        if self.parent():
+            self.parent().set_replay_seconds(self.replay_combo.itemData(index))
+
     def change_output_folder(self):
         """Change output folder for recordings."""
         from PyQt5.QtWidgets import QFileDialog
@@ -1401,18 +1641,13 @@ class SettingsDialog(QDialog):
         if not self.video_thread:
             return
 
-        if preset_name == "high":
-            cooldown, threshold, min_area = 10, 15, 50
-        elif preset_name == "standard":
-            cooldown, threshold, min_area = DEFAULT_COOLDOWN_FRAMES, DEFAULT_MOTION_THRESHOLD, DEFAULT_MIN_CONTOUR_AREA
-        elif preset_name == "low_noise":
-            cooldown, threshold, min_area = 30, 50, 200
-        else:
+        if preset_name not in DETECTION_PRESETS:
             return
+        cooldown, threshold, min_area = DETECTION_PRESETS[preset_name]
 
         self.video_thread.motion_threshold = threshold
         self.video_thread.min_contour_area = min_area
-        self.video_thread.cooldown_frames = cooldown
+        self.video_thread.cooldown_ms = cooldown
 
         # Update sliders in dialog
         self.cooldown_slider.setValue(cooldown)
@@ -1431,10 +1666,10 @@ class SettingsDialog(QDialog):
         if self.video_thread:
             self.video_thread.motion_threshold = DEFAULT_MOTION_THRESHOLD
             self.video_thread.min_contour_area = DEFAULT_MIN_CONTOUR_AREA
-            self.video_thread.cooldown_frames = DEFAULT_COOLDOWN_FRAMES
+            self.video_thread.cooldown_ms = DEFAULT_COOLDOWN_MS
 
             # Update sliders
-            self.cooldown_slider.setValue(DEFAULT_COOLDOWN_FRAMES)
+            self.cooldown_slider.setValue(DEFAULT_COOLDOWN_MS)
             self.sensitivity_slider.setValue(DEFAULT_MOTION_THRESHOLD)
             self.minsize_slider.setValue(DEFAULT_MIN_CONTOUR_AREA)
 
@@ -1516,6 +1751,7 @@ class HelpOverlay(QDialog):
             ]),
             ("Recording", [
                 ("V", "Start/Stop recording"),
+                ("I", "Save instant replay"),
                 ("E", "Export session to CSV"),
             ]),
         ]
@@ -1639,6 +1875,8 @@ def create_styled_message_box(parent, title, text, icon=QMessageBox.Information,
 class MainWindow(QMainWindow):
     """Main application window."""
 
+    replay_saved = pyqtSignal(str, object)  # Filename, VideoRecorder or None
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Galton's Goalie - Science Edition")
@@ -1650,11 +1888,20 @@ class MainWindow(QMainWindow):
         self.calibrating = False
         self.recording = False
         self.sidebar_collapsed = False
-        self.video_writer = None
+        self.recorder = None  # VideoRecorder while recording
+        self.ui_compositor = None  # UICompositor while a full-UI recording runs
         self.record_filename = None
+        self.record_pending_hits = []  # (seq, buckets) not yet handed to the recorder
+        self.recording_full_ui = False  # Current recording composites the UI (set at start)
+        self.current_meta = None  # FrameMeta of the latest displayed frame
+        self.display_latency_ms = 0.0  # Smoothed capture-to-display latency
         self.current_frame = None  # Store latest frame for calibration
+        self.current_buffer = None  # Pooled FrameBuffer behind current_frame
         self.recording_output_folder = "."  # Default to current directory
         self.record_full_ui = True  # True = record with overlays, False = clean video only
+        self.replay_seconds = DEFAULT_REPLAY_SECONDS
+        self.replay_buffer = None  # ReplayBuffer while instant replay is on
+        self.replay_save_thread = None  # Writes the replay video in the background
 
         # Load camera index from config before creating video thread
         camera_index = 0  # Default camera
@@ -1671,14 +1918,19 @@ class MainWindow(QMainWindow):
         self.video_thread.frame_ready.connect(self.on_frame_ready)
         self.video_thread.detection_update.connect(self.on_detection)
         self.video_thread.fps_update.connect(self.on_fps_update)
-
-        # Load full configuration
-        self.load_config()
+        self.video_thread.timing_update.connect(self.on_timing_update)
 
         # Setup UI
         self.init_ui()
         self.apply_stylesheet()
 
+        # Load full configuration (after the UI so histogram settings apply too)
+        self.load_config()
+
+        # Instant replay buffer
+        self.replay_saved.connect(self.on_replay_saved)
+        self.set_replay_seconds(self.replay_seconds)
+
         # Timer for histogram glow updates
         self.glow_timer = QTimer(self)
         self.glow_timer.timeout.connect(self.update_histogram_glow)
@@ -1716,6 +1968,7 @@ class MainWindow(QMainWindow):
 
         # Visualization widget
         self.viz_widget = VisualizationWidget()
+        self.viz_widget.display_size_changed.connect(self.on_display_size_changed)
         right_layout.addWidget(self.viz_widget, stretch=1)
 
         # Histogram widget
@@ -1760,6 +2013,14 @@ class MainWindow(QMainWindow):
         self.fps_label.setFont(QFont("Arial", 9))
         layout.addWidget(self.fps_label)
 
+        layout.addSpacing(12)
+
+        # Capture-to-display latency
+        self.latency_label = QLabel("-- ms")
+        self.latency_label.setFont(QFont("Arial", 9))
+        self.latency_label.setToolTip("Capture-to-display latency")
+        layout.addWidget(self.latency_label)
+
         # Recording indicator
         self.rec_label = QLabel("REC")
         self.rec_label.setObjectName("recLabel")
@@ -1804,14 +2065,16 @@ class MainWindow(QMainWindow):
         controls_layout = QVBoxLayout()
 
         # Cooldown slider
-        controls_layout.addWidget(QLabel("Cooldown (frames)"))
+        controls_layout.addWidget(QLabel("Cooldown (ms)"))
         self.cooldown_slider = QSlider(Qt.Horizontal)
-        self.cooldown_slider.setRange(1, 120)
-        self.cooldown_slider.setValue(DEFAULT_COOLDOWN_FRAMES)
+        self.cooldown_slider.setRange(*COOLDOWN_MS_RANGE)
+        self.cooldown_slider.setSingleStep(10)
+        self.cooldown_slider.setPageStep(100)
+        self.cooldown_slider.setValue(DEFAULT_COOLDOWN_MS)
         self.cooldown_slider.valueChanged.connect(self.on_cooldown_changed)
         controls_layout.addWidget(self.cooldown_slider)
 
-        self.cooldown_label = QLabel(f"{DEFAULT_COOLDOWN_FRAMES} frames")
+        self.cooldown_label = QLabel(f"{DEFAULT_COOLDOWN_MS} ms")
         self.cooldown_label.setObjectName("sliderValue")
         controls_layout.addWidget(self.cooldown_label)
 
@@ -2075,82 +2338,112 @@ class MainWindow(QMainWindow):
         """
         self.setStyleSheet(stylesheet)
 
-    @pyqtSlot(np.ndarray)
-    def on_frame_ready(self, frame):
+    @pyqtSlot()
+    def on_frame_ready(self):
         """Handle new frame from video thread."""
-        self.current_frame = frame.copy()  # Store for calibration dialog
+        buffer, meta = self.video_thread.mailbox.take()
+        if buffer is None:
+            return  # Left over from a camera switch
+
+        # Hold the newest buffer (for the calibration dialog and recording)
+        # until the next one arrives, then hand the old one back to the pool
+        if self.current_buffer is not None:
+            self.current_buffer.release()
+        self.current_buffer = buffer
+        frame = self.current_frame = buffer.array
+        self.current_meta = meta
+
+        # Display path (pause overlay, conversion, scaling), timed as one stage
+        with self.video_thread.profiler.measure("display"):
+            # Use the copy VideoThread scaled for the screen when there is one
+            display_frame = buffer.display.array if buffer.display is not None else frame
+            if self.video_thread.paused:
+                # Pause indicator goes on a copy so recordings stay clean
+                display_frame = display_frame.copy()
+
+                # Draw semi-transparent overlay
+                overlay = display_frame.copy()
+                h, w = display_frame.shape[:2]
+
+                # Draw pause symbol (two vertical bars)
+                bar_width = 40
+                bar_height = 120
+                bar_gap = 30
+                center_x = w // 2
+                center_y = h // 2
+
+                # Left bar
+                cv2.rectangle(overlay,
+                             (center_x - bar_gap - bar_width, center_y - bar_height // 2),
+                             (center_x - bar_gap, center_y + bar_height // 2),
+                             (255, 255, 255), -1)
+
+                # Right bar
+                cv2.rectangle(overlay,
+                             (center_x + bar_gap, center_y - bar_height // 2),
+                             (center_x + bar_gap + bar_width, center_y + bar_height // 2),
+                             (255, 255, 255), -1)
+
+                # Blend overlay with original frame
+                cv2.addWeighted(overlay, 0.7, display_frame, 0.3, 0, display_frame)
+
+                # Add "PAUSED" text
+                font = cv2.FONT_HERSHEY_SIMPLEX
+                text = "PAUSED"
+                font_scale = 2.0
+                thickness = 4
+                text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
+                text_x = (w - text_size[0]) // 2
+                text_y = center_y + bar_height // 2 + 80
+
+                # Draw text with black outline
+                cv2.putText(display_frame, text, (text_x, text_y), font, font_scale, (0, 0, 0), thickness + 2)
+                cv2.putText(display_frame, text, (text_x, text_y), font, font_scale, (255, 255, 255), thickness)
+
+            self.viz_widget.update_frame(display_frame, self.video_thread.fast_display_scaling)
+
+        # Capture-to-display latency, smoothed for the top bar
+        latency_ms = (time.monotonic() - meta.timestamp) * 1000.0
+        if self.display_latency_ms > 0:
+            self.display_latency_ms = 0.9 * self.display_latency_ms + 0.1 * latency_ms
+        else:
+            self.display_latency_ms = latency_ms
 
-        # Add pause indicator overlay if paused
-        display_frame = frame.copy()
-        if self.video_thread.paused:
-            # Draw semi-transparent overlay
-            overlay = display_frame.copy()
-            h, w = display_frame.shape[:2]
-
-            # Draw pause symbol (two vertical bars)
-            bar_width = 40
-            bar_height = 120
-            bar_gap = 30
-            center_x = w // 2
-            center_y = h // 2
-
-            # Left bar
-            cv2.rectangle(overlay,
-                         (center_x - bar_gap - bar_width, center_y - bar_height // 2),
-                         (center_x - bar_gap, center_y + bar_height // 2),
-                         (255, 255, 255), -1)
-
-            # Right bar
-            cv2.rectangle(overlay,
-                         (center_x + bar_gap, center_y - bar_height // 2),
-                         (center_x + bar_gap + bar_width, center_y + bar_height // 2),
-                         (255, 255, 255), -1)
-
-            # Blend overlay with original frame
-            cv2.addWeighted(overlay, 0.7, display_frame, 0.3, 0, display_frame)
-
-            # Add "PAUSED" text
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            text = "PAUSED"
-            font_scale = 2.0
-            thickness = 4
-            text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
-            text_x = (w - text_size[0]) // 2
-            text_y = center_y + bar_height // 2 + 80
-
-            # Draw text with black outline
-            cv2.putText(display_frame, text, (text_x, text_y), font, font_scale, (0, 0, 0), thickness + 2)
-            cv2.putText(display_frame, text, (text_x, text_y), font, font_scale, (255, 255, 255), thickness)
-
-        self.viz_widget.update_frame(display_frame)
-
-        # Write to video file if recording (write original frame without pause overlay)
-        if self.recording and self.video_writer is not None:
-            # Choose which frame to record based on mode
-            if self.record_full_ui:
-                # Record full UI - capture entire application window
+        # A full-UI recording composites what is on screen; clean recordings
+        # are fed by VideoThread
+        if self.recording_full_ui and self.recorder is not None:
+            with self.video_thread.profiler.measure("record"):
                 self.record_full_ui_frame()
-            else:
-                # Record clean video (camera + trails only, no overlays)
-                if self.video_thread.clean_frame is not None:
-                    self.video_writer.write(self.video_thread.clean_frame)
-                else:
-                    # Fallback to regular frame if clean frame not available
-                    self.video_writer.write(frame)
 
-    @pyqtSlot(list)
-    def on_detection(self, buckets):
+    @pyqtSlot(int, int)
+    def on_display_size_changed(self, width, height):
+        """Have VideoThread scale frames to the video widget's new size."""
+        self.video_thread.display_size = (width, height)
+
+    @pyqtSlot(list, object)
+    def on_detection(self, buckets, meta):
         """Handle ball detection."""
         for bucket in buckets:
             self.bucket_counts[bucket] += 1
 
-        self.histogram_widget.update_counts(self.bucket_counts, self.video_thread.glow_counters)
+        # Hits are logged against the composited frame that shows them
+        if self.recording_full_ui:
+            self.record_pending_hits.append((meta.seq, buckets))
+
+        self.histogram_widget.update_counts(self.bucket_counts, self.video_thread.glow_levels())
         self.update_statistics()
 
     @pyqtSlot(float)
     def on_fps_update(self, fps):
-        """Update FPS display."""
+        """Update FPS and latency display."""
         self.fps_label.setText(f"{fps:.0f} FPS")
+        if self.current_meta is not None:
+            self.latency_label.setText(f"{self.display_latency_ms:.0f} ms")
+
+    @pyqtSlot(float, float)
+    def on_timing_update(self, period_ms, jitter_ms):
+        """Show measured frame period and jitter on the FPS label."""
+        self.fps_label.setToolTip(f"Frame period: {period_ms:.1f} ms (jitter ±{jitter_ms:.1f} ms)")
 
     def update_statistics(self):
         """Update statistics display."""
@@ -2168,8 +2461,8 @@ class MainWindow(QMainWindow):
             self.stddev_label.setText(f"Std Dev: σ = {std_dev:.2f}")
 
     def update_histogram_glow(self):
-        """Update histogram with current glow counters for animation."""
-        self.histogram_widget.update_counts(self.bucket_counts, self.video_thread.glow_counters)
+        """Update histogram with current glow levels for animation."""
+        self.histogram_widget.update_counts(self.bucket_counts, self.video_thread.glow_levels())
 
     def on_mode_changed(self, button):
         """Handle mode change."""
@@ -2187,10 +2480,8 @@ class MainWindow(QMainWindow):
 
     def on_cooldown_changed(self, value):
         """Handle cooldown slider change."""
-        self.video_thread.cooldown_frames = value
-        fps = self.video_thread.fps if self.video_thread.fps > 0 else 30
-        seconds = value / fps
-        self.cooldown_label.setText(f"{value} frames ({seconds:.2f}s)")
+        self.video_thread.cooldown_ms = value
+        self.cooldown_label.setText(f"{value} ms ({value / 1000:.2f}s)")
 
     def on_sensitivity_changed(self, value):
         """Handle sensitivity slider change."""
@@ -2250,8 +2541,10 @@ class MainWindow(QMainWindow):
         """Handle calibration completion."""
         self.goal_region = goal_region
         self.video_thread.goal_region = goal_region
-        # Reset prev_frame to avoid size mismatch errors
-        self.video_thread.prev_frame = None
+        # Start motion detection afresh for the new region
+        self.video_thread.preprocessor.reset()
+        self.video_thread.detector.reset()
+        self.video_thread.tracker.reset()
         self.save_config()
 
     def on_reset_clicked(self):
@@ -2300,32 +2593,37 @@ class MainWindow(QMainWindow):
                 msg_box.exec_()
 
     def record_full_ui_frame(self):
-        """Capture and record the entire UI window."""
+        """Composite the entire UI into a frame and record it."""
         try:
-            from PyQt5.QtGui import QImage
-
-            # Grab the central widget as a pixmap
-            pixmap = self.centralWidget().grab()
-
-            # Convert QPixmap to QImage in RGB888 format (consistent format)
-            qimage = pixmap.toImage().convertToFormat(QImage.Format_RGB888)
-
-            # Convert QImage to numpy array
-            width = qimage.width()
-            height = qimage.height()
-            ptr = qimage.bits()
-            ptr.setsize(height * width * 3)  # 3 bytes per pixel (RGB)
-            arr = np.frombuffer(ptr, np.uint8).reshape((height, width, 3))
-
-            # Convert RGB to BGR for OpenCV
-            frame_bgr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
-
-            # Write to video
-            if self.video_writer is not None:
-                self.video_writer.write(frame_bgr)
+            if (self.ui_compositor is not None and self.recorder is not None
+                    and self.current_meta is not None):
+                buffer = self.ui_compositor.compose()
+                self.write_recording_frame(buffer, self.current_meta)
+                buffer.release()
         except Exception as e:
             print(f"Error capturing full UI: {e}")
 
+    def write_recording_frame(self, frame, meta):
+        """Queue one frame, with the hits detected up to it, for the recorder thread."""
+        hits = [bucket for seq, buckets in self.record_pending_hits
+                if seq <= meta.seq for bucket in buckets]
+        self.record_pending_hits = [(seq, buckets) for seq, buckets in self.record_pending_hits
+                                    if seq > meta.seq]
+        self.recorder.submit(frame, meta, hits)
+
+    def close_recording(self):
+        """Flush and finalise the recording; returns the recorder for its counters."""
+        recorder, self.recorder = self.recorder, None
+        self.video_thread.set_recorder(None)
+        if recorder is not None:
+            recorder.close()
+        self.record_pending_hits = []
+        self.recording_full_ui = False
+        if self.ui_compositor is not None:
+            self.ui_compositor.close()
+            self.ui_compositor = None
+        return recorder
+
     def on_record_clicked(self):
         """Toggle recording."""
         self.recording = not self.recording
@@ -2353,11 +2651,25 @@ class MainWindow(QMainWindow):
             if width > 0 and height > 0:
                 fourcc = cv2.VideoWriter_fourcc(*'mp4v')
                 fps = self.video_thread.fps if self.video_thread.fps > 0 else 30.0
-                self.video_writer = cv2.VideoWriter(
-                    self.record_filename, fourcc, fps, (width, height)
+                # Encoding runs on the recorder's own thread; the sidecar log
+                # correlates each video frame with its capture sequence
+                # number, timestamp and detections. The UI only composites
+                # the frames it draws, so full-UI frames are placed by time.
+                self.recorder = VideoRecorder(
+                    self.record_filename, fourcc, fps, (width, height),
+                    log_filename=os.path.splitext(self.record_filename)[0] + "_frames.csv",
+                    timed=self.record_full_ui
                 )
 
-                if self.video_writer.isOpened():
+                if self.recorder.is_opened():
+                    self.record_pending_hits = []
+                    self.recorder.start()
+                    self.recording_full_ui = self.record_full_ui
+                    if self.record_full_ui:
+                        self.ui_compositor = UICompositor(self.centralWidget(), self.viz_widget)
+                    else:
+                        self.video_thread.set_recorder(self.recorder)
+
                     self.record_btn.setText("⏹ Stop Recording (V)")
                     self.rec_label.setVisible(True)
                     print(f"Recording started: {self.record_filename}")
@@ -2369,6 +2681,7 @@ class MainWindow(QMainWindow):
                         QMessageBox.Critical
                     )
                     msg_box.exec_()
+                    self.close_recording()
                     self.recording = False
             else:
                 msg_box = create_styled_message_box(
@@ -2384,12 +2697,76 @@ class MainWindow(QMainWindow):
             self.record_btn.setText("🎬 Start Recording (V)")
             self.rec_label.setVisible(False)
 
-            if self.video_writer is not None:
-                self.video_writer.release()
-                self.video_writer = None
-                print(f"Recording stopped: {self.record_filename}")
+            if self.recorder is not None:
+                recorder = self.close_recording()
+                timing = (f", {recorder.frames_repeated} repeated and {recorder.frames_skipped} "
+                          f"skipped to keep time" if recorder.timed else "")
+                print(f"Recording stopped: {self.record_filename} "
+                      f"({recorder.frames_written} frames written, {recorder.frames_dropped} dropped"
+                      f"{timing})")
                 self.record_filename = None
 
+    def set_replay_seconds(self, seconds):
+        """Set the instant replay length, starting or stopping the buffer."""
+        self.replay_seconds = seconds
+        if seconds <= 0:
+            if self.replay_buffer is not None:
+                self.video_thread.set_replay_buffer(None)
+                self.replay_buffer.close()
+                self.replay_buffer = None
+        elif self.replay_buffer is None:
+            self.replay_buffer = ReplayBuffer(seconds)
+            self.replay_buffer.start()
+            self.video_thread.set_replay_buffer(self.replay_buffer)
+        else:
+            self.replay_buffer.set_seconds(seconds)
+
+    def on_save_replay(self):
+        """Save the instant replay buffer to a video in the background."""
+        if self.replay_buffer is None:
+            print("Instant replay is off (Settings → Recording)")
+            return
+        if self.replay_save_thread is not None:
+            print("Still saving the previous replay")
+            return
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.join(self.recording_output_folder, f"galton_replay_{timestamp}.mp4")
+        self.replay_save_thread = threading.Thread(
+            target=self.write_replay, args=(self.replay_buffer, filename), daemon=True
+        )
+        self.replay_save_thread.start()
+        print(f"Saving instant replay: {filename}")
+
+    def write_replay(self, replay_buffer, filename):
+        """Write the replay video and its frame log (runs on replay_save_thread)."""
+        recorder = None
+        try:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            recorder = replay_buffer.save(
+                filename, fourcc, log_filename=os.path.splitext(filename)[0] + "_frames.csv"
+            )
+        except Exception as e:
+            print(f"Could not save instant replay: {e}")
+        self.replay_saved.emit(filename, recorder)
+
+    @pyqtSlot(str, object)
+    def on_replay_saved(self, filename, recorder):
+        """Report a finished instant replay save."""
+        self.replay_save_thread.join()
+        self.replay_save_thread = None
+        if recorder is None:
+            print(f"Instant replay not saved: {filename}")
+            return
+        print(f"Instant replay saved: {filename} ({recorder.frames_written} frames)")
+
+        msg_box = create_styled_message_box(
+            self,
+            "Replay Saved",
+            f"Saved the last {recorder.frames_written} frames to:\n{filename}"
+        )
+        msg_box.exec_()
+
     def change_camera(self, camera_index):
         """Change to a different camera."""
         # Stop current video thread
@@ -2400,9 +2777,16 @@ class MainWindow(QMainWindow):
         self.video_thread.frame_ready.connect(self.on_frame_ready)
         self.video_thread.detection_update.connect(self.on_detection)
         self.video_thread.fps_update.connect(self.on_fps_update)
+        self.video_thread.timing_update.connect(self.on_timing_update)
 
         # Restore settings
         self.load_config()
+        self.video_thread.display_size = self.viz_widget.display_size()
+
+        # Keep feeding the instant replay and any clean recording
+        self.video_thread.set_replay_buffer(self.replay_buffer)
+        if self.recorder is not None and not self.recording_full_ui:
+            self.video_thread.set_recorder(self.recorder)
 
         # Update camera label
         self.camera_label.setText(f"Camera: #{camera_index}")
@@ -2427,78 +2811,41 @@ class MainWindow(QMainWindow):
                 with open(CONFIG_FILE, 'r') as f:
                     config = json.load(f)
 
-                    # Goal region
-                    goal_region = config.get('goal_region')
-                    if goal_region and len(goal_region) == 4:
-                        self.goal_region = tuple(goal_region)
-                        self.video_thread.goal_region = self.goal_region
-
-                    # Camera index
-                    if 'camera_index' in config:
-                        # This is loaded when creating VideoThread, so just store it
-                        pass
-
-                    # Detection settings
-                    if 'cooldown_frames' in config:
-                        self.video_thread.cooldown_frames = config['cooldown_frames']
-                    if 'motion_threshold' in config:
-                        self.video_thread.motion_threshold = config['motion_threshold']
-                    if 'min_contour_area' in config:
-                        self.video_thread.min_contour_area = config['min_contour_area']
-
-                    # Visual settings
-                    if 'trail_color_index' in config:
-                        self.video_thread.trail_color_index = config['trail_color_index']
-                    if 'trail_size' in config:
-                        self.video_thread.trail_size = config['trail_size']
-                    if 'long_exposure_duration' in config:
-                        self.video_thread.long_exposure_duration = config['long_exposure_duration']
-                    if 'show_bucket_overlay' in config:
-                        self.video_thread.show_bucket_overlay = config['show_bucket_overlay']
+                    # Detection, visual, pacing and diagnostics settings
+                    self.video_thread.apply_config(config)
+                    if self.video_thread.goal_region:
+                        self.goal_region = self.video_thread.goal_region
+
+                    # Histogram settings
                     if 'show_gaussian' in config:
                         self.histogram_widget.show_gaussian = config['show_gaussian']
                     if 'show_stats_on_graph' in config:
                         self.histogram_widget.show_stats_on_graph = config['show_stats_on_graph']
-                    if 'flip_horizontal' in config:
-                        self.video_thread.flip_horizontal = config['flip_horizontal']
 
                     # Recording settings
                     if 'recording_output_folder' in config:
                         self.recording_output_folder = config['recording_output_folder']
                     if 'record_full_ui' in config:
                         self.record_full_ui = config['record_full_ui']
+                    if 'replay_seconds' in config:
+                        self.replay_seconds = config['replay_seconds']
 
             except Exception as e:
                 print(f"Could not load config: {e}")
 
     def save_config(self):
         """Save configuration to file."""
-        config = {}
-
-        # Goal region
-        if self.goal_region:
-            config['goal_region'] = list(self.goal_region)
-
-        # Camera settings
-        config['camera_index'] = self.video_thread.camera_index
+        # Detection, visual, pacing and diagnostics settings
+        config = self.video_thread.config()
 
-        # Detection settings
-        config['cooldown_frames'] = self.video_thread.cooldown_frames
-        config['motion_threshold'] = self.video_thread.motion_threshold
-        config['min_contour_area'] = self.video_thread.min_contour_area
-
-        # Visual settings
-        config['trail_color_index'] = self.video_thread.trail_color_index
-        config['trail_size'] = self.video_thread.trail_size
-        config['long_exposure_duration'] = self.video_thread.long_exposure_duration
-        config['show_bucket_overlay'] = self.video_thread.show_bucket_overlay
+        # Histogram settings
         config['show_gaussian'] = self.histogram_widget.show_gaussian
         config['show_stats_on_graph'] = self.histogram_widget.show_stats_on_graph
-        config['flip_horizontal'] = self.video_thread.flip_horizontal
 
         # Recording settings
         config['recording_output_folder'] = self.recording_output_folder
         config['record_full_ui'] = self.record_full_ui
+        config['replay_seconds'] = self.replay_seconds
 
         try:
             with open(CONFIG_FILE, 'w') as f:
@@ -2558,6 +2905,10 @@ class MainWindow(QMainWindow):
         elif key == Qt.Key_V:
             self.on_record_clicked()
 
+        # I - Save instant replay
+        elif key == Qt.Key_I:
+            self.on_save_replay()
+
         # Space or P - Pause/Resume
         elif key == Qt.Key_Space or key == Qt.Key_P:
             self.video_thread.paused = not self.video_thread.paused
@@ -2578,12 +2929,31 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         """Handle window close."""
         # Stop recording if active
-        if self.recording and self.video_writer is not None:
-            self.video_writer.release()
-            self.video_writer = None
+        if self.recording and self.recorder is not None:
+            self.close_recording()
+
+        # Let a replay that is being saved finish, then stop the buffer
+        if self.replay_save_thread is not None:
+            self.replay_save_thread.join()
+        if self.replay_buffer is not None:
+            self.video_thread.set_replay_buffer(None)
+            self.replay_buffer.close()
 
         self.video_thread.stop()
         self.save_config()
+
+        # Dump stage timings collected during this session
+        if self.video_thread.profiler.enabled:
+            try:
+                diagnostics = self.video_thread.diagnostics()
+                if self.replay_buffer is not None:
+                    diagnostics["replay"] = self.replay_buffer.stats()
+                with open(DIAGNOSTICS_FILE, 'w') as f:
+                    json.dump(diagnostics, f, indent=2)
+                print(f"Diagnostics saved to {DIAGNOSTICS_FILE}")
+            except Exception as e:
+                print(f"Could not save diagnostics: {e}")
+
         event.accept()
 
 
@@ -0,0 +1,245 @@
+"""
+Galton's Goalie - Board Simulator
+=================================
+Renders synthetic Galton board footage with ground-truth labels, so
+detection can be exercised and benchmarked without a board or camera.
+
+Balls drop from the top centre, bounce left or right off each of the
+NUM_BUCKETS - 1 peg rows (so buckets follow a binomial distribution) and
+fall through the goal region at the bottom of the frame. Ball positions
+are computed for all balls in flight at once with NumPy; frames get
+per-pixel sensor noise and a slow lighting drift. Every ball that crosses
+the scoring line is reported with its bucket, frame and video time.
+
+Frames are produced one at a time, from a generator or straight into an
+MP4, so clips of any length never sit in memory.
+
+Usage:
+  python galton_simulator.py sim.mp4 --duration 60 --rate 3
+  python galton_engine.py --video sim.mp4 --goal 128,480,1152,684
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from create_mockups import create_gradient, DARK_NAVY, DEEP_BLUE, LIGHT_GRAY, SLATE
+from galton_engine import FrameMeta, NUM_BUCKETS, DEFAULT_SCORING_LINE
+
+PEG_ROWS = NUM_BUCKETS - 1
+PEG_TOP = 0.12     # First and last peg row, as fractions of the frame height
+PEG_BOTTOM = 0.55
+FALL_SPEED = 0.7   # Frame heights per second (about 8 px/frame at 720p and 60 fps)
+BOUNCE_HEIGHT = 0.3  # Hop above the straight drop between rows, in row spacings
+BUCKET_JITTER = 0.25  # Max landing offset from the bucket centre, in bucket widths
+NOISE_BANK_SIZE = 8  # Pre-generated noise frames cycled through (generating per frame is slow)
+DRIFT_PERIOD = 20.0  # Seconds per lighting drift cycle
+BALL_COLOR = (225, 230, 235)
+
+# A ball crossing the scoring line: which bucket it lands in, and when
+Label = namedtuple("Label", "ball bucket frame timestamp")
+
+
+def simulator_goal_region(width, height):
+    """Goal region of a simulated frame (the bottom third, inset a little)."""
+    return (width // 10, height * 2 // 3, width * 9 // 10, height - height // 20)
+
+
+class GaltonSimulator:
+    """Synthetic Galton board clip with ground truth.
+
+    rate is the mean number of balls dropped per second, noise the standard
+    deviation of the sensor noise in grey levels and drift the amplitude of
+    the lighting change as a fraction of the brightness.
+    """
+
+    def __init__(self, width=1280, height=720, fps=60.0, duration=60.0, rate=2.0,
+                 noise=3.0, drift=0.1, seed=0, scoring_line=DEFAULT_SCORING_LINE):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.num_frames = int(round(duration * fps))
+        self.rate = rate
+        self.noise = noise
+        self.drift = drift
+        self.seed = seed
+
+        self.goal_region = simulator_goal_region(width, height)
+        x1, y1, x2, y2 = self.goal_region
+        self.bucket_width = (x2 - x1) / NUM_BUCKETS
+        self.radius = max(6, height // 50)
+        self.center_x = x1 + NUM_BUCKETS / 2 * self.bucket_width
+        self.speed = FALL_SPEED * height
+        self.peg_top = PEG_TOP * height
+        self.row_spacing = (PEG_BOTTOM - PEG_TOP) * height / (PEG_ROWS - 1)
+        self.spawn_y = -self.radius
+        self.line_y = y1 + scoring_line * (y2 - y1)
+        self.exit_y = height + self.radius
+
+        self.board = self.draw_board()
+        self.truth = []  # Labels of the frames generated so far
+
+    def draw_board(self):
+        """Static background: the board, its pegs and the bucket dividers."""
+        board = create_gradient(self.width, self.height, DARK_NAVY, DEEP_BLUE, horizontal=False)
+        peg_radius = max(2, self.radius // 3)
+        for row in range(PEG_ROWS):
+            y = int(round(self.peg_top + row * self.row_spacing + self.radius + peg_radius))
+            for i in range(row + 1):
+                # A peg under every position a ball can reach this row at
+                x = self.center_x + (i - row / 2) * self.bucket_width
+                cv2.circle(board, (int(round(x)), y), peg_radius, LIGHT_GRAY, -1, cv2.LINE_AA)
+        x1, y1, x2, y2 = self.goal_region
+        for i in range(NUM_BUCKETS + 1):
+            x = int(round(x1 + i * self.bucket_width))
+            cv2.line(board, (x, y1 - self.radius), (x, self.height), SLATE, 2)
+        return board
+
+    def positions(self, paths, offsets, t):
+        """Centres of balls dropped t seconds ago (arrays, one entry per ball).
+
+        paths holds each ball's cumulative right bounces after every peg row.
+        """
+        y = self.spawn_y + self.speed * t
+        # Progress through the peg rows: row k is passed at rows == k
+        rows = np.clip((y - self.peg_top) / self.row_spacing, -1.0, PEG_ROWS - 1.0)
+        row = np.floor(rows).astype(np.int64)
+        u = rows - row
+        # Horizontal offset after each row, in bucket widths; -1 is the drop point
+        index = np.arange(len(t))
+        before = np.where(row >= 0, paths[index, np.maximum(row, 0)] - (row + 1) / 2, 0.0)
+        after = np.where(row + 1 < PEG_ROWS,
+                         paths[index, np.minimum(row + 1, PEG_ROWS - 1)] - (row + 2) / 2, before)
+        ease = u * u * (3 - 2 * u)
+        x = self.center_x + (before + (after - before) * ease + offsets) * self.bucket_width
+        hop = np.where((rows > -1) & (rows < PEG_ROWS - 1), np.sin(np.pi * u), 0.0)
+        return x, y - BOUNCE_HEIGHT * self.row_spacing * hop
+
+    def frames(self):
+        """Yield (frame, FrameMeta, labels) for every frame of the clip.
+
+        labels lists the balls that crossed the scoring line in that frame.
+        """
+        rng = np.random.default_rng(self.seed)
+        noise_bank = [
+            np.rint(rng.standard_normal((self.height, self.width, 3), dtype=np.float32)
+                    * self.noise).astype(np.int16)
+            for _ in range(NOISE_BANK_SIZE if self.noise > 0 else 0)
+        ]
+        cross_time = (self.line_y - self.spawn_y) / self.speed
+        exit_time = (self.exit_y - self.spawn_y) / self.speed
+
+        spawn = np.empty(0)
+        paths = np.empty((0, PEG_ROWS), dtype=np.int64)
+        offsets = np.empty(0)
+        ids = np.empty(0, dtype=np.int64)
+        next_id = 0
+        noise_index = 0
+        self.truth = []
+        for seq in range(self.num_frames):
+            now = seq / self.fps
+
+            # New balls at random times within this frame
+            count = rng.poisson(self.rate / self.fps)
+            if count:
+                spawn = np.concatenate([spawn, now + rng.uniform(-1.0 / self.fps, 0, count)])
+                bounces = rng.integers(0, 2, size=(count, PEG_ROWS))
+                paths = np.concatenate([paths, np.cumsum(bounces, axis=1)])
+                offsets = np.concatenate([offsets, rng.uniform(-BUCKET_JITTER, BUCKET_JITTER, count)])
+                ids = np.concatenate([ids, np.arange(next_id, next_id + count)])
+                next_id += count
+
+            # Drop balls that have left the frame
+            age = now - spawn
+            keep = age < exit_time
+            spawn, paths, offsets, ids, age = spawn[keep], paths[keep], offsets[keep], ids[keep], age[keep]
+
+            crossed = (age >= cross_time) & (age - 1.0 / self.fps < cross_time)
+            labels = [Label(int(ball), int(path[-1]), seq, now)
+                      for ball, path in zip(ids[crossed], paths[crossed])]
+            self.truth.extend(labels)
+
+            frame = self.board.copy()
+            xs, ys = self.positions(paths, offsets, age)
+            for x, y in zip(np.rint(xs).astype(int), np.rint(ys).astype(int)):
+                cv2.circle(frame, (x, y), self.radius, BALL_COLOR, -1, cv2.LINE_AA)
+
+            if self.drift:
+                gain = 1.0 + self.drift * np.sin(2 * np.pi * now / DRIFT_PERIOD)
+                frame = cv2.convertScaleAbs(frame, alpha=gain)
+            if noise_bank:
+                # Never the same noise twice in a row, or the frame delta would cancel it
+                noise_index = (noise_index + rng.integers(1, NOISE_BANK_SIZE)) % NOISE_BANK_SIZE
+                frame = cv2.add(frame, noise_bank[noise_index], dtype=cv2.CV_8U)
+
+            yield frame, FrameMeta(seq, now), labels
+
+    def write_video(self, filename, fourcc="mp4v"):
+        """Render the clip to a video file; returns the ground-truth labels."""
+        writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*fourcc), self.fps,
+                                 (self.width, self.height))
+        if not writer.isOpened():
+            raise IOError(f"Could not open {filename} for writing")
+        try:
+            for frame, _, _ in self.frames():
+                writer.write(frame)
+        finally:
+            writer.release()
+        return self.truth
+
+
+def write_labels(filename, labels):
+    """Ground truth as CSV, in the same layout as the event logs."""
+    with open(filename, 'w') as f:
+        f.write("Frame,VideoTime,Bucket,Ball\n")
+        for label in labels:
+            f.write(f"{label.frame},{label.timestamp:.3f},{label.bucket + 1},{label.ball}\n")
+
+
+def load_labels(filename):
+    """Read a ground-truth CSV written by write_labels."""
+    labels = []
+    with open(filename) as f:
+        next(f)
+        for line in f:
+            frame, timestamp, bucket, ball = line.strip().split(",")
+            labels.append(Label(int(ball), int(bucket) - 1, int(frame), float(timestamp)))
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a synthetic Galton board clip with ground truth")
+    parser.add_argument("output", help="Video file to write, e.g. sim.mp4")
+    parser.add_argument("--labels", help="Ground-truth CSV (default: <output>_truth.csv)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of video")
+    parser.add_argument("--rate", type=float, default=2.0, help="Mean balls dropped per second")
+    parser.add_argument("--noise", type=float, default=3.0, help="Sensor noise (grey levels)")
+    parser.add_argument("--drift", type=float, default=0.1,
+                        help="Lighting drift amplitude (fraction of brightness)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    simulator = GaltonSimulator(args.width, args.height, args.fps, args.duration, args.rate,
+                                args.noise, args.drift, args.seed)
+    print(f"Rendering {simulator.num_frames} frames at {args.width}x{args.height}...")
+    labels = simulator.write_video(args.output)
+    labels_file = args.labels or args.output.rsplit(".", 1)[0] + "_truth.csv"
+    write_labels(labels_file, labels)
+
+    counts = np.bincount([label.bucket for label in labels], minlength=NUM_BUCKETS)
+    print("Bucket,Count")
+    for i, count in enumerate(counts):
+        print(f"{i + 1},{count}")
+    print(f"Total: {len(labels)}  (ground truth: {labels_file})")
+    print(f"Goal region: {','.join(str(v) for v in simulator.goal_region)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,37 +22,38 @@ Sliders:
 """
 
 import cv2
-import numpy as np
 import json
 import os
+import sys
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from galton_engine import GaltonEngine, FrameBuffer, FrameMeta, CONFIG_FILE, NUM_BUCKETS  # noqa: E402
+
 # Configuration
-CONFIG_FILE = "galton_config.json"
-NUM_BUCKETS = 11
 DEFAULT_COOLDOWN_FRAMES = 20  # Frames to wait before counting another hit (~0.7s at 30fps)
-DEFAULT_MOTION_THRESHOLD = 30  # Sensitivity for motion detection
-DEFAULT_MIN_CONTOUR_AREA = 100  # Minimum area to consider as ball movement
+ASSUMED_FPS = 30  # Converts the cooldown slider's frames to the engine's milliseconds
 
 class GaltonGoalieApp:
     def __init__(self, camera_index=0):
+        # Detection and trail modes run in the shared engine; this class is
+        # the OpenCV window around it
+        self.engine = GaltonEngine(camera_index=camera_index)
+        self.engine.set_counting_mode("cooldown")
+        self.engine.show_bucket_overlay = False  # draw_overlay draws its own
+        self.engine.trail_size = 1  # Legacy trails dilate once
         self.camera_index = camera_index
         self.cap = None
 
         # Calibration state
         self.calibrating = False
         self.calibration_step = 0  # 0 = waiting for top-left, 1 = waiting for bottom-right
-        self.goal_region = None  # (x1, y1, x2, y2)
         self.temp_click = None  # Temporary storage for first click
 
         # Histogram data
         self.bucket_counts = [0] * NUM_BUCKETS
-
-        # Motion detection state
-        self.prev_frame = None
-        self.cooldown_counters = [0] * NUM_BUCKETS  # Per-bucket cooldowns
-        self.glow_counters = [0] * NUM_BUCKETS  # Per-bucket glow effect timers
-        self.paused = False  # Pause counting
+        self.frame_index = 0
 
         # FPS tracking
         self.fps = 0
@@ -67,33 +68,49 @@ class GaltonGoalieApp:
 
         # Motion trails and long exposure
         # trail_mode: 0=Off, 1=Motion Trails, 2=Long Exposure, 3=Ultra-Long Exposure
-        self.trail_mode = 0
         self.trail_mode_names = ["Off", "Trails", "Long Exp", "Ultra-Long Exp"]
-        self.trail_canvas = None
-        self.long_exposure_canvas = None
-        self.ultra_long_exposure_canvas = None
-        self.prev_frame_full = None  # For full-frame motion detection
         self.trail_fade = 70  # Fade rate (0-100, higher = slower fade)
-        self.trail_colors = [
-            ([50, 150, 255], "Orange"),
-            ([255, 200, 50], "Cyan"),
-            ([255, 50, 255], "Magenta"),
-            ([50, 255, 50], "Green"),
-            ([255, 100, 100], "Blue"),
-            ([50, 255, 255], "Yellow"),
-            ([255, 255, 255], "White"),
-            ([100, 100, 255], "Red"),
-        ]
-        self.trail_color_index = 0
 
         # Adjustable parameters (will be controlled by sliders)
         self.cooldown_frames = DEFAULT_COOLDOWN_FRAMES
-        self.motion_threshold = DEFAULT_MOTION_THRESHOLD
-        self.min_contour_area = DEFAULT_MIN_CONTOUR_AREA
 
         # Load saved calibration if exists
         self.load_config()
 
+    # Settings that live in the engine
+    goal_region = property(lambda self: self.engine.goal_region,
+                           lambda self, value: setattr(self.engine, 'goal_region', value))
+    paused = property(lambda self: self.engine.paused,
+                      lambda self, value: setattr(self.engine, 'paused', value))
+    trail_mode = property(lambda self: self.engine.trail_mode,
+                          lambda self, value: setattr(self.engine, 'trail_mode', value))
+    trail_color_index = property(lambda self: self.engine.trail_color_index,
+                                 lambda self, value: setattr(self.engine, 'trail_color_index', value))
+    motion_threshold = property(lambda self: self.engine.motion_threshold,
+                                lambda self, value: setattr(self.engine, 'motion_threshold', value))
+    min_contour_area = property(lambda self: self.engine.min_contour_area,
+                                lambda self, value: setattr(self.engine, 'min_contour_area', value))
+    trail_colors = property(lambda self: self.engine.trail_colors)
+
+    @property
+    def cooldown_frames(self):
+        return self._cooldown_frames
+
+    @cooldown_frames.setter
+    def cooldown_frames(self, frames):
+        self._cooldown_frames = frames
+        self.engine.cooldown_ms = frames * 1000 / ASSUMED_FPS
+
+    @property
+    def trail_fade(self):
+        return self.engine.trail_fade
+
+    @trail_fade.setter
+    def trail_fade(self, fade):
+        # One slider drives both the trail fade and the long exposure
+        self.engine.trail_fade = fade
+        self.engine.long_exposure_duration = fade
+
     def update_fps(self):
         """Update FPS calculation."""
         self.frame_count += 1
@@ -103,123 +120,6 @@ class GaltonGoalieApp:
             self.frame_count = 0
             self.fps_start_time = time.time()
 
-    def update_trails(self, frame):
-        """Update motion trail visualization."""
-        h, w = frame.shape[:2]
-
-        # Initialize trail canvas if needed
-        if self.trail_canvas is None or self.trail_canvas.shape[:2] != (h, w):
-            self.trail_canvas = np.zeros((h, w, 3), dtype=np.float32)
-
-        # Convert to grayscale for motion detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (11, 11), 0)
-
-        if self.prev_frame_full is None:
-            self.prev_frame_full = gray
-            return
-
-        # Detect motion across entire frame
-        frame_delta = cv2.absdiff(self.prev_frame_full, gray)
-        thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
-        thresh = cv2.dilate(thresh, None, iterations=1)
-
-        # Add motion to trail canvas with selected color
-        motion_mask = thresh > 0
-        color = self.trail_colors[self.trail_color_index][0]
-        self.trail_canvas[motion_mask] = color
-
-        # Fade the trail canvas (trail_fade is 0-100, convert to 0.0-1.0)
-        fade_rate = self.trail_fade / 100.0
-        self.trail_canvas *= fade_rate
-
-        self.prev_frame_full = gray
-
-    def apply_trails(self, frame):
-        """Blend trail canvas onto frame."""
-        if self.trail_canvas is None:
-            return frame
-
-        # Convert trail canvas to uint8 and blend
-        trail_uint8 = np.clip(self.trail_canvas, 0, 255).astype(np.uint8)
-        # Additive blending for glow effect
-        result = cv2.add(frame, trail_uint8)
-        return result
-
-    def update_long_exposure(self, frame):
-        """Update long exposure visualization."""
-        h, w = frame.shape[:2]
-
-        # Initialize long exposure canvas if needed
-        if self.long_exposure_canvas is None or self.long_exposure_canvas.shape[:2] != (h, w):
-            self.long_exposure_canvas = np.zeros((h, w, 3), dtype=np.float32)
-
-        # Convert frame to float
-        frame_float = frame.astype(np.float32)
-
-        # Take maximum of current canvas and new frame (keeps brightest pixels)
-        self.long_exposure_canvas = np.maximum(self.long_exposure_canvas, frame_float)
-
-        # Slowly fade the canvas (controlled by trail_fade slider)
-        fade_rate = self.trail_fade / 100.0
-        # Fade towards the current frame rather than to black
-        self.long_exposure_canvas = self.long_exposure_canvas * fade_rate + frame_float * (1 - fade_rate) * 0.5
-
-    def apply_long_exposure(self, frame):
-        """Blend long exposure canvas onto frame."""
-        if self.long_exposure_canvas is None:
-            return frame
-
-        # Convert to uint8
-        result = np.clip(self.long_exposure_canvas, 0, 255).astype(np.uint8)
-        return result
-
-    def update_ultra_long_exposure(self, frame):
-        """Update ultra-long exposure visualization - accumulates motion indefinitely."""
-        h, w = frame.shape[:2]
-
-        # Initialize ultra-long exposure canvas if needed
-        if self.ultra_long_exposure_canvas is None or self.ultra_long_exposure_canvas.shape[:2] != (h, w):
-            self.ultra_long_exposure_canvas = np.zeros((h, w, 3), dtype=np.float32)
-
-        # Convert to grayscale for motion detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (11, 11), 0)
-
-        if self.prev_frame_full is None:
-            self.prev_frame_full = gray
-            return
-
-        # Detect motion across entire frame
-        frame_delta = cv2.absdiff(self.prev_frame_full, gray)
-        thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
-        thresh = cv2.dilate(thresh, None, iterations=1)
-
-        # Add motion to canvas (pure accumulation, no fade)
-        # Each detection adds a small amount of brightness
-        motion_mask = thresh > 0
-        # Add faint white trails where motion is detected (smaller increment for ghostly effect)
-        self.ultra_long_exposure_canvas[motion_mask] += [15, 15, 15]
-
-        # Clip to prevent overflow
-        self.ultra_long_exposure_canvas = np.clip(self.ultra_long_exposure_canvas, 0, 255)
-
-        self.prev_frame_full = gray
-
-    def apply_ultra_long_exposure(self, frame):
-        """Blend the accumulated trails on top of the live camera feed."""
-        if self.ultra_long_exposure_canvas is None:
-            return frame
-
-        # Convert accumulated canvas to uint8
-        trails = np.clip(self.ultra_long_exposure_canvas, 0, 255).astype(np.uint8)
-
-        # Blend trails on top of the live frame using additive blending
-        # This shows the background with ghostly trails overlaid
-        result = cv2.add(frame, trails)
-
-        return result
-
     def start_recording(self, frame):
         """Start recording video."""
         h, w = frame.shape[:2]
@@ -276,10 +176,10 @@ class GaltonGoalieApp:
         if self.cap:
             self.cap.release()
         self.cap = new_cap
-        self.camera_index = index
+        self.camera_index = self.engine.camera_index = index
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.prev_frame = None  # Reset motion detection
+        self.reset_motion()  # Reset motion detection
         print(f"Switched to camera {index}")
         return True
 
@@ -292,7 +192,7 @@ class GaltonGoalieApp:
                     self.goal_region = tuple(config.get('goal_region', []))
                     if len(self.goal_region) != 4:
                         self.goal_region = None
-                    self.camera_index = config.get('camera_index', 0)
+                    self.camera_index = self.engine.camera_index = config.get('camera_index', 0)
                     print(f"Loaded config - calibration: {self.goal_region}, camera: {self.camera_index}")
             except Exception as e:
                 print(f"Could not load config: {e}")
@@ -325,68 +225,15 @@ class GaltonGoalieApp:
                 self.calibrating = False
                 self.calibration_step = 0
                 self.temp_click = None
-                self.prev_frame = None  # Reset motion detection for new region size
+                self.reset_motion()  # Reset motion detection for new region size
                 self.save_config()
                 print(f"Calibration complete: {self.goal_region}")
 
-    def get_bucket_index(self, x):
-        """Determine which bucket (0-11) an x-coordinate falls into."""
-        if not self.goal_region:
-            return None
-        x1, y1, x2, y2 = self.goal_region
-        if x < x1 or x > x2:
-            return None
-        bucket_width = (x2 - x1) / NUM_BUCKETS
-        bucket = int((x - x1) / bucket_width)
-        return min(bucket, NUM_BUCKETS - 1)  # Clamp to valid range
-
-    def detect_ball(self, frame):
-        """Detect ball movement in the goal region and return list of bucket indices detected."""
-        # Decrement all cooldown and glow counters
-        for i in range(NUM_BUCKETS):
-            self.cooldown_counters[i] = max(0, self.cooldown_counters[i] - 1)
-            self.glow_counters[i] = max(0, self.glow_counters[i] - 1)
-
-        if self.paused or not self.goal_region:
-            return []
-
-        x1, y1, x2, y2 = self.goal_region
-
-        # Extract goal region from frame
-        roi = frame[y1:y2, x1:x2]
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-
-        if self.prev_frame is None:
-            self.prev_frame = gray
-            return []
-
-        # Compute difference between frames
-        frame_delta = cv2.absdiff(self.prev_frame, gray)
-        thresh = cv2.threshold(frame_delta, self.motion_threshold, 255, cv2.THRESH_BINARY)[1]
-        thresh = cv2.dilate(thresh, None, iterations=2)
-
-        # Find contours
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        self.prev_frame = gray
-
-        # Find all contours that meet minimum area and check their buckets
-        detected_buckets = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > self.min_contour_area:
-                # Get centroid of the contour
-                M = cv2.moments(contour)
-                if M["m00"] > 0:
-                    cx = int(M["m10"] / M["m00"]) + x1  # Adjust for ROI offset
-                    bucket = self.get_bucket_index(cx)
-                    if bucket is not None and self.cooldown_counters[bucket] == 0:
-                        self.cooldown_counters[bucket] = self.cooldown_frames
-                        self.glow_counters[bucket] = 15  # Glow for ~0.5s at 30fps
-                        detected_buckets.append(bucket)
-
-        return detected_buckets
+    def reset_motion(self):
+        """Start motion detection afresh (new camera or goal region)."""
+        self.engine.preprocessor.reset()
+        self.engine.detector.reset()
+        self.engine.tracker.reset()
 
     def draw_overlay(self, frame):
         """Draw the goal region, bucket divisions, and histogram on the frame."""
@@ -414,10 +261,11 @@ class GaltonGoalieApp:
             bucket_width = (x2 - x1) / NUM_BUCKETS
 
             # Draw glow effect for recently hit buckets
+            glow_levels = self.engine.glow_levels()
             for i in range(NUM_BUCKETS):
-                if self.glow_counters[i] > 0:
+                if glow_levels[i] > 0:
                     # Calculate glow intensity (fades out)
-                    intensity = self.glow_counters[i] / 15.0
+                    intensity = glow_levels[i]
                     bx1 = int(x1 + i * bucket_width)
                     bx2 = int(x1 + (i + 1) * bucket_width)
 
@@ -581,29 +429,16 @@ class GaltonGoalieApp:
             # Update FPS
             self.update_fps()
 
-            # Update visualization based on mode (only if not paused)
-            if not self.paused:
-                if self.trail_mode == 1:  # Motion Trails
-                    self.update_trails(frame)
-                elif self.trail_mode == 2:  # Long Exposure
-                    self.update_long_exposure(frame)
-                elif self.trail_mode == 3:  # Ultra-Long Exposure
-                    self.update_ultra_long_exposure(frame)
-
-            # Detect ball and update counts
-            detected_buckets = self.detect_ball(frame)
+            # Trail modes and ball detection (the engine skips both while paused)
+            # The captured frame is wrapped, not copied; it never goes back to the pool
+            buffer = FrameBuffer(frame, self.engine.frame_pool)
+            detected_buckets = self.engine.process(buffer, FrameMeta(self.frame_index, time.monotonic()))
+            self.frame_index += 1
+            frame = buffer.array
             for bucket in detected_buckets:
                 self.bucket_counts[bucket] += 1
                 print(f"Hit detected in bucket {bucket + 1}! Counts: {self.bucket_counts}")
 
-            # Apply visualization before overlay
-            if self.trail_mode == 1:  # Motion Trails
-                frame = self.apply_trails(frame)
-            elif self.trail_mode == 2:  # Long Exposure
-                frame = self.apply_long_exposure(frame)
-            elif self.trail_mode == 3:  # Ultra-Long Exposure
-                frame = self.apply_ultra_long_exposure(frame)
-
             # Save clean frame (without overlays) for clean recording mode
             clean_frame = frame.copy() if (self.recording and not self.record_full_ui) else None
 
@@ -627,13 +462,13 @@ class GaltonGoalieApp:
                 self.calibrating = True
                 self.calibration_step = 0
                 self.temp_click = None
-                self.prev_frame = None  # Reset motion detection
+                self.reset_motion()  # Reset motion detection
                 print("Calibration mode: Click top-left corner of goal...")
             elif key == ord('r'):
                 self.bucket_counts = [0] * NUM_BUCKETS
-                self.cooldown_counters = [0] * NUM_BUCKETS
-                self.glow_counters = [0] * NUM_BUCKETS
-                self.ultra_long_exposure_canvas = None
+                self.engine.cooldown_until_ms[:] = 0
+                self.engine.glow_until_ms[:] = 0
+                self.engine.reset_ultra_long_exposure()
                 print("Histogram and ultra-long exposure reset")
             elif key == ord('s'):
                 self.save_config()
@@ -649,10 +484,7 @@ class GaltonGoalieApp:
                 # Cycle through trail modes: Off -> Trails -> Long Exp -> Ultra-Long Exp -> Off
                 self.trail_mode = (self.trail_mode + 1) % 4
                 # Clear canvases when switching modes
-                self.trail_canvas = None
-                self.long_exposure_canvas = None
-                self.ultra_long_exposure_canvas = None
-                self.prev_frame_full = None
+                self.engine.reset_visuals()
                 print(f"Trail mode: {self.trail_mode_names[self.trail_mode]}")
             elif key == ord('g'):
                 # Cycle trail color